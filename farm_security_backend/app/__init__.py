@@ -1,24 +1,39 @@
 # app/__init__.py
 import os
-from flask import Flask
-
-# Attempt to import Flask-SQLAlchemy and provide a clear error if missing
-try:
-    from flask_sqlalchemy import SQLAlchemy
-except ModuleNotFoundError:
-    import sys
-    sys.exit(
-        "Missing dependency 'Flask-SQLAlchemy'. Install it and retry.\n\n"
-        "  pip install Flask-SQLAlchemy\n\n"
-        "If you have a requirements file, you can also run:\n\n"
-        "  pip install -r requirements.txt\n"
-    )
-
-# create the db instance here so models can import "from app import db"
-db = SQLAlchemy()
+
+# Legacy Flask app factory. The API itself is the FastAPI app in
+# app/__main__.py; Flask is only imported when this factory (or `db`) is
+# actually used, so importing any app.* module doesn't pay for it.
+
+
+def _create_db():
+    # Attempt to import Flask-SQLAlchemy and provide a clear error if missing
+    try:
+        from flask_sqlalchemy import SQLAlchemy
+    except ModuleNotFoundError:
+        import sys
+        sys.exit(
+            "Missing dependency 'Flask-SQLAlchemy'. Install it and retry.\n\n"
+            "  pip install Flask-SQLAlchemy\n\n"
+            "If you have a requirements file, you can also run:\n\n"
+            "  pip install -r requirements.txt\n"
+        )
+    return SQLAlchemy()
+
+
+def __getattr__(name):
+    # create the db instance on first use so models can import "from app import db"
+    if name == "db":
+        global db
+        db = _create_db()
+        return db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def create_app(db_url=None):
     # Flask App Factory
+    from flask import Flask
+
+    db = globals().get("db") or __getattr__("db")  # reuse the instance models already imported
     app = Flask(__name__)
     
     # Configuration
@@ -3,27 +3,50 @@ from dotenv import load_dotenv
 # Load environment variables from .env file FIRST
 load_dotenv()
 
+# Logging next, so import-time messages from the modules below are captured
+from app.logging_config import setup_logging
+setup_logging()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import threading
+import logging
 import os
-from app.database import engine, Base
+from app.database import ensure_schema
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
-Base.metadata.create_all(bind=engine)
+ensure_schema()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Start camera processing thread (import camera lazily to avoid early annotation issues)
     from app.routes import camera as camera_route  # lazy import
+    from app.services.detection import start_model_loading, start_inference_pool
+    from app.services.inference_pool import inference_pool
+    from app.services.arming import arming_scheduler
+    from app.services.ipc import daemon_mode, daemon_client
+    if daemon_mode():
+        # Cameras, inference and siren belong to `python -m app.daemon`
+        daemon_client.start()
+        yield
+        return
+    # The model loads and warms up in the background; /api/system/ready reports when it's done
+    start_model_loading()
+    # Optional multi-process inference (INFERENCE_WORKERS > 0)
+    start_inference_pool()
+    # Re-evaluate per-camera arming profiles at their window boundaries
+    arming_scheduler.start()
     processing_thread = threading.Thread(target=camera_route.video_processing_loop, daemon=True)
     processing_thread.start()
-    print("Camera processing thread started")
+    logger.info("Camera processing thread started")
     yield
     # Shutdown: cleanup if needed
-    print("Shutting down...")
+    logger.info("Shutting down...")
+    inference_pool.stop()
 
 app = FastAPI(
     title="Farm Security Backend",
@@ -42,59 +65,33 @@ app.add_middleware(
 )
 
 # Include routers (import lazily to avoid import-time annotation evaluation errors)
-from app.database import SessionLocal
-from app.models.event import DetectionEventDB
-
-from app.routes import event as event_route, camera as camera_route2, siren as siren_route, system as system_route
+from app.routes import event as event_route, camera as camera_route2, siren as siren_route, system as system_route, admin as admin_route, metrics as metrics_route
 
 app.include_router(event_route.router, prefix="/api", tags=["Events"])
 app.include_router(camera_route2.router, tags=["Camera"])
 app.include_router(siren_route.router, tags=["Siren"])
 app.include_router(system_route.router, tags=["System"])
+app.include_router(admin_route.router, tags=["Admin"])
+app.include_router(metrics_route.router, tags=["Metrics"])
 
 # Compatibility routes for frontend (needs to be at root level)
-from app.services.detection import set_system_state
 from pydantic import BaseModel
 
 class SystemEnabledRequest(BaseModel):
     enabled: bool
 
 @app.post("/system")
-async def toggle_system_compat(request: SystemEnabledRequest):
+def toggle_system_compat(request: SystemEnabledRequest):
     """Compatibility endpoint: /system (frontend expects this with { enabled: bool })"""
+    from app.services.detection import set_system_state  # not imported at startup (pulls in cv2)
     final_state = set_system_state(request.enabled)
     return {
         "success": True,
         "enabled": final_state
     }
 
-@app.get("/alerts")
-async def get_alerts_compat(limit: int = 100):
-    """Compatibility endpoint: /alerts (frontend expects this)"""
-    db = SessionLocal()
-    try:
-        events = db.query(DetectionEventDB).order_by(DetectionEventDB.timestamp.desc()).limit(limit).all()
-        # Convert to frontend format
-        alerts = []
-        for e in events:
-            alerts.append({
-                "id": e.id,
-                "timestamp": e.timestamp.isoformat() if e.timestamp else None,
-                "type": e.detection_type,
-                "device": e.device_id,
-                "siren": e.siren_activated,
-                "notified": e.notified,
-                "video": e.video_filename,
-                "confidence": e.confidence if hasattr(e, 'confidence') else None
-            })
-        return alerts
-    except Exception as ex:
-        print(f"Error in /alerts endpoint: {ex}")
-        import traceback
-        traceback.print_exc()
-        return []
-    finally:
-        db.close()
+# Same async handler as /api/alerts (doesn't block the event loop)
+app.add_api_route("/alerts", event_route.get_alerts_compat, methods=["GET"])
 
 @app.get("/")
 def read_root():
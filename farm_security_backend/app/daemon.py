@@ -0,0 +1,101 @@
+# app/daemon.py
+"""
+Capture/inference daemon.
+
+Owns the cameras, detection, alerting and siren so the HTTP API can run
+as many stateless worker processes as needed (CAPTURE_MODE=daemon):
+
+    python -m app.daemon
+    CAPTURE_MODE=daemon uvicorn app.__main__:app --workers 4
+
+API workers read the latest JPEG frame from shared memory and state,
+state changes and commands over the Unix socket (see app/services/ipc.py).
+"""
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# This process is the camera owner regardless of what the API workers use
+os.environ["CAPTURE_MODE"] = "embedded"
+
+from app.logging_config import setup_logging
+
+setup_logging()
+
+import logging
+
+from app.database import ensure_schema
+from app.services.ipc import IPCServer, SharedFrameWriter
+
+logger = logging.getLogger(__name__)
+
+
+def publish_frames(writer: SharedFrameWriter, frame_slot, encode_frame):
+    """
+    Encode each new frame into shared memory for the API workers, but only
+    while one of them is streaming it (nobody watching = no JPEG work).
+    """
+    seq = 0
+    while True:
+        frame, new_seq = frame_slot.wait_newer(seq, timeout=1.0)
+        if frame is None:
+            continue
+        seq = new_seq
+        if not writer.has_readers():
+            continue
+        jpeg = encode_frame(frame)
+        if jpeg is not None:
+            writer.write(jpeg)
+
+
+def main():
+    ensure_schema()
+
+    from app.routes import camera as camera_route
+    from app.routes.admin import ADMIN_OPS
+    from app.services import metrics
+    from app.services.detection import set_system_state, start_model_loading, start_inference_pool
+    from app.services.inference_pool import inference_pool
+    from app.services.detection_cache import detection_cache
+    from app.services.arming import arming_scheduler
+    from app.services.siren_control import siren_controller
+    from app.services.state_store import state_store
+
+    server = IPCServer({
+        "state": state_store.snapshot,
+        "set_system": lambda active: set_system_state(bool(active)),
+        "siren": lambda state, **kwargs: siren_controller.toggle_siren(state, **kwargs),
+        "sirens": siren_controller.status,
+        "detection_cache": detection_cache.stats,
+        "metrics": metrics.registry.render,
+        # /api/admin/* from the API workers act on this process
+        **ADMIN_OPS,
+    })
+    writer = SharedFrameWriter()
+
+    start_model_loading()
+    start_inference_pool()
+    arming_scheduler.start()
+    server.start()
+    threading.Thread(target=publish_frames, args=(writer, camera_route.frame_slot, camera_route.encode_frame),
+                     name="frame-publisher", daemon=True).start()
+    threading.Thread(target=camera_route.video_processing_loop, name="capture", daemon=True).start()
+    logger.info("Capture daemon running")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    logger.info("Shutting down capture daemon...")
+    server.close()
+    writer.close()
+    inference_pool.stop()
+
+
+if __name__ == "__main__":
+    main()
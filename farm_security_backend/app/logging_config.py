@@ -0,0 +1,140 @@
+# app/logging_config.py
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+# Logging for the whole backend:
+# - records are handed to a QueueHandler so the capture/detection threads never
+#   block on stdout/journald; a QueueListener thread does the actual writing
+# - a per-message rate limiter keyed by (logger, message template) stops
+#   per-frame / per-box DEBUG/INFO messages from flooding the output; the next
+#   record that gets through reports how many were suppressed. WARNING and
+#   above are never dropped
+# - levels are configurable globally (LOG_LEVEL) and per module
+#   (LOG_LEVELS="app.services.detection=DEBUG,app.routes.camera=WARNING")
+# - LOG_FORMAT=json emits one JSON object per line for log shippers
+#
+# Hot paths should log with %-style arguments (logger.debug("x=%s", x)) so
+# the template is stable for rate limiting and formatting is skipped for
+# records that are filtered out.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_RATE_PER_SEC = float(os.getenv("LOG_RATE_PER_SEC", "1"))  # sustained rate per template
+LOG_RATE_BURST = int(os.getenv("LOG_RATE_BURST", "5"))
+
+_STANDARD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+_CONTROL_ATTRS = {"suppressed", "no_rate_limit"}
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger name, message template) for records below `max_level`."""
+
+    def __init__(self, rate: float = LOG_RATE_PER_SEC, burst: int = LOG_RATE_BURST,
+                 max_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._buckets = {}  # key -> [tokens, last_refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.max_level or getattr(record, "no_rate_limit", False):
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with structured extras appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {k: v for k, v in record.__dict__.items() if k not in _STANDARD_ATTRS and k not in _CONTROL_ATTRS}
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        if getattr(record, "suppressed", 0):
+            line += f" (+{record.suppressed} similar suppressed)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key != "no_rate_limit":
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+_listener = None
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Install the queue-based, rate-limited root handler (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def set_log_level(name: str, level: str):
+    """Change a module's level at runtime ('' for the root logger)."""
+    logging.getLogger(name or None).setLevel(level.upper())
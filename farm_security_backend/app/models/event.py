@@ -12,6 +12,7 @@ from sqlalchemy import (
     Boolean,
     Float,
     JSON,
+    Index,
 )
 
 from app.database import Base
@@ -25,6 +26,10 @@ class DetectionEventDB(Base):
     """
 
     __tablename__ = "detection_events"
+    __table_args__ = (
+        # Client-generated keys make bulk ingest from edge nodes idempotent
+        Index("ix_detection_events_idempotency_key", "idempotency_key", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -35,6 +40,7 @@ class DetectionEventDB(Base):
     video_filename = Column(String(256), nullable=True)
     confidence = Column(Float, nullable=True)
     data = Column(JSON, nullable=True)
+    idempotency_key = Column(String(128), nullable=True)
 
     def __repr__(self) -> str:  # pragma: no cover - simple debug helper
         return (
@@ -59,3 +65,9 @@ class DetectionEvent(BaseModel):
     video_filename: Optional[str] = None
     confidence: Optional[float] = None
     data: Optional[Dict[str, Any]] = None
+
+
+class DetectionEventIngest(DetectionEvent):
+    """One event pushed by an edge node; `idempotency_key` makes retries safe."""
+
+    idempotency_key: str
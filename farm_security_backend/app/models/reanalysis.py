@@ -0,0 +1,34 @@
+# app/models/reanalysis.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, String, Float, JSON, Index
+
+from app.database import Base
+
+
+class ReanalysisProgressDB(Base):
+    """
+    One row per (run, clip) of the offline re-analysis job
+    (app/tools/reanalyze.py). A run is identified by model file and hash,
+    threshold, stride and classes (see reanalyze.run_key), so re-running the
+    same configuration skips clips already marked done.
+    """
+
+    __tablename__ = "reanalysis_progress"
+    __table_args__ = (
+        Index("ix_reanalysis_progress_run_clip", "run", "video_filename", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    run = Column(String(256), nullable=False)
+    video_filename = Column(String(256), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending | done | failed
+    frames = Column(Integer, nullable=True)
+    seconds = Column(Float, nullable=True)
+    summary = Column(JSON, nullable=True)
+    error = Column(String(512), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover - simple debug helper
+        return f"<ReanalysisProgressDB run={self.run} clip={self.video_filename} status={self.status}>"
@@ -0,0 +1,177 @@
+# app/routes/admin.py
+import os
+import secrets
+from typing import Optional, List, Dict
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+
+from app.services.model_registry import model_registry, resolve_model_request
+from app.services.inference_pool import inference_pool
+from app.services.arming import arming_scheduler
+from app.services.preprocess import preprocessor
+from app.services.camera_control import camera_controllers
+from app.services.ipc import daemon_mode, daemon_client
+from app.logging_config import set_log_level
+
+# Every admin endpoint needs `X-Admin-Token: $ADMIN_TOKEN`; without ADMIN_TOKEN
+# the admin API is disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin_token(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled: set ADMIN_TOKEN.")
+    if not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+def _model_status() -> dict:
+    status = model_registry.status()
+    status["inference_pool"] = inference_pool.status()
+    return status
+
+
+def _detection_op(name: str):
+    """Admin action backed by app.services.detection, imported on first call
+    so registering the admin routes doesn't import detection (and cv2)."""
+    def op(**args):
+        from app.services import detection
+        return getattr(detection, name)(**args)
+    return op
+
+
+# Admin actions by IPC op name. They act on the process running detection:
+# this one, or the capture daemon (CAPTURE_MODE=daemon), which registers
+# the same table as IPC ops.
+ADMIN_OPS = {
+    "model_status": _model_status,
+    "model_reload": _detection_op("reload_model"),
+    "model_shadow": model_registry.set_shadow_async,
+    "model_shadow_clear": model_registry.clear_shadow,
+    "detection_config": _detection_op("get_detection_config"),
+    "update_detection_config": _detection_op("update_detection_config"),
+    "arming": arming_scheduler.status,
+    "preprocess": preprocessor.status,
+    "camera_control": lambda: {camera_id: c.status() for camera_id, c in camera_controllers.items()},
+    "log_level": set_log_level,
+}
+
+
+def _run(op: str, **args):
+    """Run an admin action where detection runs (blocking: call from `def` handlers)."""
+    if not daemon_mode():
+        return ADMIN_OPS[op](**args)
+    try:
+        return daemon_client.call(op, **args)
+    except (OSError, RuntimeError) as e:
+        raise HTTPException(status_code=503, detail=f"Capture daemon unavailable: {e}")
+
+
+class ModelLoadRequest(BaseModel):
+    path: Optional[str] = None  # file in app/models; defaults to the configured best.onnx
+
+
+class ShadowModelRequest(BaseModel):
+    path: str  # file in app/models
+    every: int = 10  # run the shadow model on 1 of N detection frames
+
+
+class LogLevelRequest(BaseModel):
+    logger: str = ""  # module name, e.g. "app.services.detection"; "" = root
+    level: str  # DEBUG, INFO, WARNING, ERROR
+
+
+class DetectionConfigRequest(BaseModel):
+    confidence_threshold: Optional[float] = None
+    allowed_classes: Optional[List[str]] = None
+    severity_thresholds: Optional[Dict[str, float]] = None  # {"log"|"notify"|"siren": confidence}
+    reload_env: bool = False
+
+
+@router.get("/model")
+def get_model_status():
+    """Active/shadow model info, shadow comparison counters and worker pool state."""
+    return _run("model_status")
+
+
+@router.get("/arming")
+def get_arming_status():
+    """Configured arming schedules and each camera's current profile."""
+    return _run("arming")
+
+
+@router.get("/preprocess")
+def get_preprocess_status():
+    """Day/night preprocessing settings and per-camera measured brightness."""
+    return _run("preprocess")
+
+
+@router.get("/camera_control")
+def get_camera_control_status():
+    """Idle/active mode and last confirmed framesize/quality per camera."""
+    return _run("camera_control")
+
+
+@router.post("/model/reload")
+def reload_model_endpoint(request: ModelLoadRequest):
+    """Load a model in the background, warm it up and swap it in."""
+    from app.services.detection import MODEL_PATH
+    try:
+        path = resolve_model_request(request.path) if request.path else MODEL_PATH
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not _run("model_reload", path=path):
+        raise HTTPException(status_code=409, detail="A model load is already in progress.")
+    return {"success": True, "loading": path, "message": "Model is loading; poll GET /api/admin/model."}
+
+
+@router.post("/model/shadow")
+def set_shadow_model(request: ShadowModelRequest):
+    """Load (in the background) a shadow model that runs on a sample of frames for comparison."""
+    try:
+        path = resolve_model_request(request.path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not _run("model_shadow", path=path, every=request.every):
+        raise HTTPException(status_code=409, detail="A model load is already in progress.")
+    return {"success": True, "loading": path, "message": "Shadow model is loading; poll GET /api/admin/model."}
+
+
+@router.delete("/model/shadow")
+def clear_shadow_model():
+    """Stop running the shadow model."""
+    _run("model_shadow_clear")
+    return {"success": True}
+
+
+@router.get("/config")
+def get_config():
+    """Current detection thresholds and allowed classes."""
+    return _run("detection_config")
+
+
+@router.post("/config")
+def update_config(request: DetectionConfigRequest):
+    """Reload thresholds / ALLOWED_DETECTION_CLASSES / alert severity thresholds without restarting."""
+    return _run(
+        "update_detection_config",
+        confidence_threshold=request.confidence_threshold,
+        allowed_classes=request.allowed_classes,
+        reload_env=request.reload_env,
+        severity_thresholds=request.severity_thresholds,
+    )
+
+
+@router.post("/log_level")
+def update_log_level(request: LogLevelRequest):
+    """Change a module's log level at runtime (in this worker and where detection runs)."""
+    if request.level.upper() not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        raise HTTPException(status_code=400, detail="Invalid log level.")
+    if daemon_mode():
+        set_log_level(request.logger, request.level)
+    _run("log_level", name=request.logger, level=request.level)
+    return {"success": True, "logger": request.logger or "root", "level": request.level.upper()}
@@ -1,59 +1,61 @@
-import cv2
 import numpy as np
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 import time
+import logging
 import threading
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load .env file to ensure environment variables are available
 load_dotenv()
 
-from app.services.detection import detector, get_system_state, log_detection_event
-from app.services.siren_control import siren_controller
-from app.services.push_notification import send_onesignal_notification
+from app.services.inference import DEFAULT_CAMERA_ID
+from app.services.detection_cache import detection_cache
+from app.services.inference_pool import inference_pool
+from app.services.frame_slot import FrameSlot
+from app.services.state_store import state_store
+from app.services.status_snapshot import status_snapshot
+from app.services.arming import arming_scheduler, ARMING_IDLE_FPS
+from app.services.camera_control import get_camera_controller
+from app.services.ipc import daemon_mode, daemon_client, SharedFrameReader
+from app.services import metrics
+from app.services.tracing import FrameTrace
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/camera", tags=["camera"])
 
 # NOTE: Update this URL to match the actual IP of your ESP32-CAM
 # Prefer env override. Typical ESP32 stream path is http://<ip>:81/stream
 # If stream doesn't work, try http://<ip>/stream or check ESP32 serial output for actual port
+# Comma-separated URLs are failovers for this instance's one camera, not extra cameras
 ESP32_CAM_STREAM_URLS = [u.strip() for u in os.getenv("ESP32_CAM_STREAM_URLS", "http://10.18.81.133:81/stream").split(",") if u.strip()]
 ESP32_CAM_SNAPSHOT_URL = os.getenv("ESP32_CAM_SNAPSHOT_URL", "http://10.18.81.133/capture")
 
-print(f"🎥 Camera URLs loaded: {ESP32_CAM_STREAM_URLS}")
-print(f"📸 Snapshot URL: {ESP32_CAM_SNAPSHOT_URL}")
+logger.info("🎥 Camera URLs loaded: %s", ESP32_CAM_STREAM_URLS)
+logger.info("📸 Snapshot URL: %s", ESP32_CAM_SNAPSHOT_URL)
 FRAME_SKIP = 3  # Run detection every 3 frames (to save CPU/GPU resources)
 
 # Global video capture (will be initialized in processing loop)
 cap = None
 cap_lock = threading.Lock()
-latest_frame = None
-frame_lock = threading.Lock()
-camera_connected = False
-camera_connection_lock = threading.Lock()
-
-# Detection cooldown to prevent spam notifications
-last_detection_time = 0
-DETECTION_COOLDOWN = 10  # seconds between detections (any type)
-last_detection_type = None
-cooldown_lock = threading.Lock()
+# Latest frame for live feed, shared by reference (see FrameSlot)
+frame_slot = FrameSlot()
 
 def get_camera_connection_status():
     """Get current camera connection status."""
-    with camera_connection_lock:
-        return camera_connected
+    return state_store.get("camera_connected")
 
 def set_camera_connection_status(status: bool):
-    """Set camera connection status."""
-    global camera_connected
-    with camera_connection_lock:
-        camera_connected = status
+    """Set camera connection status (listeners only fire when it changes)."""
+    state_store.set_camera_connected(status)
 
 def get_camera_capture():
     """Get or create video capture object. Tries multiple URLs and backends."""
+    import cv2
     global cap
     with cap_lock:
         if cap is None or not cap.isOpened():
@@ -68,11 +70,11 @@ def get_camera_capture():
                 
                 for backend, backend_name in backends:
                     try:
-                        print(f"🔌 Attempting connection to {url} with {backend_name}...")
+                        logger.info("🔌 Attempting connection to %s with %s...", url, backend_name)
                         cap = cv2.VideoCapture(url, backend)
                         
                         if not cap.isOpened():
-                            print(f"   ❌ {backend_name} failed to open")
+                            logger.info("   ❌ %s failed to open", backend_name)
                             continue
                         
                         # Configure capture settings
@@ -90,19 +92,20 @@ def get_camera_capture():
                             pass
 
                         # Verify by reading a test frame
-                        print(f"   📸 Testing frame read...")
+                        logger.debug("   📸 Testing frame read...")
                         ret, test_frame = cap.read()
                         if ret and test_frame is not None:
-                            print(f"   ✅ SUCCESS! Connected with {backend_name}")
+                            logger.info("   ✅ SUCCESS! Connected with %s", backend_name)
                             set_camera_connection_status(True)
+                            state_store.set_stream_open(True)
                             return cap
                         else:
-                            print(f"   ❌ {backend_name} opened but cannot read frames")
+                            logger.info("   ❌ %s opened but cannot read frames", backend_name)
                             cap.release()
                             cap = None
                             
                     except Exception as e:
-                        print(f"   ❌ {backend_name} exception: {e}")
+                        logger.info("   ❌ %s exception: %s", backend_name, e)
                         if cap:
                             try:
                                 cap.release()
@@ -112,12 +115,14 @@ def get_camera_capture():
                         continue
             
             # All attempts failed
-            print(f"⚠️  WARNING: Failed to connect to camera stream at any URL: {ESP32_CAM_STREAM_URLS}")
-            print(f"💡 TIP: Stream works in browser but not OpenCV. Try:")
-            print(f"   1. Check if ESP32 allows multiple connections")
-            print(f"   2. Close browser tab accessing the stream")
-            print(f"   3. Restart ESP32-CAM")
+            logger.warning(
+                "⚠️  Failed to connect to camera stream at any URL: %s. "
+                "If the stream works in a browser, check that the ESP32 allows multiple "
+                "connections, close browser tabs using the stream, or restart the ESP32-CAM.",
+                ESP32_CAM_STREAM_URLS,
+            )
             set_camera_connection_status(False)
+            state_store.set_stream_open(False)
             return None
         else:
             # Verify the existing connection is still working
@@ -135,6 +140,7 @@ def get_camera_capture():
                     pass
                 cap = None
                 set_camera_connection_status(False)
+                state_store.set_stream_open(False)
                 return None
     return cap
 
@@ -143,6 +149,7 @@ def try_read_snapshot() -> np.ndarray | None:
     Fallback: fetch a single JPEG snapshot from ESP32 and decode it.
     This works when MJPEG streaming is not enabled but /capture exists.
     """
+    import cv2
     try:
         resp = requests.get(ESP32_CAM_SNAPSHOT_URL, timeout=3)
         if resp.status_code == 200 and resp.content:
@@ -156,12 +163,20 @@ def try_read_snapshot() -> np.ndarray | None:
 
 def video_processing_loop():
     """The main background loop for running detection and triggering actions."""
-    global latest_frame, cap, last_detection_time, last_detection_type
+    # Detection (and through it cv2, the models and the alert side effects) is
+    # imported when the lifespan starts capture, not when the routes are registered
+    from app.services.detection import get_system_state
+    from app.services.alert_pipeline import alert_pipeline
+    global cap
     
     frame_count = 0
     consecutive_failures = 0
     max_consecutive_failures = 3  # Reconnect after 3 consecutive failed reads
-    print(f"🎥 Video processing loop starting... (Stream URL: {ESP32_CAM_STREAM_URLS} | Snapshot URL: {ESP32_CAM_SNAPSHOT_URL})")
+    logger.info("🎥 Video processing loop starting... (Stream URL: %s | Snapshot URL: %s)", ESP32_CAM_STREAM_URLS, ESP32_CAM_SNAPSHOT_URL)
+    controller = get_camera_controller(DEFAULT_CAMERA_ID)
+    # With the inference pool, detection runs beside capture: one frame in flight per camera
+    detect_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detect")
+    in_flight = None
     
     while True:
         # Get camera capture (always, even if system is OFF - for live feed)
@@ -171,20 +186,24 @@ def video_processing_loop():
         if camera is not None:
             ret, frame = camera.read()
         # Fallback to snapshot endpoint if streaming failed
+        from_snapshot = False
         if not ret or frame is None:
             snapshot = try_read_snapshot()
             if snapshot is not None:
                 frame = snapshot
                 ret = True
+                from_snapshot = True
         
         if not ret:
             consecutive_failures += 1
-            print(f"⚠️  Stream read failed ({consecutive_failures}/{max_consecutive_failures})")
+            metrics.FRAMES_FAILED.inc(camera=DEFAULT_CAMERA_ID)
+            logger.warning("⚠️  Stream read failed (%d/%d)", consecutive_failures, max_consecutive_failures)
             set_camera_connection_status(False)
             
             # Force reconnection after 3 consecutive failures
             if consecutive_failures >= max_consecutive_failures:
-                print("🔄 3 consecutive failures detected - forcing camera reconnection...")
+                logger.warning("🔄 %d consecutive failures detected - forcing camera reconnection...", max_consecutive_failures)
+                metrics.CAMERA_RECONNECTS.inc(camera=DEFAULT_CAMERA_ID)
                 with cap_lock:
                     if cap:
                         try:
@@ -192,120 +211,131 @@ def video_processing_loop():
                         except:
                             pass
                     cap = None
+                state_store.set_stream_open(False)
                 consecutive_failures = 0
                 time.sleep(1)  # Brief pause before reconnecting
             else:
                 time.sleep(0.5)  # Short delay between retries
             continue
         
+        # Stamp capture time; later stages are measured relative to it
+        trace = FrameTrace()
+        
         # Reset failure counter on successful read
         consecutive_failures = 0
+        metrics.FRAMES_READ.inc(camera=DEFAULT_CAMERA_ID)
+
+        # Near-duplicate caching only applies to snapshot frames (see detection_cache)
+        detection_cache.set_source(DEFAULT_CAMERA_ID, from_snapshot)
 
-        # Store latest frame for live feed
-        with frame_lock:
-            latest_frame = frame.copy()
+        # Publish latest frame for live feed (by reference - frame is not modified after this)
+        frame_slot.publish(frame)
         
         # Update connection status to True since we successfully read a frame
         set_camera_connection_status(True)
 
+        # Outside its armed windows the camera is capture-only at ARMING_IDLE_FPS
+        profile = arming_scheduler.profile_for(DEFAULT_CAMERA_ID)
+        armed = profile is not None and get_system_state()
+        detections = None
+
+        if in_flight is not None and in_flight.done():
+            if in_flight.exception() is not None:
+                logger.error("⚠️  Detection error: %s", in_flight.exception())
+            else:
+                detections, _ = in_flight.result()
+            in_flight = None
+
         # Run detection every N frames (only if system is ON)
         frame_count += 1
-        if frame_count % FRAME_SKIP == 0 and get_system_state():
+        if armed and frame_count >= profile.get("frame_skip", FRAME_SKIP):
             # --- CORE DETECTION CALL ---
-            # Run YOLO detection on the frame
-            try:
-                detections = detector.run_detection(frame)
-            except Exception as e:
-                print(f"⚠️  Detection error: {e}")
-                detections = []
-            
-            if detections and len(detections) > 0:
-                detection_type = detections[0]['label']
-                confidence = detections[0].get('confidence', 0.0)
-                current_time = time.time()
-                
-                # Check cooldown - prevent spam notifications for same detection type
-                with cooldown_lock:
-                    should_alert = (last_detection_type != detection_type or 
-                                  current_time - last_detection_time >= DETECTION_COOLDOWN)
-                
-                if not should_alert:
-                    # Still in cooldown, skip notification but log detection
-                    print(f"👁️  Detection: {detection_type} (confidence: {confidence:.2f}) - Cooldown active")
-                else:
-                    # New detection or cooldown expired - trigger alert
-                    print(f"🚨 ALERT! Threat Detected: {detection_type} (confidence: {confidence:.2f}) at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-                    
-                    # Update cooldown tracking
-                    with cooldown_lock:
-                        last_detection_time = current_time
-                        last_detection_type = detection_type
-                    
-                    # A. Trigger Siren (AI-triggered)
-                    siren_success = siren_controller.toggle_siren("ON")
-                    
-                    # B. Send Notification
-                    notification_success = send_onesignal_notification(
-                        title="🚨 Intrusion Alert!",
-                        message=f"ALERT! {detection_type.upper()} DETECTED in your farm. Immediate action required!"
-                    )
-                    
-                    # C. Log event to database (timestamp only, no video)
-                    log_detection_event(
-                        detection_type=detection_type,
-                        siren_activated=siren_success,
-                        notified=notification_success,
-                        video_filename=None,
-                        confidence=confidence
-                    )
-                    
-                    # Auto-turn off siren after 60 seconds
-                    def auto_siren_off():
-                        time.sleep(60)
-                        siren_controller.toggle_siren("OFF")
-                    
-                    threading.Thread(target=auto_siren_off, daemon=True).start()
-            
-            frame_count = 0
+            # Detection, N-of-M confirmation and alert side effects
+            if not inference_pool.enabled:
+                detections, _ = alert_pipeline.process(frame, trace, DEFAULT_CAMERA_ID)
+                frame_count = 0
+            elif in_flight is None:
+                in_flight = detect_executor.submit(alert_pipeline.process, frame, trace, DEFAULT_CAMERA_ID)
+                frame_count = 0
+            # else: the previous frame is still in the pool; the next frame gets the slot
+
+        # Camera resolution/quality follows motion and detections while armed
+        if controller is not None:
+            controller.observe(frame, detections, armed=armed)
         
-        time.sleep(0.016)  # ~60 FPS processing rate for smoother feed
+        time.sleep(0.016 if profile is not None else 1.0 / ARMING_IDLE_FPS)  # ~60 FPS processing rate for smoother feed
     
-    print("Video processing loop stopped.")
+    logger.info("Video processing loop stopped.")
 
-def generate_frames():
-    """Generator function for streaming video frames."""
-    while True:
-        with frame_lock:
-            if latest_frame is None:
+def encoded_frames():
+    """
+    Latest frames as JPEG bytes, one per new frame. Encoded here from
+    frame_slot, or read ready-encoded from the capture daemon's shared
+    memory when this process doesn't own the camera (CAPTURE_MODE=daemon).
+    """
+    seq = 0
+    if daemon_mode():
+        reader = SharedFrameReader()
+        while True:
+            jpeg, seq, _ = reader.read(seq)
+            if jpeg is None:
                 time.sleep(0.01)
                 continue
-            frame = latest_frame.copy()
-        
-        # Encode frame as JPEG with lower quality for faster streaming
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-        if not ret:
+            yield jpeg
+    while True:
+        # Wait for a frame newer than the last one sent instead of sleep-polling
+        frame, new_seq = frame_slot.wait_newer(seq, timeout=1.0)
+        if frame is None:
             continue
-        
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        time.sleep(0.016)  # ~60 FPS for smoother streaming
+        seq = new_seq
+        jpeg = encode_frame(frame)
+        if jpeg is not None:
+            yield jpeg
 
-@router.get("/status")
-async def get_stream_status():
-    """Checks if the video stream is currently open."""
-    with cap_lock:
-        cap_open = cap is not None and cap.isOpened()
-    connection_status = get_camera_connection_status()
-    final_status = "streaming" if (cap_open or connection_status) else "disconnected"
+def encode_frame(frame: np.ndarray):
+    """Encode frame as JPEG with lower quality for faster streaming (None on failure)."""
+    import cv2
+    started = time.perf_counter()
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    metrics.LIVE_FEED_ENCODE_SECONDS.observe(time.perf_counter() - started)
+    return buffer.tobytes() if ret else None
+
+def generate_frames():
+    """Generator function for streaming video frames."""
+    metrics.LIVE_FEED_SUBSCRIBERS.inc()
+    try:
+        for frame_bytes in encoded_frames():
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    finally:
+        # Runs when the client disconnects and the generator is closed
+        metrics.LIVE_FEED_SUBSCRIBERS.dec()
+
+def build_camera_status(state: dict) -> dict:
+    """Camera status payload from a state_store snapshot."""
+    connection_status = state["camera_connected"]
+    final_status = "streaming" if (state["stream_open"] or connection_status) else "disconnected"
     return {
         "status": final_status,
         "url": ESP32_CAM_STREAM_URLS[0] if ESP32_CAM_STREAM_URLS else "",
-        "system_active": get_system_state(),
+        "system_active": state["system_active"],
         "connected": connection_status
     }
 
+status_snapshot.register("camera", build_camera_status)
+
+@router.get("/status")
+async def get_stream_status(request: Request):
+    """Checks if the video stream is currently open (cached; supports If-None-Match)."""
+    return status_snapshot.respond(request, "camera")
+
+@router.get("/detection_cache")
+def get_detection_cache_stats():
+    """Hit/miss counters for the perceptual-hash detection cache."""
+    if daemon_mode():
+        return daemon_client.call("detection_cache")
+    return detection_cache.stats()
+
 @router.get("/live_feed")
 async def live_feed():
     """Live feed endpoint for streaming camera video."""
@@ -1,28 +1,69 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse, FileResponse
+from pydantic import ValidationError
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Optional
+import os
+import json
+import asyncio
+import logging
 
-from app.database import SessionLocal
-from app.models.event import DetectionEvent, DetectionEventDB
+from app.database import AsyncSessionLocal, DB_REQUEST_TIMEOUT
+from app.models.event import DetectionEvent, DetectionEventDB, DetectionEventIngest
+from app.services.tracing import summarize_traces
+from app.services.evidence import evidence_store
+from app.services.event_export import export_events, parquet_available, FORMATS as EXPORT_FORMATS
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Dependency - get a database session per request
-def get_db():
-    db = SessionLocal()
-    try:
+# Evidence files never change once written
+EVIDENCE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+EVENTS_BULK_MAX_ITEMS = int(os.getenv("EVENTS_BULK_MAX_ITEMS", "10000"))
+
+# Dependency - get an async database session per request (pooled, see app.database)
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def with_timeout(awaitable):
+    """Bound one request's database work by DB_REQUEST_TIMEOUT."""
+    try:
+        return await asyncio.wait_for(awaitable, DB_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Database timeout")
+
+def evidence_urls(event: DetectionEventDB) -> dict:
+    """Thumbnail/crop URLs for events logged with evidence (see log_detection_event)."""
+    evidence = event.data.get("evidence") if isinstance(event.data, dict) else None
+    if not evidence:
+        return {"thumbnail": None, "crops": []}
+    return {
+        "thumbnail": f"/api/events/{event.id}/thumbnail",
+        "crops": [f"/api/events/{event.id}/crops/{i}" for i in range(evidence.get("crops", 0))],
+    }
+
+async def _recent_events(db: AsyncSession, limit: int) -> list:
+    result = await db.execute(
+        select(DetectionEventDB).order_by(DetectionEventDB.timestamp.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+async def _get_event(db: AsyncSession, event_id: int):
+    return await db.get(DetectionEventDB, event_id)
 
 # Compatibility endpoint for frontend
 @router.get("/alerts")
-async def get_alerts_compat(db: Session = Depends(get_db), limit: int = 100):
+async def get_alerts_compat(db: AsyncSession = Depends(get_db), limit: int = 100):
     """Compatibility endpoint: /alerts (frontend expects this)"""
     try:
-        events = db.query(DetectionEventDB).order_by(DetectionEventDB.timestamp.desc()).limit(limit).all()
+        events = await with_timeout(_recent_events(db, limit))
         # Convert to frontend format
         alerts = []
         for e in events:
@@ -34,13 +75,12 @@ async def get_alerts_compat(db: Session = Depends(get_db), limit: int = 100):
                 "siren": e.siren_activated,
                 "notified": e.notified,
                 "video": e.video_filename,
-                "confidence": e.confidence if hasattr(e, 'confidence') else None
+                "confidence": e.confidence if hasattr(e, 'confidence') else None,
+                **evidence_urls(e),
             })
         return alerts
     except Exception as ex:
-        print(f"Error in /alerts endpoint: {ex}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in /alerts endpoint: %s", ex)
         return []
 
 # Helper to convert DB model to Pydantic model
@@ -54,12 +94,13 @@ def db_to_pydantic(db_event: DetectionEventDB) -> DetectionEvent:
         video_filename=db_event.video_filename,
         siren_activated=db_event.siren_activated,
         notified=db_event.notified,
-        confidence=getattr(db_event, 'confidence', None)
+        confidence=getattr(db_event, 'confidence', None),
+        data=db_event.data
     )
 
 # CREATE event
 @router.post("/events/", response_model=DetectionEvent)
-def create_detection_event(event: DetectionEvent, db: Session = Depends(get_db)):
+async def create_detection_event(event: DetectionEvent, db: AsyncSession = Depends(get_db)):
     db_event = DetectionEventDB(
         timestamp=event.timestamp if event.timestamp else datetime.now(),
         device_id=event.device_id,
@@ -67,31 +108,186 @@ def create_detection_event(event: DetectionEvent, db: Session = Depends(get_db))
         video_filename=event.video_filename,
         siren_activated=event.siren_activated,
         notified=event.notified,
-        confidence=getattr(event, 'confidence', None)
+        confidence=getattr(event, 'confidence', None),
+        data=event.data
     )
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await with_timeout(db.commit())
+    await db.refresh(db_event)
     return db_to_pydantic(db_event)
 
+def _parse_bulk_body(body: bytes, content_type: str) -> list:
+    """A JSON array, or NDJSON (one event per line). Unparseable NDJSON lines become None."""
+    try:
+        text = body.decode("utf-8").strip()
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Body is not valid UTF-8: {e}")
+    if "ndjson" not in content_type and text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+        return items
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(None)
+    return items
+
+# CREATE many events (edge node sync)
+@router.post("/events/bulk", response_model=dict)
+async def bulk_ingest_events(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Ingest a JSON array or NDJSON stream of events, each with a client-generated
+    idempotency_key, in one transaction. Keys that already exist are skipped, so
+    an edge node can safely resend a batch after a network failure. Returns one
+    result per item: created / duplicate (with the stored id) / invalid.
+    """
+    items = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > EVENTS_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {EVENTS_BULK_MAX_ITEMS} events per request")
+
+    results = [None] * len(items)
+    rows, row_index, repeats = [], {}, []
+    for i, item in enumerate(items):
+        try:
+            event = DetectionEventIngest.model_validate(item)
+        except ValidationError as e:
+            results[i] = {"index": i, "status": "invalid", "error": e.errors(include_url=False)}
+            continue
+        key = event.idempotency_key
+        if key in row_index:
+            # Repeated within this batch: the first occurrence wins
+            repeats.append((i, key))
+            continue
+        row_index[key] = i
+        rows.append({
+            "timestamp": event.timestamp or datetime.now(),
+            "device_id": event.device_id,
+            "detection_type": event.detection_type,
+            "video_filename": event.video_filename,
+            "siren_activated": event.siren_activated,
+            "notified": event.notified,
+            "confidence": event.confidence,
+            "data": event.data,
+            "idempotency_key": key,
+        })
+
+    async def ingest():
+        created = {}
+        if rows:
+            stmt = (
+                sqlite_insert(DetectionEventDB)
+                .on_conflict_do_nothing(index_elements=["idempotency_key"])
+                .returning(DetectionEventDB.id, DetectionEventDB.idempotency_key)
+            )
+            result = await db.execute(stmt, rows)
+            created = {key: event_id for event_id, key in result.all()}
+        skipped = [key for key in row_index if key not in created]
+        existing = {}
+        for start in range(0, len(skipped), 500):
+            chunk = skipped[start:start + 500]
+            result = await db.execute(
+                select(DetectionEventDB.idempotency_key, DetectionEventDB.id)
+                .where(DetectionEventDB.idempotency_key.in_(chunk))
+            )
+            existing.update(result.all())
+        await db.commit()
+        return created, existing
+
+    created, existing = await with_timeout(ingest())
+    for key, i in row_index.items():
+        if key in created:
+            results[i] = {"index": i, "idempotency_key": key, "status": "created", "id": created[key]}
+        else:
+            results[i] = {"index": i, "idempotency_key": key, "status": "duplicate", "id": existing.get(key)}
+    for i, key in repeats:
+        results[i] = {"index": i, "idempotency_key": key, "status": "duplicate", "id": created.get(key, existing.get(key))}
+
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    logger.info("📥 Bulk ingest: %s", counts)
+    return {**counts, "results": results}
+
 # READ: List all events, or limit
 @router.get("/events/", response_model=list[DetectionEvent])
-def list_detection_events(db: Session = Depends(get_db), limit: int = 100):
-    events = db.query(DetectionEventDB).order_by(DetectionEventDB.timestamp.desc()).limit(limit).all()
+async def list_detection_events(db: AsyncSession = Depends(get_db), limit: int = 100):
+    events = await with_timeout(_recent_events(db, limit))
     return [db_to_pydantic(e) for e in events]
 
+# READ: Alert pipeline latency percentiles (declared before /events/{event_id})
+@router.get("/events/latency", response_model=dict)
+async def get_event_latency(db: AsyncSession = Depends(get_db), limit: int = 500):
+    """Capture-to-stage latency percentiles (ms) over the most recent traced events."""
+    result = await with_timeout(db.execute(
+        select(DetectionEventDB.data)
+        .filter(DetectionEventDB.data.isnot(None))
+        .order_by(DetectionEventDB.timestamp.desc())
+        .limit(limit)
+    ))
+    rows = result.all()
+    traces = [row.data.get("trace") for row in rows if isinstance(row.data, dict) and row.data.get("trace")]
+    return {"events": len(traces), "stages": summarize_traces(traces)}
+
+# READ: Stream events for analysis (declared before /events/{event_id})
+@router.get("/events/export")
+async def export_detection_events(
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    types: Optional[str] = None,
+    device_id: Optional[str] = None,
+):
+    """
+    Stream detection_events as NDJSON, CSV or Parquet (when pyarrow is installed),
+    oldest first. Filters: start <= timestamp < end, comma-separated detection
+    types, device id. Rows are read in chunks from a server-side cursor.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    filename = f"detection_events_{datetime.now():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        export_events(format, start, end, type_list, device_id),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # READ: Get single event by ID
 @router.get("/events/{event_id}", response_model=DetectionEvent)
-def get_detection_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(DetectionEventDB).filter(DetectionEventDB.id == event_id).first()
+async def get_detection_event(event_id: int, db: AsyncSession = Depends(get_db)):
+    event = await with_timeout(_get_event(db, event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Detection event not found")
     return db_to_pydantic(event)
 
+# READ: Evidence images saved at alert time
+def _evidence_response(path: str) -> FileResponse:
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No evidence image for this event")
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": EVIDENCE_CACHE_CONTROL})
+
+@router.get("/events/{event_id}/thumbnail")
+async def get_event_thumbnail(event_id: int):
+    return _evidence_response(evidence_store.thumbnail_path(event_id))
+
+@router.get("/events/{event_id}/crops/{index}")
+async def get_event_crop(event_id: int, index: int):
+    return _evidence_response(evidence_store.crop_path(event_id, index))
+
 # UPDATE: Patch event (example: mark as reviewed)
 @router.patch("/events/{event_id}", response_model=DetectionEvent)
-def update_detection_event(event_id: int, event_patch: DetectionEvent, db: Session = Depends(get_db)):
-    event = db.query(DetectionEventDB).filter(DetectionEventDB.id == event_id).first()
+async def update_detection_event(event_id: int, event_patch: DetectionEvent, db: AsyncSession = Depends(get_db)):
+    event = await with_timeout(_get_event(db, event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     # Only update provided fields
@@ -99,28 +295,31 @@ def update_detection_event(event_id: int, event_patch: DetectionEvent, db: Sessi
     for field, value in patch_dict.items():
         if field != 'id':  # Don't update ID
             setattr(event, field, value)
-    db.commit()
-    db.refresh(event)
+    await with_timeout(db.commit())
+    await db.refresh(event)
     return db_to_pydantic(event)
 
 # DELETE: Remove detection event
 @router.delete("/events/{event_id}", response_model=dict)
-def delete_detection_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(DetectionEventDB).filter(DetectionEventDB.id == event_id).first()
+async def delete_detection_event(event_id: int, db: AsyncSession = Depends(get_db)):
+    event = await with_timeout(_get_event(db, event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-    db.delete(event)
-    db.commit()
+    await db.delete(event)
+    await with_timeout(db.commit())
+    # File removal runs on the evidence thread, off the event loop
+    evidence_store.delete_async(event_id)
     return {"status": "deleted", "id": event_id}
 
 # DELETE: Clear all detection events
 @router.delete("/events/clear", response_model=dict)
-def clear_all_events(db: Session = Depends(get_db)):
+async def clear_all_events(db: AsyncSession = Depends(get_db)):
     try:
-        count = db.query(DetectionEventDB).count()
-        db.query(DetectionEventDB).delete()
-        db.commit()
+        count = (await with_timeout(db.execute(select(func.count()).select_from(DetectionEventDB)))).scalar_one()
+        await with_timeout(db.execute(delete(DetectionEventDB)))
+        await with_timeout(db.commit())
+        evidence_store.delete_async()
         return {"status": "success", "message": f"Cleared {count} event(s)", "count": count}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to clear events: {str(e)}")
@@ -0,0 +1,29 @@
+# app/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import registry
+from app.services.ipc import daemon_mode, daemon_client
+
+router = APIRouter(tags=["Metrics"])
+
+
+def _daemon_up(up: bool) -> str:
+    return ("# HELP farm_capture_daemon_up Whether this worker reached the capture daemon for this scrape\n"
+            "# TYPE farm_capture_daemon_up gauge\n"
+            f"farm_capture_daemon_up {int(up)}\n")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of capture, inference and alert metrics."""
+    if not daemon_mode():
+        body = registry.render()
+    else:
+        # With a capture daemon the counters that matter are the daemon's; while it is
+        # down or restarting, serve this worker's own metrics and say so
+        try:
+            body = daemon_client.call("metrics") + _daemon_up(True)
+        except (OSError, RuntimeError):
+            body = registry.render() + _daemon_up(False)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -4,7 +4,7 @@ from app.services.siren_control import siren_controller
 router = APIRouter(prefix="/siren", tags=["siren"])
 
 @router.post("/set_state/{state}")
-async def set_siren_state(state: str):
+def set_siren_state(state: str):
     """Manually controls the siren state via MQTT ('on' or 'off')."""
     if state.lower() not in ["on", "off"]:
         return {"status": "error", "message": "State must be 'on' or 'off'"}
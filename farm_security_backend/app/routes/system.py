@@ -1,8 +1,15 @@
 # app/routes/system.py
-from fastapi import APIRouter, HTTPException
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
 from pydantic import BaseModel
-from app.services.detection import set_system_state, get_system_state, SYSTEM_ACTIVE
+from app.services.model_registry import model_registry
+from app.services.ipc import daemon_mode
 from app.services.siren_control import siren_controller, get_siren_state
+from app.services.state_store import state_store
+from app.services.status_snapshot import status_snapshot
 
 router = APIRouter(prefix="/api/system", tags=["System"])
 
@@ -11,15 +18,13 @@ class SystemStateRequest(BaseModel):
 
 class SirenStateRequest(BaseModel):
     action: str  # "ON" or "OFF"
+    zone: Optional[str] = None  # only the sirens in this zone
+    camera_id: Optional[str] = None  # only the sirens mapped to this camera
 
-@router.get("/status")
-async def get_status():
-    """Returns the current security system status."""
-    # Import here to avoid circular imports
-    from app.routes.camera import get_camera_connection_status
-    
-    system_active = get_system_state()
-    camera_connected = get_camera_connection_status()
+def build_system_status(state: dict) -> dict:
+    """System status payload from a state_store snapshot."""
+    system_active = state["system_active"]
+    camera_connected = state["camera_connected"]
     
     # Build status message
     if system_active and camera_connected:
@@ -37,15 +42,41 @@ async def get_status():
         "status_display": status_display,
         "message": status_msg,
         "camera_connected": camera_connected,
-        "siren_state": "ON" if get_siren_state() else "OFF"
+        "siren_state": "ON" if state["siren_on"] else "OFF",
+        "model_ready": state["model_ready"],
     }
 
+def build_dashboard(state: dict) -> dict:
+    """Everything the dashboard polls for, in one payload."""
+    return {
+        "system": build_system_status(state),
+        "camera": status_snapshot.build("camera", state),
+        "siren": {"siren_state": "ON" if state["siren_on"] else "OFF"},
+        "reactivate_at": state["reactivate_at"],
+        "armed_cameras": state["armed_cameras"],
+        "last_event": state["last_event"],
+    }
+
+status_snapshot.register("system", build_system_status)
+status_snapshot.register("dashboard", build_dashboard)
+
+@router.get("/status")
+async def get_status(request: Request):
+    """Returns the current security system status (cached; supports If-None-Match)."""
+    return status_snapshot.respond(request, "system")
+
+@router.get("/dashboard")
+async def get_dashboard(request: Request):
+    """Combined system, camera and siren status plus the newest event, for one poll."""
+    return status_snapshot.respond(request, "dashboard")
+
 @router.post("/toggle")
-async def toggle_system(request: SystemStateRequest):
+def toggle_system(request: SystemStateRequest):
     """5. Endpoint to manually turn the security system ON/OFF."""
     if request.state not in ['ON', 'OFF']:
         raise HTTPException(status_code=400, detail="State must be ON or OFF.")
     
+    from app.services.detection import set_system_state  # not imported at startup (pulls in cv2)
     new_state_bool = request.state == 'ON'
     final_state = set_system_state(new_state_bool)
     return {
@@ -58,8 +89,9 @@ class SystemEnabledRequest(BaseModel):
     enabled: bool
 
 @router.post("/system")
-async def toggle_system_compat(request: SystemEnabledRequest):
+def toggle_system_compat(request: SystemEnabledRequest):
     """Compatibility endpoint: /system (frontend expects this with { enabled: bool })"""
+    from app.services.detection import set_system_state
     final_state = set_system_state(request.enabled)
     return {
         "success": True,
@@ -67,12 +99,12 @@ async def toggle_system_compat(request: SystemEnabledRequest):
     }
 
 @router.post("/siren/toggle")
-async def toggle_siren_manual(request: SirenStateRequest):
+def toggle_siren_manual(request: SirenStateRequest):
     """3. Manual ON/OFF control for the siren."""
     if request.action not in ['ON', 'OFF']:
         raise HTTPException(status_code=400, detail="Action must be ON or OFF.")
     
-    success = siren_controller.toggle_siren(request.action)
+    success = siren_controller.toggle_siren(request.action, camera_id=request.camera_id, zone=request.zone)
     return {
         "success": success,
         "siren_state": request.action.upper(),
@@ -85,3 +117,49 @@ async def get_siren_status():
     return {
         "siren_state": "ON" if get_siren_state() else "OFF"
     }
+
+@router.get("/ready")
+async def get_readiness():
+    """Readiness probe: 200 once the detector is loaded and warmed up, 503 until then."""
+    state = state_store.snapshot()
+    body = {"ready": state["model_ready"], "camera_connected": state["camera_connected"]}
+    if not daemon_mode():
+        # With a capture daemon the model lives there; model_ready is mirrored from it
+        status = model_registry.status()
+        body["model"] = {
+            "path": status["active"]["path"] if status["active"] else None,
+            "loading": status["loading"],
+            "error": status["last_error"],
+        }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@router.get("/siren/devices")
+def get_siren_devices():
+    """Every siren with its zone, cameras, health and last ack latency."""
+    return siren_controller.status()
+
+@router.get("/events")
+async def stream_state_changes(request: Request):
+    """Server-sent events: current state first, then every change to it."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_change(changes: dict, version: int):
+        loop.call_soon_threadsafe(queue.put_nowait, dict(changes, version=version))
+
+    unsubscribe = state_store.subscribe(on_change)
+
+    async def events():
+        try:
+            yield f"event: state\ndata: {json.dumps(state_store.snapshot())}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: change\ndata: {json.dumps(change)}\n\n"
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,133 @@
+# app/services/alert_pipeline.py
+import time
+import logging
+import threading
+
+import numpy as np
+
+from app.services.detection import detector, log_detection_event, DEFAULT_CAMERA_ID
+from app.services.siren_control import siren_controller
+from app.services.push_notification import send_onesignal_notification
+from app.services.temporal_filter import TemporalVoter, temporal_voter, severity_at_least
+from app.services.tracing import FrameTrace
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+DETECTION_COOLDOWN = 10  # seconds between alerts of the same type
+SIREN_AUTO_OFF_SECONDS = 60
+
+
+class AlertPipeline:
+    """
+    Detection -> temporal confirmation -> cooldown -> siren / push / DB for
+    one frame. The side effects are injectable so the same path can run
+    against stub sinks (benchmark, replay) as well as real hardware, and
+    so is the clock the cooldown is measured on (replays pass clip time).
+    """
+
+    def __init__(self, siren=None, notify=None, log_event=None, voter: TemporalVoter = None,
+                 cooldown: float = DETECTION_COOLDOWN, siren_auto_off: float = SIREN_AUTO_OFF_SECONDS,
+                 detect=None, clock=time.time):
+        self.siren = siren or siren_controller.toggle_siren
+        self.notify = notify or send_onesignal_notification
+        self.log_event = log_event or log_detection_event
+        self.voter = voter or temporal_voter
+        self.detect = detect or detector.run_detection
+        self.cooldown = cooldown
+        self.siren_auto_off = siren_auto_off
+        self.clock = clock
+        self._last_alert_time = None
+        self._last_alert_type = None
+        self._last_alert_severity = None
+        self._lock = threading.Lock()
+
+    def process(self, frame: np.ndarray, trace: FrameTrace = None, camera_id: str = DEFAULT_CAMERA_ID) -> tuple:
+        """Run one detection pass. Returns (detections, decision); decision is None unless confirmed."""
+        trace = trace or FrameTrace()
+        try:
+            detections = self.detect(frame, camera_id)
+        except Exception as e:
+            logger.error("⚠️  Detection error: %s", e)
+            detections = []
+        trace.mark("detected")
+
+        # Require N-of-M confirmation before acting on a detection
+        decision = self.voter.update(camera_id, detections)
+        if decision is not None:
+            self._alert(decision, trace, camera_id, frame, detections)
+        return detections, decision
+
+    def _alert(self, decision: dict, trace: FrameTrace, camera_id: str, frame: np.ndarray = None, detections: list = None):
+        detection_type = decision['label']
+        confidence = decision['confidence']
+        severity = decision['severity']
+        current_time = self.clock()
+
+        # Check cooldown - prevent spam notifications for same detection type.
+        # An escalation (e.g. log -> siren) is never held back by a lower-severity alert.
+        with self._lock:
+            escalated = (self._last_alert_severity is not None and severity != self._last_alert_severity and
+                         severity_at_least(severity, self._last_alert_severity))
+            should_alert = (self._last_alert_type != detection_type or escalated or
+                            current_time - self._last_alert_time >= self.cooldown)
+            if should_alert:
+                self._last_alert_time = current_time
+                self._last_alert_type = detection_type
+                self._last_alert_severity = severity
+
+        if not should_alert:
+            logger.info("👁️  Detection: %s (confidence: %.2f) - Cooldown active", detection_type, confidence)
+            return
+
+        logger.warning(
+            "🚨 ALERT! Threat Detected: %s (confidence: %.2f, severity: %s, %d/%d frames)",
+            detection_type, confidence, severity, decision['hits'], self.voter.window_size,
+            extra={"camera": camera_id, "no_rate_limit": True},
+        )
+        metrics.ALERTS.inc(camera=camera_id, label=detection_type, severity=severity)
+        trace.mark("decided")
+
+        # A. Trigger Siren (AI-triggered) - only for siren-level confidence
+        siren_success = False
+        if severity_at_least(severity, "siren"):
+            started = time.perf_counter()
+            # Sirens in this camera's zone; they switch themselves off as a group
+            siren_success = self.siren("ON", camera_id=camera_id, auto_off=self.siren_auto_off)
+            metrics.ALERT_DISPATCH_SECONDS.observe(time.perf_counter() - started, target="siren", success=siren_success)
+            if siren_success:
+                trace.mark("siren_ack")
+
+        # B. Send Notification - notify-level and above
+        notification_success = False
+        if severity_at_least(severity, "notify"):
+            started = time.perf_counter()
+            notification_success = self.notify(
+                title="🚨 Intrusion Alert!",
+                message=f"ALERT! {detection_type.upper()} DETECTED in your farm. Immediate action required!"
+            )
+            metrics.ALERT_DISPATCH_SECONDS.observe(time.perf_counter() - started, target="onesignal", success=notification_success)
+            if notification_success:
+                trace.mark("push_ack")
+
+        for stage, ms in trace.stages.items():
+            metrics.PIPELINE_STAGE_SECONDS.observe(ms / 1000, stage=stage)
+
+        # C. Log event to database (no video; thumbnail/crops are saved in the background)
+        started = time.perf_counter()
+        event_id = self.log_event(
+            detection_type=detection_type,
+            siren_activated=siren_success,
+            notified=notification_success,
+            video_filename=None,
+            confidence=confidence,
+            device_id=camera_id,
+            data={"trace": trace.to_dict(), "severity": severity},
+            frame=frame,
+            detections=detections,
+        )
+        metrics.ALERT_DISPATCH_SECONDS.observe(time.perf_counter() - started, target="db", success=event_id is not None)
+
+
+# Pipeline wired to the real siren, OneSignal and database
+alert_pipeline = AlertPipeline()
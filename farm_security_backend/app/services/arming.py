@@ -0,0 +1,164 @@
+# app/services/arming.py
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from app.services.inference import parse_hours, in_window
+from app.services.model_registry import model_registry, MODELS_DIR
+from app.services.detection_cache import detection_cache
+from app.services.scheduler import scheduler
+from app.services.state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+# --- Arming schedules ---
+# ARMING_SCHEDULE is JSON (inline, or a path to a .json file) mapping camera
+# ids ("*" = any other camera) to an ordered list of profiles:
+#
+#   {"*": [
+#       {"name": "night", "hours": "18:00-06:00", "model": "night.onnx",
+#        "confidence_threshold": 0.25, "frame_skip": 2},
+#       {"name": "day", "hours": "06:00-18:00", "armed": false}
+#   ]}
+#
+# The first profile whose window contains the current time applies; no match
+# means disarmed. Omitted fields fall back to the global settings, and
+# relative model paths are resolved against app/models. Without a schedule
+# every camera is always armed, as before.
+ARMING_SCHEDULE = os.getenv("ARMING_SCHEDULE", "").strip()
+ARMING_IDLE_FPS = float(os.getenv("ARMING_IDLE_FPS", "2"))  # capture rate while disarmed
+
+ALWAYS_ARMED = {"name": "always"}
+
+
+def load_schedule(value: str) -> dict:
+    """Parse ARMING_SCHEDULE (inline JSON or a file path) into {camera: [profiles]}."""
+    if not value:
+        return {}
+    try:
+        if value.endswith(".json") and os.path.exists(value):
+            with open(value) as f:
+                schedule = json.load(f)
+        else:
+            schedule = json.loads(value)
+    except (OSError, ValueError) as e:
+        logger.error("❌ Invalid ARMING_SCHEDULE, cameras stay armed: %s", e)
+        return {}
+
+    parsed = {}
+    for camera_id, profiles in schedule.items():
+        parsed[camera_id] = []
+        for i, profile in enumerate(profiles):
+            profile = dict(profile)
+            profile.setdefault("name", f"{camera_id}-{i}")
+            hours = profile.get("hours")
+            profile["_window"] = parse_hours(hours) if hours else None
+            if hours and profile["_window"] is None:
+                logger.error("❌ Bad hours %r in arming profile %s, skipping", hours, profile["name"])
+                continue
+            if profile.get("model") and not os.path.isabs(profile["model"]):
+                profile["model"] = os.path.join(MODELS_DIR, profile["model"])
+            parsed[camera_id].append(profile)
+    return parsed
+
+
+class ArmingScheduler:
+    """
+    Resolves the active arming profile of every scheduled camera. Profiles
+    only change at window boundaries, so instead of checking the clock per
+    frame the result is cached and re-evaluated by one entry on the shared
+    scheduler at the next boundary.
+    """
+
+    def __init__(self, schedule: dict = None):
+        self._schedule = schedule or {}
+        self._current = {}  # camera_id -> profile dict, or None when disarmed
+        self._next_call = None
+        self._lock = threading.Lock()
+        # Nothing is resolved or preloaded until start(), which only the
+        # process running detection calls; until then every camera is armed
+
+    def profile_for(self, camera_id: str):
+        """Active profile for `camera_id`, or None if it is disarmed right now."""
+        if camera_id in self._current:
+            return self._current[camera_id]
+        return self._current.get("*", ALWAYS_ARMED)
+
+    def _resolve(self, profiles: list, now: datetime):
+        for profile in profiles:
+            if profile["_window"] is None or in_window(profile["_window"], now):
+                return profile if profile.get("armed", True) else None
+        return None
+
+    def _next_boundary(self, now: datetime):
+        """Epoch time of the next window start/end across all profiles, or None."""
+        minute = now.hour * 60 + now.minute
+        deltas = []
+        for profiles in self._schedule.values():
+            for profile in profiles:
+                if profile["_window"] is None:
+                    continue
+                for edge in profile["_window"]:
+                    deltas.append((edge - minute - 1) % (24 * 60) + 1)
+        if not deltas:
+            return None
+        boundary = now.replace(second=0, microsecond=0) + timedelta(minutes=min(deltas))
+        return boundary.timestamp()
+
+    def evaluate(self, reschedule: bool = True):
+        """Recompute every camera's profile and (optionally) schedule the next check."""
+        now = datetime.now()
+        with self._lock:
+            for camera_id, profiles in self._schedule.items():
+                profile = self._resolve(profiles, now)
+                previous = self._current.get(camera_id, ALWAYS_ARMED)
+                self._current[camera_id] = profile
+                if profile is previous:
+                    continue
+                name = profile["name"] if profile else None
+                logger.warning("🛡️  Camera %s arming profile: %s", camera_id, name or "disarmed")
+                state_store.set_camera_armed(camera_id, name)
+                # Results cached under the old threshold/model no longer apply
+                detection_cache.clear()
+                if profile and profile.get("model"):
+                    model_registry.variant(profile["model"])
+
+            if reschedule:
+                if self._next_call is not None:
+                    self._next_call.cancel()
+                when = self._next_boundary(now)
+                self._next_call = scheduler.call_at(when, self.evaluate) if when else None
+
+    def profile_models(self) -> set:
+        """Model paths set by any profile."""
+        return {p["model"] for profiles in self._schedule.values() for p in profiles if p.get("model")}
+
+    def start(self):
+        """
+        Resolve the current profiles, preload their models and re-evaluate
+        at window boundaries (call once at startup, in the detection process).
+        """
+        self.evaluate()
+
+    def status(self) -> dict:
+        return {
+            "schedule": {
+                camera_id: [{k: v for k, v in p.items() if not k.startswith("_")} for p in profiles]
+                for camera_id, profiles in self._schedule.items()
+            },
+            "current": {
+                camera_id: profile["name"] if profile else None
+                for camera_id, profile in self._current.items()
+            },
+            "next_evaluation": (
+                datetime.fromtimestamp(self._next_call.when).isoformat()
+                if self._next_call is not None else None
+            ),
+            "idle_fps": ARMING_IDLE_FPS,
+        }
+
+
+# Global instance
+arming_scheduler = ArmingScheduler(load_schedule(ARMING_SCHEDULE))
@@ -0,0 +1,162 @@
+# app/services/camera_control.py
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+from app.services.inference import DEFAULT_CAMERA_ID
+from app.services.scheduler import scheduler
+from app.services import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Closed-loop resolution/quality control ---
+# Cameras idle at a small framesize and strong JPEG compression. Motion (a
+# thumbnail frame difference) or a detection switches the camera to the
+# active settings through the firmware's /control?var=&val= endpoint; it
+# drops back to idle CAMERA_ACTIVE_HOLD seconds after the last trigger.
+# Every change is confirmed by reading /status back. Framesize values are
+# the firmware's framesize_t (5 = QVGA 320x240, 8 = VGA 640x480); quality
+# is 0-63 with lower meaning better.
+CAMERA_CONTROL_ENABLED = os.getenv("CAMERA_CONTROL_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+CAMERA_IDLE_FRAMESIZE = int(os.getenv("CAMERA_IDLE_FRAMESIZE", "5"))
+CAMERA_IDLE_QUALITY = int(os.getenv("CAMERA_IDLE_QUALITY", "30"))
+CAMERA_ACTIVE_FRAMESIZE = int(os.getenv("CAMERA_ACTIVE_FRAMESIZE", "8"))
+CAMERA_ACTIVE_QUALITY = int(os.getenv("CAMERA_ACTIVE_QUALITY", "12"))
+CAMERA_ACTIVE_HOLD = float(os.getenv("CAMERA_ACTIVE_HOLD", "30"))  # seconds
+CAMERA_MOTION_THRESHOLD = float(os.getenv("CAMERA_MOTION_THRESHOLD", "0.02"))  # fraction of changed pixels
+CAMERA_RETRY_SECONDS = float(os.getenv("CAMERA_RETRY_SECONDS", "10"))
+# "CAM-ID=http://ip,CAM-ID2=http://ip2"; defaults to ESP32_CAM_IP for the default camera
+CAMERA_CONTROL_URLS = os.getenv("CAMERA_CONTROL_URLS", "").strip()
+
+MODES = {
+    "idle": {"framesize": CAMERA_IDLE_FRAMESIZE, "quality": CAMERA_IDLE_QUALITY},
+    "active": {"framesize": CAMERA_ACTIVE_FRAMESIZE, "quality": CAMERA_ACTIVE_QUALITY},
+}
+
+_THUMB_SIZE = (64, 48)
+_PIXEL_DELTA = 25  # grey levels a thumbnail pixel must change by to count as motion
+
+
+def motion_fraction(previous: np.ndarray, current: np.ndarray) -> float:
+    """Fraction of thumbnail pixels that changed noticeably between two frames."""
+    import cv2  # imported on first frame, not at API startup
+    return float(np.count_nonzero(cv2.absdiff(previous, current) > _PIXEL_DELTA)) / previous.size
+
+
+def _thumbnail(frame: np.ndarray) -> np.ndarray:
+    import cv2
+    small = cv2.resize(frame, _THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+
+class CameraController:
+    """
+    Idle/active settings for one ESP32-CAM. observe() is called from the
+    capture loop and only decides; the HTTP calls run on the shared
+    scheduler's workers so capture never waits on the camera's control port.
+    """
+
+    def __init__(self, camera_id: str, base_url: str, hold: float = CAMERA_ACTIVE_HOLD,
+                 motion_threshold: float = CAMERA_MOTION_THRESHOLD, enabled: bool = CAMERA_CONTROL_ENABLED):
+        self.camera_id = camera_id
+        self.base_url = base_url.rstrip("/")
+        self.hold = hold
+        self.motion_threshold = motion_threshold
+        self.enabled = enabled
+        self.mode = None  # last mode confirmed via /status
+        self.confirmed = {}  # framesize/quality as last read from /status
+        self.last_error = None
+        self._active_until = 0.0
+        self._previous = None
+        self._pending = False
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, frame: np.ndarray, detections: list = None, armed: bool = True):
+        """Feed one captured frame (and detections, when detection ran on it).
+        A disarmed camera always goes to idle settings."""
+        if not self.enabled:
+            return
+        now = time.time()
+        if armed:
+            thumb = _thumbnail(frame)
+            previous, self._previous = self._previous, thumb
+            moved = previous is not None and motion_fraction(previous, thumb) >= self.motion_threshold
+            if moved or detections:
+                self._active_until = now + self.hold
+        else:
+            self._previous = None
+            self._active_until = 0.0
+        desired = "active" if now < self._active_until else "idle"
+
+        with self._lock:
+            if desired == self.mode or self._pending or now < self._retry_at:
+                return
+            self._pending = True
+        scheduler.call_later(0, self._apply, desired)
+
+    def _apply(self, mode: str):
+        settings = MODES[mode]
+        try:
+            for var, val in settings.items():
+                response = requests.get(f"{self.base_url}/control", params={"var": var, "val": val}, timeout=2)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/control {var}={val} returned HTTP {response.status_code}")
+            status = requests.get(f"{self.base_url}/status", timeout=2).json()
+            self.confirmed = {var: status.get(var) for var in settings}
+            if self.confirmed != settings:
+                raise RuntimeError(f"/status reports {self.confirmed}, expected {settings}")
+            self.mode = mode
+            self.last_error = None
+            # The first frame at the new size always differs; don't count it as motion
+            self._previous = None
+            metrics.CAMERA_MODE_CHANGES.inc(camera=self.camera_id, mode=mode, confirmed=True)
+            logger.info("📷 Camera %s -> %s (framesize=%s, quality=%s)", self.camera_id, mode,
+                        settings["framesize"], settings["quality"])
+        except (requests.exceptions.RequestException, ValueError, RuntimeError) as e:
+            self.last_error = str(e)
+            self._retry_at = time.time() + CAMERA_RETRY_SECONDS
+            metrics.CAMERA_MODE_CHANGES.inc(camera=self.camera_id, mode=mode, confirmed=False)
+            logger.warning("⚠️  Camera %s: could not switch to %s: %s", self.camera_id, mode, e)
+        finally:
+            with self._lock:
+                self._pending = False
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "control_url": self.base_url,
+            "mode": self.mode,
+            "confirmed": self.confirmed,
+            "active_until": self._active_until or None,
+            "last_error": self.last_error,
+        }
+
+
+def _parse_control_urls(value: str) -> dict:
+    urls = {}
+    for item in value.split(","):
+        camera_id, sep, url = item.partition("=")
+        if sep and camera_id.strip() and url.strip():
+            urls[camera_id.strip()] = url.strip()
+    if not urls:
+        urls[DEFAULT_CAMERA_ID] = f"http://{os.getenv('ESP32_CAM_IP', '10.18.81.133')}"
+    return urls
+
+
+camera_controllers = {
+    camera_id: CameraController(camera_id, url)
+    for camera_id, url in _parse_control_urls(CAMERA_CONTROL_URLS).items()
+}
+
+
+def get_camera_controller(camera_id: str):
+    """Controller for `camera_id`, or None if the camera has no control URL."""
+    return camera_controllers.get(camera_id)
@@ -1,16 +1,29 @@
 # app/services/detection.py
 import os
 import time
-from threading import Timer, Lock
-from ultralytics import YOLO
+import logging
 import cv2
 import numpy as np
 from datetime import datetime
-from app.services.siren_control import trigger_siren
+from dotenv import load_dotenv
+from app.services.siren_control import siren_controller
+from app.services.state_store import state_store
 from app.services.push_notification import send_onesignal_notification
+from app.services.detection_cache import detection_cache, frame_hash
+from app.services.temporal_filter import temporal_voter, load_severity_thresholds
+from app.services.model_registry import model_registry, select_model_path
+from app.services.inference import infer, tiling_enabled, tile_batch_size, DEFAULT_CAMERA_ID
+from app.services.inference_pool import inference_pool
+from app.services.arming import arming_scheduler
+from app.services.preprocess import preprocessor
+from app.services.ipc import daemon_mode, daemon_client
+from app.services.evidence import evidence_store
+from app.services import metrics
 from app.database import SessionLocal
 from app.models.event import DetectionEventDB
 
+logger = logging.getLogger(__name__)
+
 
 DETECTION_CONFIDENCE_THRESHOLD = float(
     os.getenv("DETECTION_CONFIDENCE_THRESHOLD", "0.3")
@@ -23,139 +36,253 @@ ALLOWED_DETECTION_CLASSES = [
     if c.strip()
 ]
 
-# --- Global System State ---
-SYSTEM_ACTIVE = True
-SYSTEM_LOCK = Lock()
-MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'best.onnx')
+# --- Global System State (held in state_store) ---
+FP32_MODEL_PATH = os.getenv(
+    "DETECTION_MODEL_PATH", os.path.join(os.path.dirname(__file__), '..', 'models', 'best.onnx')
+)
+# int8 = the statically quantized variant built by app/tools/quantize.py
+MODEL_PRECISION = os.getenv("DETECTION_MODEL_PRECISION", "fp32").strip().lower()
+MODEL_PATH = select_model_path(FP32_MODEL_PATH, MODEL_PRECISION)
 TIME_OFF = int(os.getenv('SYSTEM_OFF_DURATION_MINUTES', 60)) * 60
 
-# Load YOLOv8 Model (It's safe to load globally)
-model = None
-try:
-    if os.path.exists(MODEL_PATH):
-        model = YOLO(MODEL_PATH)
-        print(f"✅ YOLOv8 Model Loaded from {MODEL_PATH}")
-        print(f"📋 Model class names: {model.names}")
-        print(f"🎯 Detection threshold: {DETECTION_CONFIDENCE_THRESHOLD}")
-        print(f"✅ Allowed classes: {ALLOWED_DETECTION_CLASSES}")
-    else:
-        print(f"⚠️  WARNING: Model file not found at {MODEL_PATH}. Detection will be disabled.")
-except Exception as e:
-    print(f"❌ CRITICAL: Failed to load YOLOv8 model: {e}")
 
-def auto_reactivate_system():
-    """5. Auto-reactivation after 30 min."""
-    global SYSTEM_ACTIVE
-    with SYSTEM_LOCK:
-        SYSTEM_ACTIVE = True
-    print("\n\n*** SYSTEM AUTO-REACTIVATED ***\n\n")
+def _on_model_swap(handle):
+    # Cached results came from the previous model
+    detection_cache.clear()
+    state_store.set_model_ready(True)
+
+
+def start_model_loading() -> bool:
+    """
+    Load and warm up YOLOv8 through the registry on a background thread, so
+    the API serves requests while it loads; state "model_ready" turns True
+    once detection can run. (API processes in CAPTURE_MODE=daemon leave
+    detection to the capture daemon and never call this.)
+    """
+    logger.info("🎯 Detection threshold: %s", DETECTION_CONFIDENCE_THRESHOLD)
+    logger.info("✅ Allowed classes: %s", ALLOWED_DETECTION_CLASSES)
+    return model_registry.load_async(MODEL_PATH, on_swap=_on_model_swap)
+
+
+def start_inference_pool():
+    """Start the optional worker processes (INFERENCE_WORKERS > 0) on the current model."""
+    if inference_pool.workers <= 0:
+        return
+    ignored = arming_scheduler.profile_models()
+    if ignored:
+        # Workers run one model; profile thresholds still apply (filtering happens here)
+        logger.warning("⚠️  Arming profile models %s are ignored with INFERENCE_WORKERS=%d",
+                       sorted(ignored), inference_pool.workers)
+    inference_pool.start(model_registry.active.path if model_registry.active else MODEL_PATH)
+
+
+def update_detection_config(confidence_threshold: float = None, allowed_classes: list = None,
+                            reload_env: bool = False, severity_thresholds: dict = None) -> dict:
+    """
+    Change detection and alert severity thresholds at runtime (admin endpoint).
+    With reload_env=True, values are re-read from .env first; explicit
+    arguments still take precedence.
+    """
+    global DETECTION_CONFIDENCE_THRESHOLD, ALLOWED_DETECTION_CLASSES
+    if reload_env:
+        load_dotenv(override=True)
+        DETECTION_CONFIDENCE_THRESHOLD = float(os.getenv("DETECTION_CONFIDENCE_THRESHOLD", "0.3"))
+        ALLOWED_DETECTION_CLASSES = [
+            c.strip().lower()
+            for c in os.getenv("DETECTION_ALLOWED_CLASSES", "person,elephant,cow").split(",")
+            if c.strip()
+        ]
+        temporal_voter.set_thresholds(load_severity_thresholds())
+    if severity_thresholds:
+        temporal_voter.set_thresholds(severity_thresholds)
+    if confidence_threshold is not None:
+        DETECTION_CONFIDENCE_THRESHOLD = float(confidence_threshold)
+    if allowed_classes is not None:
+        ALLOWED_DETECTION_CLASSES = [c.strip().lower() for c in allowed_classes if c.strip()]
+    # Cached results were filtered with the old settings
+    detection_cache.clear()
+    logger.info("🎯 Detection config updated: threshold=%s, classes=%s, severity=%s",
+                DETECTION_CONFIDENCE_THRESHOLD, ALLOWED_DETECTION_CLASSES, temporal_voter.thresholds)
+    return get_detection_config()
+
+
+def reload_model(path: str = None) -> bool:
+    """Load, warm up and hot-swap a model in the background (default: MODEL_PATH)."""
+    path = path or MODEL_PATH
+    if not model_registry.load_async(path, on_swap=_on_model_swap):
+        return False  # a load is already running; leave the workers alone too
+    if inference_pool.running:
+        inference_pool.reload(path)
+    return True
+
+
+def get_detection_config() -> dict:
+    """Current runtime detection settings."""
+    return {
+        "confidence_threshold": DETECTION_CONFIDENCE_THRESHOLD,
+        "allowed_classes": ALLOWED_DETECTION_CLASSES,
+        "severity_thresholds": dict(temporal_voter.thresholds),
+    }
 
 def set_system_state(is_active: bool):
     """5. Endpoint to turn security system ON/OFF."""
-    global SYSTEM_ACTIVE
-    with SYSTEM_LOCK:
-        SYSTEM_ACTIVE = is_active
-    
+    if daemon_mode():
+        return daemon_client.call("set_system", active=is_active)
+    state_store.set_system_active(is_active, reactivate_after=TIME_OFF)
+
     if not is_active:
-        print(f"*** SYSTEM DEACTIVATED for {TIME_OFF // 60} minutes ***")
+        logger.warning("*** SYSTEM DEACTIVATED for %d minutes ***", TIME_OFF // 60)
         # Turn off siren when system is deactivated
-        from app.services.siren_control import siren_controller
         siren_controller.toggle_siren("OFF")
-        print("🔇 Siren turned OFF (system deactivated)")
-        # Start the auto-reactivation timer
-        Timer(TIME_OFF, auto_reactivate_system).start()
+        logger.info("🔇 Siren turned OFF (system deactivated)")
     else:
-        print("*** SYSTEM ACTIVATED ***")
-    
-    return SYSTEM_ACTIVE
+        logger.warning("*** SYSTEM ACTIVATED ***")
+
+    return is_active
 
 def get_system_state():
     """Get current system state."""
-    with SYSTEM_LOCK:
-        return SYSTEM_ACTIVE
+    return state_store.get("system_active")
 
-def run_detection(frame: np.ndarray) -> list:
+def _filter_detections(raw: list, names: dict, verbose: bool = True, threshold: float = None) -> list:
+    """Apply the confidence threshold and allowed classes to raw model output."""
+    threshold = DETECTION_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    allowed_classes = ALLOWED_DETECTION_CLASSES
+    detections = []
+    # Per-box lines are DEBUG and rate limited; skip building them entirely otherwise
+    debug = verbose and logger.isEnabledFor(logging.DEBUG)
+    
+    if raw and debug:
+        logger.debug("🔍 Found %d objects in frame", len(raw))
+    for box, confidence, class_id in raw:
+        label = names[class_id]
+        
+        if confidence > threshold:
+            label_lower = label.lower()
+            if any(allowed in label_lower for allowed in allowed_classes):
+                if debug:
+                    logger.debug("   📦 Detected: %s (confidence: %.2f) - accepted", label, confidence)
+                detections.append(
+                    {
+                        "label": label,
+                        "confidence": confidence,
+                        "class_id": class_id,
+                        "box": [float(v) for v in box],
+                    }
+                )
+            elif debug:
+                logger.debug("   📦 Detected: %s (confidence: %.2f) - not in allowed classes %s", label, confidence, allowed_classes)
+        elif debug:
+            logger.debug("   📦 Detected: %s (confidence: %.2f) - below threshold %.2f", label, confidence, threshold)
+    
+    # Highest confidence first so callers can use detections[0]
+    detections.sort(key=lambda d: d["confidence"], reverse=True)
+    return detections
+
+
+def run_detection(frame: np.ndarray, camera_id: str = None) -> list:
     """
     Run YOLOv8 detection on a frame.
-    Returns list of detections with 'label' and 'confidence' keys.
+    Returns list of detections with 'label', 'confidence', 'class_id' and 'box' keys.
+    Uses tiled inference when enabled for `camera_id` (see tiling_enabled), and
+    the model/threshold of the camera's arming profile when it sets them (the
+    inference pool always runs its own model; see start_inference_pool).
     """
-    if model is None:
-        print("❌ Model is None - cannot run detection")
+    profile = arming_scheduler.profile_for(camera_id or DEFAULT_CAMERA_ID) or {}
+    model = model_registry.active  # one read: a concurrent swap can't change it mid-frame
+    if profile.get("model"):
+        model = model_registry.variant(profile["model"]) or model
+    use_pool = inference_pool.enabled
+    if model is None and not use_pool:
+        if not model_registry.loading:  # still starting up is not an error
+            logger.error("❌ Model is None - cannot run detection")
         return []
     
     try:
-        results = model(frame, verbose=False)
-        detections = []
-        
-        if results and len(results) > 0:
-            if results[0].boxes is not None and len(results[0].boxes) > 0:
-                print(f"🔍 Found {len(results[0].boxes)} objects in frame")
-                for box in results[0].boxes:
-                    class_id = int(box.cls.item())
-                    confidence = float(box.conf.item())
-                    label = model.names[class_id]
-                    
-                    print(f"   📦 Detected: {label} (confidence: {confidence:.2f}, threshold: {DETECTION_CONFIDENCE_THRESHOLD})")
-                    
-                    if confidence > DETECTION_CONFIDENCE_THRESHOLD:
-                        label_lower = label.lower()
-                        print(f"      Checking if '{label_lower}' matches allowed classes: {ALLOWED_DETECTION_CLASSES}")
-                        if any(allowed in label_lower for allowed in ALLOWED_DETECTION_CLASSES):
-                            print(f"      ✅ MATCH! Adding to detections")
-                            detections.append(
-                                {
-                                    "label": label,
-                                    "confidence": confidence,
-                                    "class_id": class_id,
-                                }
-                            )
-                        else:
-                            print(f"      ❌ No match - filtered out")
-                    else:
-                        print(f"      ❌ Below confidence threshold")
-            else:
-                # No detections in this frame - this is normal
-                pass
+        model_registry.observe(frame)
+        tiled = tiling_enabled(camera_id)
+        mode = "pool" if use_pool else ("tiled" if tiled else "single")
+        started = time.perf_counter()
+        if use_pool:
+            # Inference in a worker process (see inference_pool)
+            raw, names = inference_pool.infer(frame, tiled), inference_pool.names
+        else:
+            raw, names = infer(model, frame, tiled), model.names
+        metrics.INFERENCE_SECONDS.observe(time.perf_counter() - started, mode=mode)
+        metrics.INFERENCE_BATCH_SIZE.observe(tile_batch_size(frame.shape) if tiled else 1, mode=mode)
+        detections = _filter_detections(raw, names, threshold=profile.get("confidence_threshold"))
+        for det in detections:
+            metrics.DETECTIONS.inc(camera=camera_id or DEFAULT_CAMERA_ID, label=det["label"])
         
         if detections:
-            print(f"✅ Returning {len(detections)} valid detection(s)")
+            logger.debug("✅ Returning %d valid detection(s)", len(detections))
         
+        model_registry.submit_shadow(
+            frame,
+            {d["label"] for d in detections},
+            lambda shadow, f: _filter_detections(infer(shadow, f, tiling_enabled(camera_id)), shadow.names, verbose=False),
+        )
         return detections
     except Exception as e:
-        print(f"❌ Detection error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Detection error: %s", e)
         return []
 
-def log_detection_event(detection_type: str, siren_activated: bool, notified: bool, video_filename: str = None, confidence: float = None):
-    """Log a detection event to the database."""
+def log_detection_event(detection_type: str, siren_activated: bool, notified: bool, video_filename: str = None, confidence: float = None, device_id: str = None, data: dict = None, frame: np.ndarray = None, detections: list = None):
+    """
+    Log a detection event to the database.
+    With `frame`, a thumbnail and crops of the detection boxes are saved in the
+    background (see evidence) and their count is recorded under data["evidence"].
+    """
+    boxes = evidence_store.select_boxes(detections, detection_type) if frame is not None else []
+    if frame is not None:
+        data = dict(data or {}, evidence={"crops": len(boxes)})
     try:
         db = SessionLocal()
         try:
             event = DetectionEventDB(
                 timestamp=datetime.now(),
-                device_id="ESP32-CAM-01",
+                device_id=device_id or DEFAULT_CAMERA_ID,
                 detection_type=detection_type,
-                
                 siren_activated=siren_activated,
                 notified=notified,
-                
+                video_filename=video_filename,
+                confidence=confidence,
+                data=data,
             )
             db.add(event)
             db.commit()
             db.refresh(event)
-            print(f"✅ Event logged: {detection_type} at {event.timestamp}")
+            logger.info("✅ Event logged: %s at %s", detection_type, event.timestamp)
+            if frame is not None:
+                evidence_store.save_async(event.id, frame, boxes)
+            state_store.record_event(event.id, detection_type, event.timestamp.isoformat())
             return event.id
         finally:
             db.close()
     except Exception as e:
-        print(f"❌ Error logging event: {e}")
+        logger.error("❌ Error logging event: %s", e)
         return None
 
 # For backward compatibility, provide a detector object with run_detection as an instance method
 class Detector:
-    def run_detection(self, frame: np.ndarray) -> list:
-        """Wrapper method that calls the module-level run_detection function."""
-        return run_detection(frame)
+    def run_detection(self, frame: np.ndarray, camera_id: str = None) -> list:
+        """
+        Wrapper around the module-level run_detection function.
+        Frames go through day/night preprocessing (see preprocess) first;
+        near-duplicate frames (see detection_cache) then reuse the previous result.
+        """
+        camera_id = camera_id or DEFAULT_CAMERA_ID
+        processed = preprocessor.process(frame, camera_id)
+        if not detection_cache.enabled_for(camera_id):
+            return run_detection(processed, camera_id)
+        # Results differ with tiling and with the brightness correction applied
+        key = frame_hash(frame)
+        variant = (tiling_enabled(camera_id), preprocessor.mode(camera_id))
+        cached = detection_cache.lookup(camera_id, key, variant)
+        if cached is not None:
+            return cached
+        detections = run_detection(processed, camera_id)
+        detection_cache.store(camera_id, key, detections, variant)
+        return detections
 
 detector = Detector()
\ No newline at end of file
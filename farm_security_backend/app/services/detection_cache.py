@@ -0,0 +1,120 @@
+# app/services/detection_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Snapshot-mode cameras often return byte-identical or near-identical frames.
+# Frames are keyed by a 64-bit difference hash (dHash) of a 9x8 grayscale
+# thumbnail; a lookup hits when a cached hash for the same camera is within
+# DETECTION_CACHE_MAX_DISTANCE bits and younger than DETECTION_CACHE_TTL.
+#
+# A 9x8 hash barely moves for a small or distant animal, so by default only
+# frames that came from the snapshot fallback are cached (mode "snapshot");
+# "all" caches streamed frames too, "off" disables the cache.
+DETECTION_CACHE_MODE = os.getenv("DETECTION_CACHE_MODE", "snapshot").strip().lower()
+DETECTION_CACHE_ENABLED = DETECTION_CACHE_MODE in ("snapshot", "all")
+DETECTION_CACHE_TTL = float(os.getenv("DETECTION_CACHE_TTL", "2.0"))  # seconds
+DETECTION_CACHE_MAX_DISTANCE = int(os.getenv("DETECTION_CACHE_MAX_DISTANCE", "4"))  # Hamming bits
+DETECTION_CACHE_SIZE = int(os.getenv("DETECTION_CACHE_SIZE", "8"))  # entries per camera
+
+_BIT_WEIGHTS = (1 << np.arange(64, dtype=np.uint64)).astype(np.uint64)
+
+
+def frame_hash(frame: np.ndarray) -> int:
+    """64-bit difference hash of a frame (cheap: one 9x8 resize + 64 compares)."""
+    import cv2  # imported on first frame, not at API startup
+    small = cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).ravel().astype(np.uint64)
+    return int((bits * _BIT_WEIGHTS).sum())
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class DetectionCache:
+    """Per-camera LRU of recent (hash -> detections) with a TTL."""
+
+    def __init__(self, size: int = DETECTION_CACHE_SIZE, ttl: float = DETECTION_CACHE_TTL,
+                 max_distance: int = DETECTION_CACHE_MAX_DISTANCE):
+        self.size = size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = {}  # camera_id -> OrderedDict[(variant, hash), (stored_at, detections)]
+        self._snapshot_cameras = set()  # cameras whose current frames come from /capture
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set_source(self, camera_id: str, snapshot: bool):
+        """Record whether `camera_id`'s latest frame came from the snapshot endpoint."""
+        if snapshot:
+            self._snapshot_cameras.add(camera_id)
+        else:
+            self._snapshot_cameras.discard(camera_id)
+
+    def enabled_for(self, camera_id: str) -> bool:
+        if DETECTION_CACHE_MODE == "all":
+            return True
+        return DETECTION_CACHE_MODE == "snapshot" and camera_id in self._snapshot_cameras
+
+    def lookup(self, camera_id: str, key: int, variant: tuple = ()):
+        """
+        Return cached detections for a near-duplicate frame, or None. `variant`
+        (tiling, preprocessing state, ...) must match exactly.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(camera_id)
+            if entries:
+                # Drop expired entries (oldest first)
+                for k in [k for k, (ts, _) in entries.items() if now - ts > self.ttl]:
+                    del entries[k]
+                for k, (_, detections) in reversed(entries.items()):
+                    if k[0] == variant and hamming(k[1], key) <= self.max_distance:
+                        entries.move_to_end(k)
+                        self.hits += 1
+                        return [dict(d) for d in detections]
+            self.misses += 1
+            return None
+
+    def store(self, camera_id: str, key: int, detections: list, variant: tuple = ()):
+        """Remember detections for a frame hash, evicting the least recently used entry."""
+        with self._lock:
+            entries = self._entries.setdefault(camera_id, OrderedDict())
+            entries[(variant, key)] = (time.monotonic(), [dict(d) for d in detections])
+            entries.move_to_end((variant, key))
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries (e.g. after the model or thresholds change)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current configuration."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": DETECTION_CACHE_ENABLED,
+                "mode": DETECTION_CACHE_MODE,
+                "snapshot_cameras": sorted(self._snapshot_cameras),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": {cam: len(e) for cam, e in self._entries.items()},
+                "ttl": self.ttl,
+                "max_distance": self.max_distance,
+                "size": self.size,
+            }
+
+
+# Global instance
+detection_cache = DetectionCache()
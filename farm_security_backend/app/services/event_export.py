@@ -0,0 +1,158 @@
+# app/services/event_export.py
+import io
+import os
+import csv
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.event import DetectionEventDB
+
+# Parquet export is optional; pyarrow is imported by the first parquet_available()
+pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip; memory use is bounded by one chunk whatever the table size
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+EXPORT_COLUMNS = [
+    "id", "timestamp", "device_id", "detection_type", "confidence",
+    "siren_activated", "notified", "video_filename", "data",
+]
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return False
+    return True
+
+
+def _export_query(start: datetime = None, end: datetime = None, types: list = None, device_id: str = None):
+    columns = [getattr(DetectionEventDB, name) for name in EXPORT_COLUMNS]
+    query = select(*columns).order_by(DetectionEventDB.timestamp)
+    if start is not None:
+        query = query.where(DetectionEventDB.timestamp >= start)
+    if end is not None:
+        query = query.where(DetectionEventDB.timestamp < end)
+    if types:
+        query = query.where(DetectionEventDB.detection_type.in_(types))
+    if device_id:
+        query = query.where(DetectionEventDB.device_id == device_id)
+    return query
+
+
+async def _chunks(query):
+    """Row tuples in lists of EXPORT_CHUNK_ROWS, from a server-side cursor."""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for partition in result.partitions(EXPORT_CHUNK_ROWS):
+            yield partition
+
+
+def _ndjson(rows) -> bytes:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+        lines.append(json.dumps(record, default=str))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        row = list(row)
+        row[1] = row[1].isoformat() if row[1] else ""
+        row[-1] = json.dumps(row[-1]) if row[-1] is not None else ""
+        writer.writerow(row)
+    return buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands Parquet bytes back as they are produced."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("device_id", pa.string()),
+        ("detection_type", pa.string()),
+        ("confidence", pa.float64()),
+        ("siren_activated", pa.bool_()),
+        ("notified", pa.bool_()),
+        ("video_filename", pa.string()),
+        ("data", pa.string()),  # JSON text
+    ])
+
+
+async def export_events(fmt: str, start: datetime = None, end: datetime = None,
+                        types: list = None, device_id: str = None):
+    """Async generator of export bytes in `fmt` (ndjson, csv or parquet)."""
+    query = _export_query(start, end, types, device_id)
+    rows_out = 0
+
+    if fmt == "parquet":
+        sink = _ChunkSink()
+        schema = _parquet_schema()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+        async for rows in _chunks(query):
+            columns = list(zip(*rows))
+            columns[-1] = [json.dumps(v) if v is not None else None for v in columns[-1]]
+            # One row group per chunk
+            writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
+            rows_out += len(rows)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    else:
+        header = True
+        async for rows in _chunks(query):
+            yield _ndjson(rows) if fmt == "ndjson" else _csv(rows, header)
+            header = False
+            rows_out += len(rows)
+        if fmt == "csv" and header:
+            yield _csv([], True)
+    logger.info("📤 Exported %d event(s) as %s", rows_out, fmt)
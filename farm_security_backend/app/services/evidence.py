@@ -0,0 +1,101 @@
+# app/services/evidence.py
+import os
+import glob
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-event evidence: a small JPEG of the alert frame plus one crop per
+# detection box, written by a background thread so the alert path only pays
+# for queueing a reference to the (read-only) frame.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", os.path.join(BASE_DIR, "evidence"))
+EVIDENCE_THUMB_WIDTH = int(os.getenv("EVIDENCE_THUMB_WIDTH", "320"))
+EVIDENCE_JPEG_QUALITY = int(os.getenv("EVIDENCE_JPEG_QUALITY", "75"))
+EVIDENCE_MAX_CROPS = int(os.getenv("EVIDENCE_MAX_CROPS", "4"))
+EVIDENCE_CROP_PADDING = 0.1  # fraction of the box size added on each side
+
+
+def crop_box(frame: np.ndarray, box: list, padding: float = EVIDENCE_CROP_PADDING) -> np.ndarray:
+    """Padded crop of an (x1, y1, x2, y2) box, clipped to the frame."""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+    return frame[y1:y2, x1:x2]
+
+
+class EvidenceStore:
+    """Writes and locates thumbnail/crop JPEGs for detection events."""
+
+    def __init__(self, directory: str = EVIDENCE_DIR):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evidence")
+
+    def thumbnail_path(self, event_id: int) -> str:
+        return os.path.join(self.directory, f"{event_id}.jpg")
+
+    def crop_path(self, event_id: int, index: int) -> str:
+        return os.path.join(self.directory, f"{event_id}_crop{index}.jpg")
+
+    def select_boxes(self, detections: list, label: str = None) -> list:
+        """Boxes to crop: those matching `label` (all if none match), best first."""
+        detections = detections or []
+        matching = [d for d in detections if d.get("label") == label] or detections
+        return [d["box"] for d in matching[:EVIDENCE_MAX_CROPS]]
+
+    def save_async(self, event_id: int, frame: np.ndarray, boxes: list):
+        """Queue thumbnail + crops for `event_id`; returns immediately."""
+        self._executor.submit(self._save, event_id, frame, boxes)
+
+    def _save(self, event_id: int, frame: np.ndarray, boxes: list):
+        import cv2  # only once an alert has evidence to write (keeps cv2 out of API startup)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            params = [cv2.IMWRITE_JPEG_QUALITY, EVIDENCE_JPEG_QUALITY]
+            h, w = frame.shape[:2]
+            scale = min(1.0, EVIDENCE_THUMB_WIDTH / w)
+            thumb = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else frame
+            self._write(self.thumbnail_path(event_id), thumb, params)
+            for i, box in enumerate(boxes):
+                crop = crop_box(frame, box)
+                if crop.size:
+                    self._write(self.crop_path(event_id, i), crop, params)
+        except Exception as e:
+            logger.error("❌ Failed to save evidence for event %s: %s", event_id, e)
+
+    @staticmethod
+    def _write(path: str, image: np.ndarray, params: list):
+        import cv2
+        ok, buffer = cv2.imencode(".jpg", image, params)
+        if not ok:
+            raise ValueError(f"JPEG encode failed for {path}")
+        # Write then rename so readers never see a half-written file
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp, path)
+
+    def delete_async(self, event_id: int = None):
+        """Queue delete() behind any pending saves, so none of them recreates the files."""
+        self._executor.submit(self.delete, event_id)
+
+    def delete(self, event_id: int = None):
+        """Remove one event's files, or every event's when event_id is None."""
+        pattern = f"{event_id}.jpg" if event_id is not None else "*.jpg"
+        paths = glob.glob(os.path.join(self.directory, pattern))
+        if event_id is not None:
+            paths += glob.glob(os.path.join(self.directory, f"{event_id}_crop*.jpg"))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Global instance
+evidence_store = EvidenceStore()
@@ -0,0 +1,58 @@
+# app/services/frame_slot.py
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class FrameSlot:
+    """
+    Latest-frame exchange between one producer and many consumers.
+
+    The producer publishes each newly decoded frame by reference and marks it
+    read-only; consumers get that same array plus its sequence number, so no
+    copy is made on either side. A publish never mutates a frame a consumer
+    is still holding - it just swaps the reference - so readers can use the
+    array for as long as they like.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._seq = 0
+        self._published_at = 0.0
+        self._cond = threading.Condition()
+
+    def publish(self, frame: np.ndarray) -> int:
+        """Make `frame` the latest frame. The caller must not modify it afterwards."""
+        frame.flags.writeable = False
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._published_at = time.time()
+            self._cond.notify_all()
+            return self._seq
+
+    def get(self) -> Tuple[Optional[np.ndarray], int]:
+        """Latest (frame, seq) without waiting; frame is None before the first publish."""
+        with self._cond:
+            return self._frame, self._seq
+
+    def wait_newer(self, seq: int, timeout: float = None) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Block until a frame newer than `seq` is published.
+        Returns (frame, seq), or (None, seq) on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > seq, timeout=timeout):
+                return None, seq
+            return self._frame, self._seq
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last publish (inf before the first one)."""
+        return time.time() - self._published_at if self._seq else float("inf")
@@ -0,0 +1,210 @@
+# app/services/inference.py
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Raw model inference shared by the in-process detector and the inference
+# worker processes. Nothing here touches the database or alerting so worker
+# processes can import it cheaply.
+
+# --- Tiled / multi-scale inference ---
+# Wide-angle frames shrink distant animals to a few pixels after YOLO's resize.
+# Tiled mode splits the frame into overlapping tiles (plus one downscaled copy of
+# the full frame so large, close objects are not cut in half) and runs them as a
+# single batch. Boxes are mapped back to frame coordinates and merged with NMS.
+DEFAULT_CAMERA_ID = os.getenv("CAMERA_DEVICE_ID", "ESP32-CAM-01")
+TILED_CAMERAS = [
+    c.strip()
+    for c in os.getenv("DETECTION_TILED_CAMERAS", "").split(",")
+    if c.strip()
+]
+TILED_HOURS = os.getenv("DETECTION_TILED_HOURS", "").strip()  # e.g. "18:00-06:00"
+TILE_GRID = os.getenv("DETECTION_TILE_GRID", "2x2")
+TILE_OVERLAP = float(os.getenv("DETECTION_TILE_OVERLAP", "0.2"))
+TILE_NMS_IOU = float(os.getenv("DETECTION_TILE_NMS_IOU", "0.5"))
+
+
+def _parse_grid(grid: str) -> tuple:
+    """Parse a 'COLSxROWS' grid spec, falling back to 2x2."""
+    try:
+        cols, rows = (int(v) for v in grid.lower().split("x"))
+        if cols > 0 and rows > 0:
+            return cols, rows
+    except ValueError:
+        pass
+    return 2, 2
+
+
+def parse_hours(window: str):
+    """Parse 'HH:MM-HH:MM' into (start_minute, end_minute) or None."""
+    try:
+        start, end = window.split("-")
+        sh, sm = (int(v) for v in start.split(":"))
+        eh, em = (int(v) for v in end.split(":"))
+        return sh * 60 + sm, eh * 60 + em
+    except ValueError:
+        return None
+
+
+def in_window(window, now: datetime = None) -> bool:
+    """True if `now` falls inside a (start, end) minute window (wraps midnight)."""
+    if window is None:
+        return False
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+_TILED_WINDOW = parse_hours(TILED_HOURS) if TILED_HOURS else None
+
+
+def tiling_enabled(camera_id: str = None) -> bool:
+    """Tiled mode is on for listed cameras ('*' = all) or inside the configured hours."""
+    camera_id = camera_id or DEFAULT_CAMERA_ID
+    if "*" in TILED_CAMERAS or camera_id in TILED_CAMERAS:
+        return True
+    return in_window(_TILED_WINDOW)
+
+
+class TileBuffers:
+    """
+    Preallocated batch buffer for one frame shape.
+    Tiles are copied into a reused (N, th, tw, 3) array so each tiled pass
+    costs a memcpy instead of N fresh allocations.
+    """
+
+    def __init__(self, frame_shape: tuple, grid: tuple, overlap: float):
+        height, width = frame_shape[:2]
+        cols, rows = grid
+        # Tile size such that `cols` tiles with `overlap` cover the full width
+        self.tile_w = int(np.ceil(width / (cols - (cols - 1) * overlap)))
+        self.tile_h = int(np.ceil(height / (rows - (rows - 1) * overlap)))
+        self.tile_w = min(self.tile_w, width)
+        self.tile_h = min(self.tile_h, height)
+
+        self.origins = []
+        for r in range(rows):
+            for c in range(cols):
+                x = 0 if cols == 1 else round(c * (width - self.tile_w) / (cols - 1))
+                y = 0 if rows == 1 else round(r * (height - self.tile_h) / (rows - 1))
+                self.origins.append((x, y))
+
+        # Last slot holds the full frame resized to tile size (the "global" scale)
+        self.batch = np.empty((len(self.origins) + 1, self.tile_h, self.tile_w, 3), dtype=np.uint8)
+        self.scale = (width / self.tile_w, height / self.tile_h)
+
+    def fill(self, frame: np.ndarray) -> list:
+        """Copy tiles and the downscaled full frame into the batch; return views."""
+        import cv2  # imported on first tiled frame, not at API startup
+        for i, (x, y) in enumerate(self.origins):
+            np.copyto(self.batch[i], frame[y:y + self.tile_h, x:x + self.tile_w])
+        cv2.resize(frame, (self.tile_w, self.tile_h), dst=self.batch[-1], interpolation=cv2.INTER_AREA)
+        return [self.batch[i] for i in range(len(self.batch))]
+
+
+_tile_cache = threading.local()
+
+
+def _get_tile_buffers(frame_shape: tuple) -> TileBuffers:
+    """Return the per-thread buffer for this frame shape, allocating on first use."""
+    grid = _parse_grid(TILE_GRID)
+    key = (frame_shape, grid, TILE_OVERLAP)
+    buffers = getattr(_tile_cache, "buffers", None)
+    if buffers is None or getattr(_tile_cache, "key", None) != key:
+        buffers = TileBuffers(frame_shape, grid, TILE_OVERLAP)
+        _tile_cache.buffers = buffers
+        _tile_cache.key = key
+    return buffers
+
+
+def tile_batch_size(frame_shape: tuple) -> int:
+    """Images per tiled inference call for this frame shape (tiles + full frame)."""
+    return len(_get_tile_buffers(frame_shape).batch)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> list:
+    """Greedy non-maximum suppression over xyxy boxes. Returns kept indices."""
+    if len(boxes) == 0:
+        return []
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(min=0) * (y2 - y1).clip(min=0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = (xx2 - xx1).clip(min=0) * (yy2 - yy1).clip(min=0)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return keep
+
+
+def _result_boxes(result) -> list:
+    """Extract (xyxy, confidence, class_id) tuples from one ultralytics result."""
+    if result.boxes is None or len(result.boxes) == 0:
+        return []
+    xyxy = result.boxes.xyxy.cpu().numpy()
+    confs = result.boxes.conf.cpu().numpy()
+    classes = result.boxes.cls.cpu().numpy().astype(int)
+    return [(list(box), float(conf), int(cls)) for box, conf, cls in zip(xyxy, confs, classes)]
+
+
+def tile_images(frame: np.ndarray) -> tuple:
+    """Tiles + downscaled frame as (images, placements); placement = (offset, scale) per image."""
+    buffers = _get_tile_buffers(frame.shape)
+    images = buffers.fill(frame)
+    placements = [((x, y), (1.0, 1.0)) for x, y in buffers.origins] + [((0, 0), buffers.scale)]
+    return images, placements
+
+
+def merge_tiles(per_image: list, placements: list) -> list:
+    """Map each image's raw tuples back to frame coordinates and merge with cross-tile NMS."""
+    raw = []
+    for boxes, ((ox, oy), (sx, sy)) in zip(per_image, placements):
+        for (x1, y1, x2, y2), conf, cls in boxes:
+            raw.append(([x1 * sx + ox, y1 * sy + oy, x2 * sx + ox, y2 * sy + oy], conf, cls))
+    if not raw:
+        return []
+
+    boxes = np.array([r[0] for r in raw], dtype=np.float32)
+    scores = np.array([r[1] for r in raw], dtype=np.float32)
+    classes = np.array([r[2] for r in raw])
+    merged = []
+    for cls in np.unique(classes):
+        idx = np.flatnonzero(classes == cls)
+        for k in nms(boxes[idx], scores[idx], TILE_NMS_IOU):
+            merged.append(raw[idx[k]])
+    return merged
+
+
+def _infer_tiled(model, frame: np.ndarray) -> list:
+    """Run one batched pass over tiles + downscaled frame and merge with cross-tile NMS."""
+    batch, placements = tile_images(frame)
+    return merge_tiles(infer_batch(model, batch), placements)
+
+
+def infer(model, frame: np.ndarray, tiled: bool = False) -> list:
+    """Raw (box, confidence, class_id) tuples from one model."""
+    if tiled:
+        return _infer_tiled(model, frame)
+    results = model(frame, verbose=False)
+    return _result_boxes(results[0]) if results and len(results) > 0 else []
+
+
+def infer_batch(model, frames: list) -> list:
+    """Raw tuples for each of `frames`, in one batched call where the model allows it."""
+    try:
+        results = model(frames, verbose=False)
+    except Exception:
+        # Static-batch ONNX exports only accept one image per call
+        results = [model(frame, verbose=False)[0] for frame in frames]
+    return [_result_boxes(result) for result in results]
@@ -0,0 +1,366 @@
+# app/services/inference_pool.py
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.services import metrics
+from app.services.inference import tile_images, merge_tiles, TILED_CAMERAS, TILED_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Optional multi-process inference. With INFERENCE_WORKERS=N > 0 the detector
+# hands frames to N worker processes, each holding its own model instance, so
+# YOLO's Python glue no longer contends on the GIL with the API event loop.
+#
+# Frames travel through preallocated shared-memory slots: the parent copies
+# the frame into a free slot and only sends (job_id, slot, shape, tiled) over
+# the worker's job queue. Workers map the slot as a NumPy array (no pickling
+# of pixel data) and send back the raw (box, confidence, class_id) tuples.
+#
+# Jobs run concurrently: a tiled frame's tiles are spread over all workers,
+# and the capture loop keeps one frame in flight per camera instead of
+# waiting on it. A job that times out is reclaimed and its (hung) worker
+# restarted; workers that die are restarted by the collector.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_SLOTS_PER_WORKER = int(os.getenv("INFERENCE_SLOTS_PER_WORKER", "2"))
+INFERENCE_SLOT_BYTES = int(os.getenv("INFERENCE_SLOT_BYTES", str(1280 * 720 * 3)))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "10"))
+# Intra-op threads per worker; 0 = all cores when jobs can't overlap (no tiled
+# cameras: one frame in flight), else the cores split between workers
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# A worker that keeps dying is respawned with exponential backoff (capped at
+# INFERENCE_RESTART_MAX_DELAY s) and given up on after this many tries in a row
+INFERENCE_MAX_RESTARTS = int(os.getenv("INFERENCE_MAX_RESTARTS", "5"))
+INFERENCE_RESTART_MAX_DELAY = float(os.getenv("INFERENCE_RESTART_MAX_DELAY", "60"))
+
+
+def _threads_per_worker(workers: int) -> int:
+    if INFERENCE_THREADS > 0:
+        return INFERENCE_THREADS
+    cores = os.cpu_count() or 1
+    concurrent = workers if (TILED_CAMERAS or TILED_HOURS) else 1
+    return max(1, cores // min(workers, concurrent))
+
+
+def _worker_main(worker_id: int, model_path: str, slot_names: list, jobs, results, threads: int):
+    """Worker process: own model, reads frames from shared memory."""
+    # Split cores between workers instead of letting each one grab all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from ultralytics import YOLO
+    from app.services.inference import infer
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        model = YOLO(model_path)
+    except Exception as e:
+        results.put(("load_error", worker_id, (model_path, str(e))))
+        for shm in slots:
+            shm.close()
+        return
+    results.put(("ready", worker_id, (model_path, dict(model.names))))
+
+    while True:
+        message = jobs.get()
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "reload":
+            try:
+                model = YOLO(message[1])
+                results.put(("ready", worker_id, (message[1], dict(model.names))))
+            except Exception as e:
+                # Keeps serving with the model it already has
+                results.put(("load_error", worker_id, (message[1], str(e))))
+            continue
+
+        _, job_id, slot, shape, tiled = message
+        try:
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+            raw = infer(model, frame, tiled)
+            del frame  # release the buffer export before the slot is reused
+            results.put(("result", job_id, raw))
+        except Exception as e:
+            results.put(("error", job_id, str(e)))
+
+    for shm in slots:
+        shm.close()
+
+
+class InferencePool:
+    """Parent-side handle for the worker processes."""
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, slots_per_worker: int = INFERENCE_SLOTS_PER_WORKER,
+                 slot_bytes: int = INFERENCE_SLOT_BYTES):
+        self.workers = workers
+        self.slots_per_worker = slots_per_worker
+        self.slot_bytes = slot_bytes
+        self.names = {}
+        self._ctx = mp.get_context("spawn")
+        self._model_path = None  # last model a worker loaded (what restarts load)
+        self._threads = 1
+        self._processes = []
+        self._job_queues = []
+        self._results = None
+        self._shms = []
+        self._free_slots = {}  # worker -> list of free slot indices
+        self._in_flight = {}  # worker -> count
+        self._pending = {}  # job_id -> (Future, worker, slot)
+        self._failures = {}  # worker -> restarts since it last reported ready
+        self._respawn_at = {}  # worker -> monotonic time it is due to be respawned
+        self._ready = threading.Event()
+        self._cond = threading.Condition()
+        self._job_ids = itertools.count()
+        self._collector = None
+        self.running = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.running and self._ready.is_set()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until the first worker has loaded its model."""
+        return self._ready.wait(timeout)
+
+    def start(self, model_path: str):
+        """Spawn workers and allocate shared-memory slots."""
+        if self.running or self.workers <= 0:
+            return
+        self._model_path = model_path
+        self._threads = _threads_per_worker(self.workers)
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.workers):
+            shms = [
+                shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+                for _ in range(self.slots_per_worker)
+            ]
+            self._shms.append(shms)
+            self._free_slots[worker_id] = list(range(self.slots_per_worker))
+            self._in_flight[worker_id] = 0
+            self._failures[worker_id] = 0
+            self._job_queues.append(None)
+            self._processes.append(None)
+            self._spawn(worker_id)
+        self.running = True
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        logger.info("🧵 Inference pool started: %d worker(s), %d thread(s) each", self.workers, self._threads)
+
+    def _spawn(self, worker_id: int):
+        """Start (or replace) one worker process on its existing slots."""
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._model_path, [s.name for s in self._shms[worker_id]], jobs,
+                  self._results, self._threads),
+            daemon=True,
+        )
+        process.start()
+        self._job_queues[worker_id] = jobs
+        self._processes[worker_id] = process
+
+    def _restart(self, worker_id: int, reason: str):
+        """Kill a worker, fail its pending jobs and schedule a fresh one (with backoff)."""
+        with self._cond:
+            process = self._processes[worker_id]
+            if process is None:
+                return  # already being restarted
+            self._processes[worker_id] = None
+            self._free_slots[worker_id] = []  # no new jobs for it meanwhile
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        process.join()
+        with self._cond:
+            lost = [job_id for job_id, (_, worker, _) in self._pending.items() if worker == worker_id]
+            failed = [self._pending.pop(job_id)[0] for job_id in lost]
+            self._in_flight[worker_id] = 0
+            self._failures[worker_id] += 1
+            attempt = self._failures[worker_id]
+            if attempt <= INFERENCE_MAX_RESTARTS:
+                delay = 0.0 if attempt == 1 else min(INFERENCE_RESTART_MAX_DELAY, 2.0 ** (attempt - 1))
+                self._respawn_at[worker_id] = time.monotonic() + delay
+            elif not self._respawn_at and not any(self._processes):
+                # Every worker gave up: run_detection falls back to the in-process model
+                self._ready.clear()
+            self._cond.notify_all()
+        for future in failed:
+            if not future.done():
+                future.set_exception(RuntimeError(f"Inference worker {worker_id} restarted"))
+        if attempt <= INFERENCE_MAX_RESTARTS:
+            logger.error("❌ Inference worker %s died (%s), %d job(s) lost; restart %d/%d in %.0fs",
+                         worker_id, reason, len(failed), attempt, INFERENCE_MAX_RESTARTS, delay)
+        else:
+            logger.error("❌ Inference worker %s died (%s) %d times in a row; giving up on it",
+                         worker_id, reason, attempt)
+
+    def _check_workers(self):
+        """Restart workers that died and respawn those whose backoff has passed."""
+        for worker_id, process in enumerate(self._processes):
+            if self.running and process is not None and not process.is_alive():
+                self._restart(worker_id, f"exit code {process.exitcode}")
+        now = time.monotonic()
+        with self._cond:
+            for worker_id, when in list(self._respawn_at.items()):
+                if now < when or not self.running:
+                    continue
+                del self._respawn_at[worker_id]
+                self._free_slots[worker_id] = list(range(self.slots_per_worker))
+                self._spawn(worker_id)
+                self._cond.notify_all()
+
+    def _collect(self):
+        """Route worker replies back to their Futures; restart workers that died."""
+        last_check = time.monotonic()
+        while self.running:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, key, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if kind == "ready":
+                path, self.names = payload
+                with self._cond:
+                    self._failures[key] = 0
+                    if path != self._model_path:
+                        logger.info("🧵 Inference workers now run %s", path)
+                    self._model_path = path
+                self._ready.set()
+                continue
+            if kind == "load_error":
+                path, error = payload
+                if path == self._model_path:  # at startup: the worker exits and is restarted
+                    logger.error("❌ Inference worker %s failed to load %s: %s", key, path, error)
+                else:
+                    logger.error("❌ Inference worker %s failed to load %s (keeping %s): %s",
+                                 key, path, self._model_path, error)
+                continue
+            with self._cond:
+                entry = self._pending.pop(key, None)
+                if entry is None:
+                    continue  # reclaimed after a timeout
+                future, worker, slot = entry
+                self._free_slots[worker].append(slot)
+                self._in_flight[worker] -= 1
+                self._cond.notify()
+            if kind == "result":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def submit(self, frame: np.ndarray, tiled: bool = False) -> Future:
+        """Copy `frame` into a free slot of the least busy worker and queue it."""
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame.shape} {frame.dtype} does not fit an inference slot")
+        with self._cond:
+            while True:
+                candidates = [w for w, free in self._free_slots.items() if free]
+                if candidates:
+                    break
+                if not self._cond.wait(timeout=INFERENCE_TIMEOUT):
+                    raise TimeoutError("No free inference slot")
+            worker = min(candidates, key=lambda w: self._in_flight[w])
+            slot = self._free_slots[worker].pop()
+            self._in_flight[worker] += 1
+            job_id = next(self._job_ids)
+            future = Future()
+            future.job_id = job_id
+            self._pending[job_id] = (future, worker, slot)
+
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shms[worker][slot].buf)
+        np.copyto(view, frame)
+        del view
+        self._job_queues[worker].put(("job", job_id, slot, frame.shape, tiled))
+        return future
+
+    def result(self, future: Future, timeout: float = INFERENCE_TIMEOUT) -> list:
+        """Wait for a submitted job; on timeout reclaim it and restart its worker."""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            with self._cond:
+                entry = self._pending.get(future.job_id)
+            if entry is not None:
+                self._restart(entry[1], f"job timed out after {timeout}s")
+            raise TimeoutError(f"Inference job {future.job_id} timed out")
+
+    def infer(self, frame: np.ndarray, tiled: bool = False, timeout: float = INFERENCE_TIMEOUT) -> list:
+        """
+        Raw detections for one frame. A tiled frame is split into its tiles,
+        which run in parallel on all workers and are merged here.
+        """
+        if not tiled or self.workers < 2:
+            return self.result(self.submit(frame, tiled), timeout)
+        images, placements = tile_images(frame)
+        futures = [self.submit(image) for image in images]
+        return merge_tiles([self.result(f, timeout) for f in futures], placements)
+
+    def reload(self, model_path: str):
+        """Ask every worker to load a new model (used by hot-swap)."""
+        # _model_path only moves to model_path once a worker reports it loaded
+        for jobs in filter(None, self._job_queues):
+            jobs.put(("reload", model_path))
+
+    def stop(self):
+        """Stop workers and free shared memory."""
+        if not self.running:
+            return
+        for jobs in self._job_queues:
+            jobs.put(("stop",))
+        self.running = False
+        self._respawn_at.clear()
+        for process in filter(None, self._processes):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._ready.clear()
+        with self._cond:
+            for future, _, _ in self._pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference pool stopped"))
+            self._pending.clear()
+        for shms in self._shms:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+        self._processes, self._job_queues, self._shms = [], [], []
+        logger.info("🧵 Inference pool stopped")
+
+    def status(self) -> dict:
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self._threads,
+            "running": self.running,
+            "ready": self._ready.is_set(),
+            "model": self._model_path,
+            "in_flight": dict(self._in_flight),
+            "restarts": dict(self._failures),
+            "given_up": [w for w, n in self._failures.items() if n > INFERENCE_MAX_RESTARTS],
+        }
+
+
+# Global instance
+inference_pool = InferencePool()
+
+metrics.registry.gauge(
+    "farm_inference_queue_depth", "Frames queued or running per inference worker", ("worker",),
+    callback=lambda: {(str(w),): n for w, n in inference_pool._in_flight.items()},
+)
@@ -0,0 +1,229 @@
+# app/services/ipc.py
+import os
+import json
+import time
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from multiprocessing import shared_memory, resource_tracker
+
+from app.services.state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+# --- Capture daemon <-> API worker IPC ---
+# CAPTURE_MODE=embedded (default): the web process owns the cameras, as before.
+# CAPTURE_MODE=daemon: `python -m app.daemon` owns the cameras, inference and
+# siren; API processes (any number of uvicorn workers) read from it:
+#   * the latest JPEG frame through one shared-memory segment (seqlock header),
+#     encoded only while some worker is streaming it (readers stamp a demand time),
+#   * state, state changes and control commands as JSON lines on a Unix socket.
+CAPTURE_MODE = os.getenv("CAPTURE_MODE", "embedded").strip().lower()
+IPC_SOCKET_PATH = os.getenv("IPC_SOCKET_PATH", "/tmp/farm_security.sock")
+IPC_SHM_NAME = os.getenv("IPC_SHM_NAME", "farm_security_frame")
+IPC_SHM_SIZE = int(os.getenv("IPC_SHM_SIZE", str(2 * 1024 * 1024)))  # max JPEG bytes + header
+IPC_TIMEOUT = float(os.getenv("IPC_TIMEOUT", "5"))
+IPC_VIEWER_TTL = float(os.getenv("IPC_VIEWER_TTL", "2"))  # seconds a read keeps encoding on
+
+# seq (odd while writing), JPEG length, capture timestamp
+_HEADER = struct.Struct("<QQd")
+# last time any reader asked for a frame (written by readers)
+_DEMAND = struct.Struct("<d")
+_DATA = _HEADER.size + _DEMAND.size
+
+
+def daemon_mode() -> bool:
+    """True in API processes that should leave cameras to the capture daemon."""
+    return CAPTURE_MODE == "daemon"
+
+
+class SharedFrameWriter:
+    """Daemon side: publishes the latest JPEG into shared memory."""
+
+    def __init__(self, name: str = IPC_SHM_NAME, size: int = IPC_SHM_SIZE):
+        try:
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()  # left over from a crashed daemon
+        except FileNotFoundError:
+            pass
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._capacity = size - _DATA
+        self._seq = 0
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0, 0.0)
+        _DEMAND.pack_into(self._shm.buf, _HEADER.size, 0.0)
+
+    def has_readers(self) -> bool:
+        """True if an API worker has read a frame within IPC_VIEWER_TTL seconds."""
+        return time.time() - _DEMAND.unpack_from(self._shm.buf, _HEADER.size)[0] < IPC_VIEWER_TTL
+
+    def write(self, jpeg: bytes, timestamp: float = None) -> bool:
+        length = len(jpeg)
+        if length > self._capacity:
+            logger.warning("⚠️  Frame of %d bytes exceeds IPC_SHM_SIZE, skipped", length)
+            return False
+        buf = self._shm.buf
+        # Seqlock: odd seq tells readers a write is in progress
+        self._seq += 1
+        struct.pack_into("<Q", buf, 0, self._seq)
+        buf[_DATA:_DATA + length] = jpeg
+        self._seq += 1
+        _HEADER.pack_into(buf, 0, self._seq, length, timestamp or time.time())
+        return True
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedFrameReader:
+    """API side: reads the latest JPEG published by the daemon."""
+
+    def __init__(self, name: str = IPC_SHM_NAME):
+        self._name = name
+        self._shm = None
+
+    def _attach(self) -> bool:
+        if self._shm is None:
+            try:
+                self._shm = shared_memory.SharedMemory(name=self._name)
+                # The daemon owns the segment; don't let this process unlink it on exit
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except FileNotFoundError:
+                return False
+        return True
+
+    def read(self, after_seq: int = 0):
+        """(jpeg, seq, timestamp) newer than `after_seq`, or (None, after_seq, None)."""
+        if not self._attach():
+            return None, after_seq, None
+        buf = self._shm.buf
+        # Tell the daemon someone is watching, so it keeps encoding frames
+        _DEMAND.pack_into(buf, _HEADER.size, time.time())
+        for _ in range(3):
+            seq, length, timestamp = _HEADER.unpack_from(buf, 0)
+            if seq % 2 or seq <= after_seq:
+                if seq % 2:
+                    time.sleep(0.001)
+                    continue
+                return None, after_seq, None
+            jpeg = bytes(buf[_DATA:_DATA + length])
+            if struct.unpack_from("<Q", buf, 0)[0] == seq:
+                return jpeg, seq, timestamp
+        return None, after_seq, None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self._reply({"error": "invalid json"})
+                continue
+            op = request.get("op")
+            if op == "subscribe":
+                return self._subscribe()
+            handler = self.server.ops.get(op)
+            if handler is None:
+                self._reply({"error": f"unknown op {op!r}"})
+                continue
+            try:
+                self._reply({"result": handler(**request.get("args", {}))})
+            except Exception as e:
+                logger.exception("IPC op %s failed", op)
+                self._reply({"error": str(e)})
+
+    def _reply(self, message: dict):
+        self.wfile.write(json.dumps(message, default=str).encode() + b"\n")
+        self.wfile.flush()
+
+    def _subscribe(self):
+        """Send the current state, then every change, until the client goes away."""
+        version = -1
+        try:
+            while True:
+                snapshot = state_store.snapshot()
+                if snapshot["version"] != version:
+                    version = snapshot["version"]
+                    self._reply({"state": snapshot})
+                state_store.wait_for_change(version, timeout=15)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class IPCServer(socketserver.ThreadingUnixStreamServer):
+    """Daemon side: JSON-lines request/response (plus state subscription) on a Unix socket."""
+
+    daemon_threads = True
+
+    def __init__(self, ops: dict, path: str = IPC_SOCKET_PATH):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.ops = ops
+        self.path = path
+        super().__init__(path, _Handler)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="ipc-server", daemon=True).start()
+        logger.info("🔌 IPC listening on %s", self.path)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class DaemonClient:
+    """
+    API side: forwards commands to the capture daemon and mirrors its state
+    into the local state_store, so status snapshots, ETags and the SSE
+    stream work unchanged in every worker.
+    """
+
+    def __init__(self, path: str = IPC_SOCKET_PATH):
+        self.path = path
+        self.connected = False
+        self._thread = None
+
+    def call(self, op: str, **args):
+        """Run `op` in the daemon and return its result (raises on error)."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(IPC_TIMEOUT)
+            sock.connect(self.path)
+            sock.sendall(json.dumps({"op": op, "args": args}).encode() + b"\n")
+            reply = json.loads(sock.makefile("rb").readline() or b"{}")
+        if "error" in reply or "result" not in reply:
+            raise RuntimeError(reply.get("error", "no reply from capture daemon"))
+        return reply["result"]
+
+    def start(self):
+        """Start mirroring daemon state (reconnects automatically)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._mirror, name="ipc-mirror", daemon=True)
+            self._thread.start()
+
+    def _mirror(self):
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.path)
+                    sock.sendall(b'{"op": "subscribe"}\n')
+                    self.connected = True
+                    logger.info("🔌 Connected to capture daemon at %s", self.path)
+                    for line in sock.makefile("rb"):
+                        state = json.loads(line)["state"]
+                        state.pop("version", None)
+                        state_store.mirror(state)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("⚠️  Capture daemon unavailable at %s: %s", self.path, e)
+            self.connected = False
+            state_store.mirror({"camera_connected": False, "stream_open": False})
+            time.sleep(2)
+
+
+# Set in API processes running with CAPTURE_MODE=daemon
+daemon_client = DaemonClient() if daemon_mode() else None
@@ -0,0 +1,196 @@
+# app/services/metrics.py
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus-style metrics (text exposition format 0.0.4) without an
+# extra dependency. Each update is a dict lookup and an add under a short
+# per-metric lock, cheap enough for the per-frame hot path.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: dict = None) -> str:
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, key, {}, value
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or be computed at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), callback=None):
+        super().__init__(name, help_text, labelnames)
+        # callback() -> {label_tuple: value} evaluated on scrape, for values
+        # such as queue depths that are cheaper to read than to track
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                for key, value in self._callback().items():
+                    yield self.name, tuple(key), {}, value
+            except Exception:
+                pass
+            return
+        yield from super().samples()
+
+
+class Histogram:
+    """Cumulative bucket histogram per label set."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a `with` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket", key, {"le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", key, {}, state[-2]
+            yield f"{self.name}_count", key, {}, state[-1]
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders the /metrics payload."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = (), callback=None) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, key, extra, value in metric.samples():
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics for the capture -> alert path
+registry = MetricsRegistry()
+
+FRAMES_READ = registry.counter("farm_frames_read_total", "Frames successfully read", ("camera",))
+FRAMES_FAILED = registry.counter("farm_frames_failed_total", "Failed frame reads", ("camera",))
+CAMERA_RECONNECTS = registry.counter("farm_camera_reconnects_total", "Forced camera reconnects", ("camera",))
+INFERENCE_SECONDS = registry.histogram("farm_inference_seconds", "Detector inference latency", ("mode",))
+INFERENCE_BATCH_SIZE = registry.histogram(
+    "farm_inference_batch_size", "Images per inference call", ("mode",), buckets=(1, 2, 4, 5, 8, 10, 16, 32)
+)
+DETECTIONS = registry.counter("farm_detections_total", "Detections above threshold", ("camera", "label"))
+ALERTS = registry.counter("farm_alerts_total", "Confirmed alerts", ("camera", "label", "severity"))
+ALERT_DISPATCH_SECONDS = registry.histogram(
+    "farm_alert_dispatch_seconds", "Alert side-effect latency", ("target", "success")
+)
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    "farm_pipeline_stage_seconds", "Time from frame capture to each alert stage", ("stage",)
+)
+SIREN_ACK_SECONDS = registry.histogram(
+    "farm_siren_ack_seconds", "Siren command round trip per device", ("device", "success")
+)
+CAMERA_MODE_CHANGES = registry.counter(
+    "farm_camera_mode_changes_total", "Camera idle/active setting changes", ("camera", "mode", "confirmed")
+)
+LIVE_FEED_SUBSCRIBERS = registry.gauge("farm_live_feed_subscribers", "Open live-feed streams")
+LIVE_FEED_ENCODE_SECONDS = registry.histogram(
+    "farm_live_feed_encode_seconds", "JPEG encode time per live-feed frame",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
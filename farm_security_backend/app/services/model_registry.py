@@ -0,0 +1,299 @@
+# app/services/model_registry.py
+import os
+import time
+import logging
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Models are held by a registry instead of a module global so they can be
+# replaced while the camera loop keeps running. A new model is loaded and
+# warmed up in a background thread and then swapped in with one reference
+# assignment; in-flight detections finish on the model they started with.
+WARMUP_FRAMES = int(os.getenv("MODEL_WARMUP_FRAMES", "3"))
+SAMPLE_EVERY = int(os.getenv("MODEL_SAMPLE_EVERY", "100"))  # keep 1 of N frames for warm-up
+SAMPLE_SIZE = 4
+VARIANT_RETRY_SECONDS = int(os.getenv("MODEL_VARIANT_RETRY_SECONDS", "30"))  # wait before retrying a failed profile model
+MODELS_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+MODEL_EXTENSIONS = (".onnx", ".pt")
+
+
+def resolve_model_request(path: str) -> str:
+    """
+    Absolute path for a model named in an admin request: relative to and
+    confined to MODELS_DIR (.pt files are unpickled by torch, so arbitrary
+    paths must not reach YOLO()). Raises ValueError otherwise.
+    """
+    resolved = os.path.realpath(os.path.join(MODELS_DIR, path))
+    if os.path.commonpath([resolved, MODELS_DIR]) != MODELS_DIR:
+        raise ValueError(f"Model path must be inside {MODELS_DIR}")
+    if not resolved.endswith(MODEL_EXTENSIONS):
+        raise ValueError(f"Model file must be one of {', '.join(MODEL_EXTENSIONS)}")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"Model file not found: {path}")
+    return resolved
+
+
+def int8_path(path: str) -> str:
+    """Where app/tools/quantize.py writes the INT8 variant of `path`."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.int8{ext}"
+
+
+def select_model_path(path: str, precision: str = "fp32") -> str:
+    """`path`, or its INT8 variant when precision is int8 and the file exists."""
+    if precision != "int8":
+        return path
+    quantized = int8_path(path)
+    if os.path.exists(quantized):
+        return quantized
+    logger.warning("⚠️  INT8 model %s not found (build it with app.tools.quantize); using %s", quantized, path)
+    return path
+
+
+class ModelHandle:
+    """A loaded model plus the metadata shown by the admin endpoints."""
+
+    def __init__(self, model, path: str, version: int, warmup_ms: float = 0.0):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.names = model.names
+        self.loaded_at = datetime.now()
+        self.warmup_ms = warmup_ms
+
+    def __call__(self, source, **kwargs):
+        return self.model(source, **kwargs)
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "precision": "int8" if self.path.endswith(".int8" + os.path.splitext(self.path)[1]) else "fp32",
+            "version": self.version,
+            "names": self.names,
+            "loaded_at": self.loaded_at.isoformat(),
+            "warmup_ms": round(self.warmup_ms, 1),
+        }
+
+
+class ModelRegistry:
+    """Active model, optional shadow model and background (re)loading."""
+
+    def __init__(self):
+        self.active = None  # ModelHandle | None, swapped atomically
+        self.shadow = None
+        self.shadow_every = 10
+        self._version = 0
+        self._lock = threading.Lock()
+        self._loading = None  # path currently being loaded
+        self._last_error = None
+        self._samples = deque(maxlen=SAMPLE_SIZE)
+        self._seen = 0
+        self._shadow_queue = queue.Queue(maxsize=1)
+        self._shadow_stats = {}
+        self._shadow_thread = None
+        self._variants = {}  # path -> ModelHandle for per-profile models
+        self._variant_loading = set()
+        self._variant_errors = {}  # path -> {"error", "at", "retry_at"} of the last failed load
+
+    # --- Loading ---
+
+    def _build(self, path: str) -> ModelHandle:
+        """Load and warm up a model without touching the active one."""
+        # ultralytics pulls in torch; import it here, off the startup path
+        from ultralytics import YOLO
+
+        model = YOLO(path)
+        frames = list(self._samples) or [np.zeros((480, 640, 3), dtype=np.uint8)]
+        start = time.perf_counter()
+        for i in range(WARMUP_FRAMES):
+            model(frames[i % len(frames)], verbose=False)
+        warmup_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._version += 1
+            version = self._version
+        return ModelHandle(model, path, version, warmup_ms)
+
+    def load(self, path: str) -> bool:
+        """Load `path` synchronously and make it active. Returns success."""
+        if not os.path.exists(path):
+            self._last_error = f"Model file not found: {path}"
+            logger.warning("⚠️  Model file not found at %s. Detection will be disabled.", path)
+            return False
+        try:
+            handle = self._build(path)
+        except Exception as e:
+            self._last_error = str(e)
+            logger.critical("❌ Failed to load YOLOv8 model: %s", e)
+            return False
+        self.active = handle
+        self._last_error = None
+        logger.info("✅ YOLOv8 Model Loaded from %s (v%d, warm-up %.0f ms)", path, handle.version, handle.warmup_ms)
+        logger.info("📋 Model class names: %s", handle.names)
+        return True
+
+    def load_async(self, path: str, on_swap=None) -> bool:
+        """Load, warm up and swap in `path` on a background thread.
+        Returns False if another load is already in progress."""
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = path
+
+        def worker():
+            try:
+                if self.load(path) and on_swap is not None:
+                    on_swap(self.active)
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+    @property
+    def loading(self) -> bool:
+        return self._loading is not None
+
+    def observe(self, frame: np.ndarray):
+        """Keep an occasional real frame to warm up the next model with."""
+        self._seen += 1
+        if self._seen % SAMPLE_EVERY == 1:
+            self._samples.append(frame)
+
+    # --- Profile models ---
+
+    def variant(self, path: str):
+        """
+        Handle for an alternate model (e.g. an arming profile's night model).
+        The first call starts a background load and returns None; callers fall
+        back to the active model until it is ready. A failed load is retried
+        by the first call after VARIANT_RETRY_SECONDS (see status()).
+        """
+        handle = self._variants.get(path)
+        if handle is not None:
+            return handle
+        with self._lock:
+            if path in self._variant_loading:
+                return None
+            failed = self._variant_errors.get(path)
+            if failed is not None and time.time() < failed["retry_at"]:
+                return None
+            self._variant_loading.add(path)
+        threading.Thread(target=self._load_variant, args=(path,), daemon=True).start()
+        return None
+
+    def _load_variant(self, path: str):
+        try:
+            self._variants[path] = self._build(path)
+            self._variant_errors.pop(path, None)
+            logger.info("✅ Profile model loaded from %s", path)
+        except Exception as e:
+            now = time.time()
+            self._last_error = str(e)
+            self._variant_errors[path] = {"error": str(e), "at": now, "retry_at": now + VARIANT_RETRY_SECONDS}
+            logger.error("❌ Failed to load profile model %s (retry in %ss, using the active model): %s",
+                         path, VARIANT_RETRY_SECONDS, e)
+        finally:
+            with self._lock:
+                self._variant_loading.discard(path)
+
+    # --- Shadow model ---
+
+    def set_shadow(self, path: str, every: int = 10) -> bool:
+        """Load a shadow model that is run on 1 of `every` detection frames."""
+        try:
+            handle = self._build(path)
+        except Exception as e:
+            self._last_error = str(e)
+            logger.error("❌ Failed to load shadow model: %s", e)
+            return False
+        self.shadow_every = max(1, every)
+        self._shadow_stats = {"compared": 0, "agree": 0, "active_only": {}, "shadow_only": {}}
+        self.shadow = handle
+        if self._shadow_thread is None:
+            self._shadow_thread = threading.Thread(target=self._shadow_worker, daemon=True)
+            self._shadow_thread.start()
+        logger.info("👥 Shadow model loaded from %s (1 of %d frames)", path, self.shadow_every)
+        return True
+
+    def set_shadow_async(self, path: str, every: int = 10) -> bool:
+        """set_shadow() on a background thread. Returns False if a load is already in progress."""
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = path
+
+        def worker():
+            try:
+                self.set_shadow(path, every)
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+    def clear_shadow(self):
+        self.shadow = None
+
+    def submit_shadow(self, frame: np.ndarray, active_labels: set, detect_fn):
+        """Queue a frame for shadow comparison; dropped if the worker is busy."""
+        if self.shadow is None or self._seen % self.shadow_every != 0:
+            return
+        try:
+            self._shadow_queue.put_nowait((frame, active_labels, detect_fn))
+        except queue.Full:
+            pass
+
+    def _shadow_worker(self):
+        while True:
+            frame, active_labels, detect_fn = self._shadow_queue.get()
+            shadow = self.shadow
+            if shadow is None:
+                continue
+            try:
+                shadow_labels = {d["label"] for d in detect_fn(shadow, frame)}
+            except Exception as e:
+                logger.warning("⚠️  Shadow detection error: %s", e)
+                continue
+            stats = self._shadow_stats
+            stats["compared"] += 1
+            if shadow_labels == active_labels:
+                stats["agree"] += 1
+            for label in active_labels - shadow_labels:
+                stats["active_only"][label] = stats["active_only"].get(label, 0) + 1
+            for label in shadow_labels - active_labels:
+                stats["shadow_only"][label] = stats["shadow_only"].get(label, 0) + 1
+
+    def status(self) -> dict:
+        return {
+            "active": self.active.info() if self.active else None,
+            "shadow": self.shadow.info() if self.shadow else None,
+            "shadow_every": self.shadow_every,
+            "shadow_stats": self._shadow_stats,
+            "variants": {path: handle.info() for path, handle in self._variants.items()},
+            "variant_errors": {
+                path: {"error": e["error"], "at": datetime.fromtimestamp(e["at"]).isoformat(),
+                       "retry_at": datetime.fromtimestamp(e["retry_at"]).isoformat()}
+                for path, e in self._variant_errors.items()
+            },
+            "loading": self._loading,
+            "last_error": self._last_error,
+        }
+
+
+# Global instance
+model_registry = ModelRegistry()
+
+metrics.registry.gauge(
+    "farm_shadow_queue_depth", "Frames waiting for the shadow model",
+    callback=lambda: {(): model_registry._shadow_queue.qsize()},
+)
@@ -0,0 +1,148 @@
+# app/services/preprocess.py
+import os
+import math
+import threading
+
+import numpy as np
+
+from app.services import metrics
+
+# --- Day/night preprocessing ---
+# Night frames from the ESP32-CAM are dark and noisy. Scene brightness is
+# estimated per camera on a 64x48 thumbnail; once it drops below
+# PREPROCESS_DARK_LEVEL (and until it rises above PREPROCESS_BRIGHT_LEVEL) the
+# frame is brightened with a gamma lookup table before detection. Gamma tables
+# are built once per brightness bucket and reused, so correction costs one
+# cv2.LUT pass. With PREPROCESS_EQUALIZE, a clip-limited histogram
+# equalization (a global stand-in for CLAHE, which is tile-local and can't be
+# a single table) is folded into the same table and refreshed every
+# PREPROCESS_REFRESH_FRAMES frames.
+PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+PREPROCESS_DARK_LEVEL = float(os.getenv("PREPROCESS_DARK_LEVEL", "70"))  # mean luma 0-255
+PREPROCESS_BRIGHT_LEVEL = float(os.getenv("PREPROCESS_BRIGHT_LEVEL", "90"))
+PREPROCESS_TARGET_LEVEL = float(os.getenv("PREPROCESS_TARGET_LEVEL", "110"))
+PREPROCESS_BUCKETS = int(os.getenv("PREPROCESS_BUCKETS", "32"))
+PREPROCESS_EQUALIZE = os.getenv("PREPROCESS_EQUALIZE", "false").lower() in ("1", "true", "yes", "on")
+PREPROCESS_CLIP_LIMIT = float(os.getenv("PREPROCESS_CLIP_LIMIT", "3.0"))  # x mean histogram bin
+PREPROCESS_REFRESH_FRAMES = int(os.getenv("PREPROCESS_REFRESH_FRAMES", "30"))
+
+_THUMB_SIZE = (64, 48)
+
+
+def estimate_brightness(frame: np.ndarray) -> tuple:
+    """(mean luma, grayscale thumbnail) of a downsampled frame."""
+    import cv2  # imported on first frame, not at API startup
+    small = cv2.resize(frame, _THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    return float(gray.mean()), gray
+
+
+def equalize_lut(gray: np.ndarray, clip_limit: float = PREPROCESS_CLIP_LIMIT) -> np.ndarray:
+    """Clip-limited histogram equalization table for a grayscale thumbnail."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    limit = max(1.0, clip_limit * hist.mean())
+    excess = np.maximum(hist - limit, 0).sum()
+    hist = np.minimum(hist, limit) + excess / 256
+    cdf = hist.cumsum()
+    return np.clip(np.round(cdf / cdf[-1] * 255), 0, 255).astype(np.uint8)
+
+
+class FramePreprocessor:
+    """Per-camera night detection with hysteresis and cached correction tables."""
+
+    def __init__(self, enabled: bool = PREPROCESS_ENABLED, dark: float = PREPROCESS_DARK_LEVEL,
+                 bright: float = PREPROCESS_BRIGHT_LEVEL, target: float = PREPROCESS_TARGET_LEVEL,
+                 buckets: int = PREPROCESS_BUCKETS, equalize: bool = PREPROCESS_EQUALIZE,
+                 refresh_frames: int = PREPROCESS_REFRESH_FRAMES):
+        self.enabled = enabled
+        self.dark = dark
+        self.bright = max(bright, dark)
+        self.target = target
+        self.buckets = max(1, buckets)
+        self.equalize = equalize
+        self.refresh_frames = max(1, refresh_frames)
+        self._gamma_luts = {}  # bucket -> uint8[256]
+        self._cameras = {}  # camera_id -> state dict
+        self._lock = threading.Lock()
+
+    def gamma_lut(self, bucket: int) -> np.ndarray:
+        """Gamma table that maps the centre of `bucket` to the target level."""
+        lut = self._gamma_luts.get(bucket)
+        if lut is None:
+            level = (bucket + 0.5) * 256 / self.buckets
+            gamma = math.log(self.target / 255) / math.log(min(level, 254) / 255)
+            gamma = min(1.0, max(0.25, gamma))
+            lut = np.clip(np.round(255 * (np.arange(256) / 255) ** gamma), 0, 255).astype(np.uint8)
+            self._gamma_luts[bucket] = lut
+        return lut
+
+    def _camera(self, camera_id: str) -> dict:
+        state = self._cameras.get(camera_id)
+        if state is None:
+            with self._lock:
+                state = self._cameras.setdefault(camera_id, {
+                    "brightness": None, "night": False, "bucket": None, "lut": None, "frames": 0,
+                })
+        return state
+
+    def process(self, frame: np.ndarray, camera_id: str) -> np.ndarray:
+        """Return `frame`, or a brightened copy when the camera's scene is dark."""
+        if not self.enabled:
+            return frame
+        state = self._camera(camera_id)
+        brightness, gray = estimate_brightness(frame)
+        state["brightness"] = brightness
+        if state["night"]:
+            state["night"] = brightness < self.bright
+        else:
+            state["night"] = brightness < self.dark
+        if not state["night"]:
+            state["lut"] = None
+            return frame
+
+        bucket = min(self.buckets - 1, int(brightness * self.buckets / 256))
+        state["frames"] += 1
+        stale = self.equalize and state["frames"] % self.refresh_frames == 0
+        if state["lut"] is None or bucket != state["bucket"] or stale:
+            lut = self.gamma_lut(bucket)
+            if self.equalize:
+                lut = equalize_lut(lut[gray])[lut]
+            state["bucket"], state["lut"] = bucket, lut
+        import cv2
+        return cv2.LUT(frame, state["lut"])
+
+    def mode(self, camera_id: str) -> tuple:
+        """(night, bucket) the last process() call for `camera_id` applied."""
+        state = self._cameras.get(camera_id)
+        if not self.enabled or state is None or not state["night"]:
+            return (False, None)
+        return (True, state["bucket"])
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "dark_level": self.dark,
+            "bright_level": self.bright,
+            "equalize": self.equalize,
+            "cached_gamma_tables": len(self._gamma_luts),
+            "cameras": {
+                camera_id: {
+                    "brightness": round(s["brightness"], 1) if s["brightness"] is not None else None,
+                    "night": s["night"],
+                    "bucket": s["bucket"],
+                }
+                for camera_id, s in list(self._cameras.items())
+            },
+        }
+
+
+# Global instance
+preprocessor = FramePreprocessor()
+
+metrics.registry.gauge(
+    "farm_scene_brightness", "Mean luma of the last frame per camera (0-255)", ("camera",),
+    callback=lambda: {
+        (camera_id,): s["brightness"]
+        for camera_id, s in list(preprocessor._cameras.items()) if s["brightness"] is not None
+    },
+)
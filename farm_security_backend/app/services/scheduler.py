@@ -0,0 +1,81 @@
+# app/services/scheduler.py
+import time
+import heapq
+import logging
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledCall:
+    """Handle returned by Scheduler.call_at; cancel() before it runs to drop it."""
+
+    __slots__ = ("when", "fn", "args", "cancelled")
+
+    def __init__(self, when: float, fn, args: tuple):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    One thread tracking every deadline in the app (reactivation, siren
+    auto-off, arming windows) on a heap, instead of a threading.Timer thread
+    per deadline. Due callbacks run on a small worker pool so a slow one
+    (e.g. a siren HTTP call) doesn't delay the others.
+    """
+
+    def __init__(self, workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduled")
+        self._heap = []
+        self._counter = itertools.count()  # tie-breaker so handles are never compared
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_at(self, when: float, fn, *args) -> ScheduledCall:
+        """Run fn(*args) at epoch time `when`."""
+        call = ScheduledCall(when, fn, args)
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._counter), call))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return call
+
+    def call_later(self, delay: float, fn, *args) -> ScheduledCall:
+        return self.call_at(time.time() + delay, fn, *args)
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, call in self._heap if not call.cancelled)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, call = heapq.heappop(self._heap)
+            if not call.cancelled:
+                self._executor.submit(self._invoke, call)
+
+    @staticmethod
+    def _invoke(call: ScheduledCall):
+        if call.cancelled:
+            return
+        try:
+            call.fn(*call.args)
+        except Exception:
+            logger.exception("Scheduled call %s failed", getattr(call.fn, "__name__", call.fn))
+
+
+# Global instance
+scheduler = Scheduler()
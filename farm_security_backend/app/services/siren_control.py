@@ -1,66 +1,260 @@
 # app/services/siren_control.py
 import os
+import json
+import time
+import logging
+import threading
 import requests
+from concurrent.futures import Future, wait
+from datetime import datetime
 from typing import Optional
 from dotenv import load_dotenv
 
+from app.services.state_store import state_store
+from app.services.scheduler import scheduler
+from app.services.ipc import daemon_mode, daemon_client
+from app.services import metrics
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ESP32-CAM IP address (same as camera stream)
 ESP32_CAM_IP = os.getenv("ESP32_CAM_IP", "10.18.81.133")  # Update to match your ESP32 IP
-SIREN_STATE = False
-SIREN_LOCK = False  # Prevent multiple simultaneous triggers
+SIREN_COMMAND_TIMEOUT = float(os.getenv("SIREN_COMMAND_TIMEOUT", "5"))
+SIREN_HTTP_TIMEOUT = float(os.getenv("SIREN_HTTP_TIMEOUT", "2"))
+# JSON list of sirens; without it the single siren on ESP32_CAM_IP serves every camera:
+#   [{"id": "north", "url": "http://10.0.0.21", "zone": "north", "cameras": ["ESP32-CAM-01"]},
+#    {"id": "barn", "url": "http://10.0.0.22", "zone": "barn", "cameras": ["*"]}]
+SIREN_DEVICES = os.getenv("SIREN_DEVICES", "").strip()
 
-def trigger_siren(state: str) -> bool:
-    """
-    Triggers the siren ON or OFF by sending HTTP request to ESP32.
-    ESP32 controls GPIO pin 2 (can be changed in Arduino code).
-    """
-    global SIREN_STATE, SIREN_LOCK
-    
-    if SIREN_LOCK:
-        return False
-    
-    SIREN_LOCK = True
-    
-    try:
-        # Send HTTP GET request to ESP32 siren endpoint
-        url = f"http://{ESP32_CAM_IP}/siren?state={state.upper()}"
-        
+class SirenDevice:
+    """One ESP32 siren endpoint plus its health as seen from the last command."""
+
+    def __init__(self, device_id: str, url: str, zone: str = "default", cameras: list = None):
+        self.id = device_id
+        self.url = url.rstrip("/")
+        self.zone = zone
+        self.cameras = cameras or ["*"]
+        self.state = False
+        self.healthy = None  # unknown until the first command
+        self.last_ack_ms = None
+        self.last_ack_at = None
+        self.last_error = None
+        self.failures = 0  # consecutive
+        self.commands = SirenCommandQueue(self.send)
+
+    def serves(self, camera_id: str) -> bool:
+        return "*" in self.cameras or camera_id in self.cameras
+
+    def send(self, state: str) -> bool:
+        """
+        Triggers the siren ON or OFF by sending HTTP request to ESP32.
+        ESP32 controls GPIO pin 2 (can be changed in Arduino code).
+        """
+        url = f"{self.url}/siren?state={state.upper()}"
+        started = time.perf_counter()
         try:
-            response = requests.get(url, timeout=2)
+            response = requests.get(url, timeout=SIREN_HTTP_TIMEOUT)
+            elapsed = time.perf_counter() - started
+            metrics.SIREN_ACK_SECONDS.observe(elapsed, device=self.id, success=response.status_code == 200)
             if response.status_code == 200:
-                SIREN_STATE = (state.upper() == "ON")
+                self.state = (state.upper() == "ON")
+                self.healthy, self.failures, self.last_error = True, 0, None
+                self.last_ack_ms = round(elapsed * 1000, 1)
+                self.last_ack_at = datetime.now()
                 if state.upper() == "ON":
-                    print(f"🔊 SIREN ACTIVATED via ESP32 (GPIO 2)")
+                    logger.warning("🔊 SIREN %s ACTIVATED via ESP32 (GPIO 2)", self.id)
                 else:
-                    print(f"🔇 SIREN DEACTIVATED via ESP32")
+                    logger.info("🔇 SIREN %s DEACTIVATED via ESP32", self.id)
                 return True
             else:
-                print(f"⚠️  Siren control failed: HTTP {response.status_code}")
+                self._failed(f"HTTP {response.status_code}")
+                logger.error("⚠️  Siren %s control failed: HTTP %s", self.id, response.status_code)
                 return False
         except requests.exceptions.RequestException as e:
-            print(f"⚠️  Failed to control siren on ESP32: {e}")
+            metrics.SIREN_ACK_SECONDS.observe(time.perf_counter() - started, device=self.id, success=False)
+            self._failed(str(e))
+            logger.error("⚠️  Failed to control siren %s on ESP32: %s", self.id, e)
             # Fallback: still update state for logging
-            SIREN_STATE = (state.upper() == "ON")
+            self.state = (state.upper() == "ON")
             return False
-    finally:
-        SIREN_LOCK = False
+
+    def _failed(self, error: str):
+        self.healthy = False
+        self.failures += 1
+        self.last_error = error
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "zone": self.zone,
+            "cameras": self.cameras,
+            "state": "ON" if self.state else "OFF",
+            "healthy": self.healthy,
+            "last_ack_ms": self.last_ack_ms,
+            "last_ack_at": self.last_ack_at.isoformat() if self.last_ack_at else None,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+        }
 
 def get_siren_state() -> bool:
-    """Returns current siren state."""
-    return SIREN_STATE
+    """Returns current siren state (True if any siren is on)."""
+    return state_store.get("siren_on")
+
+class SirenCommandQueue:
+    """
+    Serializes one siren's commands through one worker thread.
+
+    Commands that arrive while a request is in flight are coalesced: only
+    the most recent desired state is sent next. Callers that asked for that
+    state receive the send's result; callers whose request was superseded by
+    the opposite state receive False. ON/OFF requests can no longer race
+    each other on the wire.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._cond = threading.Condition()
+        self._pending = None
+        self._waiters = []
+        self._thread = None
+
+    def submit(self, state: str) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending = state.upper()
+            self._waiters.append((future, self._pending))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="siren-commands", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                state, waiters = self._pending, self._waiters
+                self._pending, self._waiters = None, []
+            if len(waiters) > 1:
+                logger.debug("Coalesced %d siren commands into %s", len(waiters), state)
+            try:
+                result = self._send(state)
+            except Exception as e:
+                logger.error("⚠️  Siren command %s failed: %s", state, e)
+                result = False
+            for future, requested in waiters:
+                future.set_result(result and requested == state)
+
+def _load_devices(value: str) -> list:
+    if value:
+        try:
+            return [
+                SirenDevice(d["id"], d["url"], d.get("zone", "default"), d.get("cameras"))
+                for d in json.loads(value)
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error("❌ Invalid SIREN_DEVICES, using the siren on ESP32_CAM_IP: %s", e)
+    return [SirenDevice("esp32-cam", f"http://{ESP32_CAM_IP}")]
 
 class SirenController:
-    """Wrapper class for siren control."""
-    
-    def toggle_siren(self, state: str) -> bool:
-        """Toggle siren ON or OFF."""
-        return trigger_siren(state)
-    
+    """
+    Registry of sirens with concurrent fan-out. Each siren has its own
+    command queue, so a command to N sirens costs one round trip, not N.
+    Auto-off is per group of sirens: a repeat alert re-arms the group's one
+    scheduler entry instead of stacking another OFF, and a group that shares
+    sirens with it keeps its deadline for the sirens it doesn't share.
+    """
+
+    def __init__(self, devices: list = None):
+        self.devices = {d.id: d for d in (devices if devices is not None else _load_devices(SIREN_DEVICES))}
+        self._auto_off = {}  # frozenset(device ids) -> ScheduledCall
+        self._lock = threading.Lock()
+
+    def select(self, camera_id: str = None, zone: str = None) -> list:
+        """Sirens for a camera or zone; all sirens when neither is given."""
+        devices = list(self.devices.values())
+        if zone is not None:
+            devices = [d for d in devices if d.zone == zone]
+        if camera_id is not None:
+            devices = [d for d in devices if d.serves(camera_id)]
+        return devices
+
+    def toggle_siren(self, state: str, timeout: Optional[float] = SIREN_COMMAND_TIMEOUT,
+                     camera_id: str = None, zone: str = None, auto_off: float = 0) -> bool:
+        """
+        Switch the selected sirens ON or OFF in parallel and wait for their acks.
+        Returns True if at least one siren acknowledged. With `auto_off` seconds,
+        the same group is switched off again later.
+        """
+        if daemon_mode():
+            return daemon_client.call("siren", state=state, camera_id=camera_id, zone=zone, auto_off=auto_off)
+        devices = self.select(camera_id, zone)
+        if not devices:
+            logger.warning("⚠️  No siren mapped to camera=%s zone=%s", camera_id, zone)
+            return False
+        state = state.upper()
+        group = frozenset(d.id for d in devices)
+        self._cancel_auto_off(group)
+        if state == "ON" and auto_off > 0:
+            with self._lock:
+                self._auto_off[group] = scheduler.call_later(auto_off, self._group_off, group)
+
+        futures = [d.commands.submit(state) for d in devices]
+        done, not_done = wait(futures, timeout=timeout)
+        for device, future in zip(devices, futures):
+            if future in not_done:
+                logger.error("⚠️  Siren %s command %s still queued after %ss", device.id, state, timeout)
+        state_store.set_siren_on(any(d.state for d in self.devices.values()))
+        return any(f.result() for f in done)
+
+    def _cancel_auto_off(self, group: frozenset):
+        """
+        Take the sirens in `group` out of every pending auto-off. Groups that
+        only partly overlap keep their deadline for their remaining sirens.
+        """
+        with self._lock:
+            for key in [k for k in self._auto_off if k & group]:
+                call = self._auto_off.pop(key)
+                call.cancel()
+                rest = key - group
+                if not rest:
+                    continue
+                existing = self._auto_off.get(rest)
+                if existing is not None and existing.when >= call.when:
+                    continue
+                if existing is not None:
+                    existing.cancel()
+                self._auto_off[rest] = scheduler.call_at(call.when, self._group_off, rest)
+
+    def _group_off(self, group: frozenset):
+        with self._lock:
+            self._auto_off.pop(group, None)
+        devices = [self.devices[i] for i in group if i in self.devices]
+        futures = [d.commands.submit("OFF") for d in devices]
+        wait(futures, timeout=SIREN_COMMAND_TIMEOUT)
+        state_store.set_siren_on(any(d.state for d in self.devices.values()))
+        logger.info("🔇 Auto-off for sirens %s", sorted(group))
+
     def get_state(self) -> bool:
         """Get current siren state."""
         return get_siren_state()
 
+    def status(self) -> dict:
+        """Per-siren state, health and last ack latency, plus pending auto-offs."""
+        if daemon_mode():
+            return daemon_client.call("sirens")
+        with self._lock:
+            auto_off = [
+                {"sirens": sorted(group), "at": datetime.fromtimestamp(call.when).isoformat()}
+                for group, call in self._auto_off.items()
+            ]
+        return {
+            "sirens": [d.status() for d in self.devices.values()],
+            "pending_auto_off": auto_off,
+        }
+
 # Global instance
 siren_controller = SirenController()
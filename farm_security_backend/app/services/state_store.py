@@ -0,0 +1,150 @@
+# app/services/state_store.py
+import time
+import logging
+import threading
+
+from app.services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    Single in-memory home for the system/siren/camera state.
+
+    Every transition happens under one lock and bumps a version number.
+    Listeners are called (outside the lock) only when a value actually
+    changes, so per-frame updates such as "camera connected" are free when
+    nothing changed. The auto-reactivation deadline is one cancellable entry
+    on the shared scheduler: deactivating again replaces it instead of
+    stacking another one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._state = {
+            "system_active": True,
+            "reactivate_at": None,  # epoch seconds, or None
+            "siren_on": False,
+            "camera_connected": False,
+            "stream_open": False,
+            "model_ready": False,  # detector loaded and warmed up
+            "last_event": None,  # {"id", "detection_type", "timestamp"} of the newest event
+            "armed_cameras": {},  # camera_id -> active arming profile name, None when disarmed
+        }
+        self._version = 0
+        self._listeners = []
+        self._reactivate_timer = None
+
+    # --- Generic access ---
+
+    def get(self, key: str):
+        with self._lock:
+            return self._state[key]
+
+    def snapshot(self) -> dict:
+        """Copy of all values plus the version they belong to."""
+        with self._lock:
+            return dict(self._state, version=self._version)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _update(self, compute=None, **changes) -> bool:
+        """
+        Apply changes atomically; notify listeners if anything changed.
+        `compute(state) -> changes` derives changes from the current state
+        under the same lock (read-modify-write).
+        """
+        with self._lock:
+            if compute is not None:
+                changes = compute(self._state)
+            diff = {k: v for k, v in changes.items() if self._state[k] != v}
+            if not diff:
+                return False
+            self._state.update(diff)
+            self._version += 1
+            version = self._version
+            listeners = list(self._listeners)
+            self._changed.notify_all()
+        for listener in listeners:
+            try:
+                listener(diff, version)
+            except Exception:
+                logger.exception("State listener failed")
+        return True
+
+    def subscribe(self, listener):
+        """Call listener(changes: dict, version: int) on every change. Returns an unsubscribe function."""
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def wait_for_change(self, version: int, timeout: float = None) -> int:
+        """Block until the version moves past `version`; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version > version, timeout=timeout)
+            return self._version
+
+    # --- System arming ---
+
+    def set_system_active(self, active: bool, reactivate_after: float = None) -> bool:
+        """
+        Arm or disarm the system. When disarming with `reactivate_after`
+        seconds, a single reactivation deadline is (re)scheduled; arming
+        cancels it. Returns the resulting state.
+        """
+        with self._lock:
+            if self._reactivate_timer is not None:
+                self._reactivate_timer.cancel()
+                self._reactivate_timer = None
+            reactivate_at = None
+            if not active and reactivate_after:
+                reactivate_at = time.time() + reactivate_after
+                self._reactivate_timer = scheduler.call_at(reactivate_at, self._auto_reactivate, reactivate_at)
+        self._update(system_active=active, reactivate_at=reactivate_at)
+        return active
+
+    def _auto_reactivate(self, deadline: float):
+        with self._lock:
+            # A newer deadline replaced this one after the timer fired
+            if self._state["reactivate_at"] != deadline:
+                return
+            self._reactivate_timer = None
+        self._update(system_active=True, reactivate_at=None)
+        logger.warning("*** SYSTEM AUTO-REACTIVATED ***")
+
+    # --- Siren / camera ---
+
+    def set_siren_on(self, on: bool):
+        self._update(siren_on=on)
+
+    def set_camera_connected(self, connected: bool):
+        self._update(camera_connected=connected)
+
+    def set_stream_open(self, is_open: bool):
+        self._update(stream_open=is_open)
+
+    def set_model_ready(self, ready: bool):
+        self._update(model_ready=ready)
+
+    def set_camera_armed(self, camera_id: str, profile_name):
+        self._update(lambda state: {"armed_cameras": dict(state["armed_cameras"], **{camera_id: profile_name})})
+
+    def mirror(self, state: dict):
+        """Take over values published by another process (see ipc.DaemonClient)."""
+        self._update(**{k: v for k, v in state.items() if k in self._state})
+
+    def record_event(self, event_id: int, detection_type: str, timestamp: str):
+        self._update(last_event={"id": event_id, "detection_type": detection_type, "timestamp": timestamp})
+
+
+# Global instance
+state_store = StateStore()
@@ -0,0 +1,57 @@
+# app/services/status_snapshot.py
+import json
+import hashlib
+import threading
+
+from fastapi import Request, Response
+
+from app.services.state_store import state_store
+
+
+class StatusSnapshot:
+    """
+    Pre-serialized status payloads for dashboard polling.
+
+    Each payload is built by a registered builder from a state_store
+    snapshot and cached against the store's version, so repeated polls
+    reuse the same bytes until something actually changes. Responses carry
+    an ETag; a matching If-None-Match gets a bodyless 304.
+    """
+
+    def __init__(self, store=state_store):
+        self._store = store
+        self._builders = {}
+        self._cache = {}  # name -> (version, body, etag)
+        self._lock = threading.Lock()
+
+    def register(self, name: str, builder):
+        """builder(state: dict) -> JSON-serializable payload."""
+        self._builders[name] = builder
+
+    def build(self, name: str, state: dict):
+        return self._builders[name](state)
+
+    def get(self, name: str) -> tuple:
+        """(body bytes, etag) for `name` at the current state version."""
+        version = self._store.version
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        with self._lock:
+            state = self._store.snapshot()
+            body = json.dumps(self.build(name, state), separators=(",", ":")).encode()
+            etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            self._cache[name] = (state["version"], body, etag)
+        return body, etag
+
+    def respond(self, request: Request, name: str) -> Response:
+        body, etag = self.get(name)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Global instance
+status_snapshot = StatusSnapshot()
@@ -0,0 +1,113 @@
+# app/services/temporal_filter.py
+import os
+import threading
+from collections import deque
+
+# A single-frame detection is not enough to act on. For every (camera, class)
+# pair we keep the last ALERT_WINDOW_SIZE detection passes and only confirm
+# the class once it was seen in at least ALERT_MIN_HITS of them. The averaged
+# confidence of those hits then decides the severity:
+#   "log"    -> write the event to the database
+#   "notify" -> also send a push notification
+#   "siren"  -> also sound the siren
+ALERT_WINDOW_SIZE = int(os.getenv("ALERT_WINDOW_SIZE", "3"))  # M
+ALERT_MIN_HITS = int(os.getenv("ALERT_MIN_HITS", "2"))  # N
+SEVERITY_ORDER = ["log", "notify", "siren"]
+
+
+def load_severity_thresholds() -> dict:
+    """ALERT_{LOG,NOTIFY,SIREN}_THRESHOLD from the environment (default: the detection threshold)."""
+    default = os.getenv("DETECTION_CONFIDENCE_THRESHOLD", "0.3")
+    return {severity: float(os.getenv(f"ALERT_{severity.upper()}_THRESHOLD", default)) for severity in SEVERITY_ORDER}
+
+
+SEVERITY_THRESHOLDS = load_severity_thresholds()
+
+
+def severity_at_least(severity: str, minimum: str) -> bool:
+    """True if `severity` is the same as or stronger than `minimum`."""
+    if severity not in SEVERITY_ORDER:
+        return False
+    return SEVERITY_ORDER.index(severity) >= SEVERITY_ORDER.index(minimum)
+
+
+class TemporalVoter:
+    """Sliding-window N-of-M voting per camera and class."""
+
+    def __init__(self, window_size: int = ALERT_WINDOW_SIZE, min_hits: int = ALERT_MIN_HITS,
+                 thresholds: dict = None):
+        self.window_size = window_size
+        self.min_hits = min(min_hits, window_size)
+        self.thresholds = dict(thresholds or SEVERITY_THRESHOLDS)
+        self._windows = {}  # (camera_id, label) -> deque of confidence or None
+        self._lock = threading.Lock()
+
+    def update(self, camera_id: str, detections: list):
+        """
+        Record one detection pass for a camera and return the strongest
+        confirmed alert as {'label', 'confidence', 'severity', 'hits'}, or None.
+        An empty `detections` list still counts as a pass (a miss for every class).
+        """
+        best_per_label = {}
+        for det in detections:
+            label = det["label"]
+            conf = det.get("confidence", 0.0)
+            if conf > best_per_label.get(label, -1.0):
+                best_per_label[label] = conf
+
+        decision = None
+        with self._lock:
+            labels = {lbl for cam, lbl in self._windows if cam == camera_id} | set(best_per_label)
+            for label in labels:
+                window = self._windows.setdefault(
+                    (camera_id, label), deque(maxlen=self.window_size)
+                )
+                window.append(best_per_label.get(label))
+                hits = [c for c in window if c is not None]
+                if not hits:
+                    # Class has left the scene entirely; forget its window
+                    del self._windows[(camera_id, label)]
+                    continue
+                if len(hits) < self.min_hits:
+                    continue
+                avg_conf = sum(hits) / len(hits)
+                severity = self._severity(avg_conf)
+                if severity is None:
+                    continue
+                candidate = {
+                    "label": label,
+                    "confidence": avg_conf,
+                    "severity": severity,
+                    "hits": len(hits),
+                }
+                if decision is None or (
+                    SEVERITY_ORDER.index(severity), avg_conf
+                ) > (SEVERITY_ORDER.index(decision["severity"]), decision["confidence"]):
+                    decision = candidate
+        return decision
+
+    def set_thresholds(self, thresholds: dict):
+        """Replace some or all severity thresholds (unknown severities are ignored)."""
+        with self._lock:
+            self.thresholds.update({k: float(v) for k, v in thresholds.items() if k in SEVERITY_ORDER})
+
+    def _severity(self, confidence: float):
+        """Highest severity whose threshold `confidence` reaches."""
+        result = None
+        for severity in SEVERITY_ORDER:
+            if confidence >= self.thresholds[severity]:
+                result = severity
+        return result
+
+    def reset(self, camera_id: str = None):
+        """Forget history for one camera (or all cameras)."""
+        with self._lock:
+            if camera_id is None:
+                self._windows.clear()
+            else:
+                for key in [k for k in self._windows if k[0] == camera_id]:
+                    del self._windows[key]
+
+
+# Global instance
+temporal_voter = TemporalVoter()
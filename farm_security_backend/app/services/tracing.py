@@ -0,0 +1,63 @@
+# app/services/tracing.py
+import math
+import time
+from datetime import datetime
+
+# End-to-end latency of the alert pipeline. Each frame gets a FrameTrace at
+# capture; later stages record their offset from capture in milliseconds.
+# Traces of frames that raise an alert are stored in DetectionEventDB.data
+# under "trace" so latency can be aggregated from the event table.
+STAGES = ["detected", "decided", "siren_ack", "push_ack"]
+
+
+class FrameTrace:
+    """Monotonic stage timings for one frame, relative to its capture."""
+
+    __slots__ = ("captured_at", "_t0", "stages")
+
+    def __init__(self):
+        self.captured_at = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage: str) -> float:
+        """Record `stage` now; returns milliseconds since capture."""
+        elapsed = (time.perf_counter() - self._t0) * 1000
+        self.stages[stage] = round(elapsed, 2)
+        return elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            "captured_at": datetime.fromtimestamp(self.captured_at).isoformat(),
+            "stages_ms": dict(self.stages),
+        }
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_traces(traces: list, percentiles=(50, 90, 95, 99)) -> dict:
+    """Per-stage count/min/max/percentiles (ms since capture) over trace dicts."""
+    per_stage = {}
+    for trace in traces:
+        for stage, ms in (trace or {}).get("stages_ms", {}).items():
+            per_stage.setdefault(stage, []).append(ms)
+
+    ordered = STAGES + sorted(s for s in per_stage if s not in STAGES)
+    summary = {}
+    for stage in ordered:
+        values = sorted(per_stage.get(stage, []))
+        if not values:
+            continue
+        summary[stage] = {
+            "count": len(values),
+            "min": values[0],
+            "max": values[-1],
+            **{f"p{p}": percentile(values, p) for p in percentiles},
+        }
+    return summary
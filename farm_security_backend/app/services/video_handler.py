@@ -1,10 +1,13 @@
 import cv2
 import numpy as np
 import os
+import logging
 import datetime
 import threading
 import time
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
@@ -35,7 +38,7 @@ class VideoHandler:
                 args=(detection_type,),
                 daemon=True # Daemon thread so it closes when main app closes
             ).start()
-            print(f"Started 2-minute recording for {detection_type} event.")
+            logger.info("Started 2-minute recording for %s event.", detection_type)
             return True
 
     def add_frame(self, frame: np.ndarray):
@@ -44,7 +47,8 @@ class VideoHandler:
         PRE_EVENT_BUFFER_SIZE = FPS * 5 
         
         with self._lock:
-            self._frame_buffer.append(frame.copy())
+            # Frames published through FrameSlot are read-only, so keep the reference
+            self._frame_buffer.append(frame)
             
             # Trim buffer if not recording
             if not self._is_recording and len(self._frame_buffer) > PRE_EVENT_BUFFER_SIZE:
@@ -93,7 +97,7 @@ class VideoHandler:
         writer.release()
         with self._lock:
             self._is_recording = False
-        print(f"Finished recording: {filepath}")
+        logger.info("Finished recording: %s", filepath)
 
 # Global instance
 video_handler = VideoHandler()
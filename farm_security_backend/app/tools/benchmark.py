@@ -0,0 +1,239 @@
+# app/tools/benchmark.py
+"""
+Offline benchmark: replay recorded clips through the detection pipeline.
+
+Frames are decoded from video files and fed through the same
+AlertPipeline (run_detection -> temporal confirmation -> alert decision)
+as the live camera loop, with the siren, OneSignal and database replaced
+by stub sinks. The alert cooldown runs on clip time, so fast replays make
+the same decisions as real time. Runs headless on CPU.
+
+    python -m app.tools.benchmark                      # all clips in uploads/
+    python -m app.tools.benchmark clips/ --realtime    # pace at clip FPS
+    python -m app.tools.benchmark --frame-skip 1 --max-frames 500 --json
+
+Backend / batching knobs are the usual environment variables
+(INFERENCE_WORKERS starts the worker pool, DETECTION_TILED_CAMERAS,
+DETECTION_CACHE_MODE, ...).
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import cv2
+
+from app.logging_config import setup_logging
+from app.services.video_handler import UPLOADS_DIR
+from app.services.temporal_filter import TemporalVoter
+from app.services.tracing import FrameTrace, percentile
+
+VIDEO_EXTENSIONS = (".avi", ".mp4", ".mkv", ".mov")
+
+
+class StubSinks:
+    """Records alert side effects instead of performing them."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.calls = {"siren": 0, "notify": 0, "db": 0}
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def siren(self, state: str, **kwargs) -> bool:
+        self._wait()
+        self.calls["siren"] += 1
+        return True
+
+    def notify(self, title: str, message: str, **kwargs) -> bool:
+        self._wait()
+        self.calls["notify"] += 1
+        return True
+
+    def log_event(self, **kwargs):
+        self._wait()
+        self.calls["db"] += 1
+        return self.calls["db"]
+
+
+def find_videos(paths: list) -> list:
+    """Expand files/directories into a sorted list of video files."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for ext in VIDEO_EXTENSIONS:
+                videos.extend(glob.glob(os.path.join(path, f"*{ext}")))
+        elif os.path.isfile(path):
+            videos.append(path)
+    return sorted(videos)
+
+
+def peak_rss_mb() -> float:
+    """Process memory high-water mark in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _stats(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def run_benchmark(videos: list, frame_skip: int = 3, realtime: bool = False, max_frames: int = 0,
+                  sink_latency_ms: float = 0.0, camera_id: str = "BENCH-CAM") -> dict:
+    """Replay `videos` through the alert pipeline and return the report dict."""
+    # Imported here so --help works without loading the model
+    from app.services.alert_pipeline import AlertPipeline
+    from app.services.detection import model_registry
+    from app.services.inference_pool import inference_pool
+
+    sinks = StubSinks(sink_latency_ms)
+    replay_clock = [0.0]  # seconds of video replayed so far
+    pipeline = AlertPipeline(
+        siren=sinks.siren, notify=sinks.notify, log_event=sinks.log_event,
+        voter=TemporalVoter(), siren_auto_off=0, clock=lambda: replay_clock[0],
+    )
+    timings = {"decode_ms": [], "detect_ms": [], "decide_ms": []}
+    detections_per_class = {}
+    alerts_per_class = {}
+    frames = detected_frames = 0
+    started = time.perf_counter()
+
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 15.0
+        clip_start = time.perf_counter()
+        clip_frames = 0
+        while True:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            trace = FrameTrace()
+            timings["decode_ms"].append((time.perf_counter() - t0) * 1000)
+            frames += 1
+            clip_frames += 1
+            replay_clock[0] += 1.0 / fps
+
+            if frames % frame_skip == 0:
+                detections, decision = pipeline.process(frame, trace, camera_id)
+                detected_frames += 1
+                timings["detect_ms"].append(trace.stages["detected"])
+                if "decided" in trace.stages:
+                    timings["decide_ms"].append(trace.stages["decided"] - trace.stages["detected"])
+                for det in detections:
+                    detections_per_class[det["label"]] = detections_per_class.get(det["label"], 0) + 1
+                if decision is not None:
+                    label = decision["label"]
+                    alerts_per_class[label] = alerts_per_class.get(label, 0) + 1
+
+            if realtime:
+                # Sleep until this frame's presentation time
+                delay = clip_frames / fps - (time.perf_counter() - clip_start)
+                if delay > 0:
+                    time.sleep(delay)
+            if max_frames and frames >= max_frames:
+                break
+        cap.release()
+        if max_frames and frames >= max_frames:
+            break
+
+    elapsed = time.perf_counter() - started
+    active = model_registry.active
+    return {
+        "videos": len(videos),
+        "frames": frames,
+        "detection_frames": detected_frames,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "detection_fps": round(detected_frames / elapsed, 2) if elapsed else 0.0,
+        "frame_skip": frame_skip,
+        "realtime": realtime,
+        "model": active.path if active else None,
+        "inference_workers": inference_pool.workers if inference_pool.running else 0,
+        "latency_ms": {name: _stats(values) for name, values in timings.items()},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "detections": detections_per_class,
+        "confirmed_decisions": alerts_per_class,
+        "sink_calls": sinks.calls,
+    }
+
+
+def print_report(report: dict):
+    print(f"Videos: {report['videos']}  Frames: {report['frames']}  Detection frames: {report['detection_frames']}")
+    print(f"Model: {report['model']}")
+    print(f"Elapsed: {report['elapsed_s']} s  FPS: {report['fps']}  Detection FPS: {report['detection_fps']}")
+    print(f"Peak RSS: {report['peak_rss_mb']} MB")
+    print("Latency (ms):")
+    for stage, stats in report["latency_ms"].items():
+        if stats["count"]:
+            print(f"  {stage:<10} p50={stats['p50']:<8} p90={stats['p90']:<8} p99={stats['p99']:<8} max={stats['max']}")
+    print(f"Detections: {report['detections']}")
+    print(f"Confirmed decisions: {report['confirmed_decisions']}")
+    print(f"Sink calls: {report['sink_calls']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay video clips through the detection pipeline.")
+    parser.add_argument("paths", nargs="*", default=[UPLOADS_DIR], help="Video files or directories (default: uploads/)")
+    parser.add_argument("--frame-skip", type=int, default=3, help="Run detection every N frames (default: 3)")
+    parser.add_argument("--realtime", action="store_true", help="Pace playback at each clip's FPS")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop after N frames (0 = all)")
+    parser.add_argument("--sink-latency-ms", type=float, default=0.0, help="Simulated siren/push/DB latency")
+    parser.add_argument("--model", help="Model file to load instead of the default best.onnx")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    videos = find_videos(args.paths)
+    if not videos:
+        parser.error(f"No video files found in {args.paths}")
+
+    # Load synchronously: the API loads the model in the background instead
+    from app.services.detection import model_registry, MODEL_PATH, start_inference_pool
+    from app.services.inference_pool import inference_pool, INFERENCE_TIMEOUT
+    model_path = args.model or MODEL_PATH
+    if not model_registry.load(model_path):
+        parser.error(f"Could not load model {model_path}")
+    start_inference_pool()
+    if inference_pool.running and not inference_pool.wait_ready(timeout=max(60.0, INFERENCE_TIMEOUT)):
+        inference_pool.stop()
+        parser.error("Inference workers did not load the model")
+
+    try:
+        report = run_benchmark(
+            videos,
+            frame_skip=max(1, args.frame_skip),
+            realtime=args.realtime,
+            max_frames=args.max_frames,
+            sink_latency_ms=args.sink_latency_ms,
+        )
+    finally:
+        inference_pool.stop()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
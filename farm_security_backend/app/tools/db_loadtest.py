@@ -0,0 +1,100 @@
+# app/tools/db_loadtest.py
+"""
+Load test: /alerts read latency while events are being written.
+
+Runs concurrent readers against GET /alerts for two phases - idle, then
+with writers POSTing events to /api/events/ - and prints latency
+percentiles for each. Point it at a test instance: the written events
+stay in that server's database.
+
+    python -m app.tools.db_loadtest                          # http://127.0.0.1:8000
+    python -m app.tools.db_loadtest --readers 20 --writers 4 --seconds 30
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+import requests
+
+from app.services.tracing import percentile
+
+
+def _reader(base_url: str, stop: threading.Event, latencies: list, errors: list):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = session.get(f"{base_url}/alerts", params={"limit": 100}, timeout=30)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except requests.exceptions.RequestException as e:
+            errors.append(str(e))
+
+
+def _writer(base_url: str, stop: threading.Event, written: list, interval: float):
+    session = requests.Session()
+    while not stop.is_set():
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "detection_type": "loadtest",
+            "device_id": "LOADTEST",
+            "data": {"payload": "x" * 512},
+        }
+        try:
+            session.post(f"{base_url}/api/events/", json=event, timeout=30).raise_for_status()
+            written.append(1)
+        except requests.exceptions.RequestException:
+            pass
+        if interval:
+            time.sleep(interval)
+
+
+def run_phase(base_url: str, readers: int, writers: int, seconds: float, write_interval: float) -> dict:
+    stop = threading.Event()
+    latencies, errors, written = [], [], []
+    threads = [threading.Thread(target=_reader, args=(base_url, stop, latencies, errors)) for _ in range(readers)]
+    threads += [threading.Thread(target=_writer, args=(base_url, stop, written, write_interval)) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": len(errors),
+        "events_written": len(written),
+        "rps": round(len(values) / seconds, 1),
+        **{f"p{p}_ms": round(percentile(values, p), 1) if values else None for p in (50, 90, 99)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure /alerts latency with and without concurrent event writes.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend base URL")
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each phase")
+    parser.add_argument("--write-interval", type=float, default=0.0, help="Pause between writes per writer")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    base_url = args.url.rstrip("/")
+    report = {
+        "idle": run_phase(base_url, args.readers, 0, args.seconds, 0),
+        "writing": run_phase(base_url, args.readers, args.writers, args.seconds, args.write_interval),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for phase, stats in report.items():
+        print(f"{phase:<8} requests={stats['requests']:<6} rps={stats['rps']:<7} "
+              f"p50={stats['p50_ms']}ms p90={stats['p90_ms']}ms p99={stats['p99_ms']}ms "
+              f"errors={stats['errors']} written={stats['events_written']}")
+
+
+if __name__ == "__main__":
+    main()
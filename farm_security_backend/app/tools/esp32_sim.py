@@ -0,0 +1,264 @@
+# app/tools/esp32_sim.py
+"""
+Local ESP32-CAM simulator for load testing.
+
+Each simulated camera mirrors the CameraWebServer firmware
+(aurdino code/CameraWebServer/app_httpd.cpp): a control server with
+/capture, /status, /control?var=&val= and /siren?state=, and a stream
+server on the next port with /stream (multipart MJPEG using the firmware's
+boundary and part headers). Frames come from video files, looped.
+
+    python -m app.tools.esp32_sim                       # 1 camera on :8100/:8101
+    python -m app.tools.esp32_sim --cameras 50 --fps 10 --jitter-ms 20
+    python -m app.tools.esp32_sim --disconnect-every 60 --slow-ms 500
+
+Camera i listens on base_port + 2*i (control) and base_port + 2*i + 1 (stream).
+
+The backend drives one camera per instance (ESP32_CAM_STREAM_URLS lists
+failover URLs for that one camera), so the simulator prints one block of
+environment variables per camera: start one backend per block.
+"""
+import os
+import glob
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cv2
+
+from app.services.video_handler import UPLOADS_DIR
+
+PART_BOUNDARY = "123456789000000000000987654321"
+STREAM_CONTENT_TYPE = f"multipart/x-mixed-replace;boundary={PART_BOUNDARY}"
+STREAM_BOUNDARY = f"\r\n--{PART_BOUNDARY}\r\n".encode()
+STREAM_PART = "Content-Type: image/jpeg\r\nContent-Length: {length}\r\nX-Timestamp: {sec}.{usec:06d}\r\n\r\n"
+
+# esp32-camera framesize_t values -> (width, height)
+FRAMESIZES = {
+    0: (96, 96), 1: (160, 120), 2: (176, 144), 3: (240, 176), 4: (240, 240),
+    5: (320, 240), 6: (400, 296), 7: (480, 320), 8: (640, 480), 9: (800, 600),
+    10: (1024, 768), 11: (1280, 720), 12: (1280, 1024), 13: (1600, 1200),
+}
+
+
+def esp_quality_to_jpeg(quality: int) -> int:
+    """ESP32 quality is 0-63 with lower = better; map to OpenCV's 0-100."""
+    return max(5, min(100, int(100 - quality * 1.5)))
+
+
+class SimulatedCamera:
+    """Frame source and sensor state for one simulated ESP32-CAM."""
+
+    def __init__(self, index: int, videos: list, fps: float, jitter_ms: float = 0.0,
+                 slow_ms: float = 0.0, disconnect_every: float = 0.0):
+        self.index = index
+        self.videos = videos[index % len(videos):] + videos[:index % len(videos)]
+        self.fps = fps
+        self.jitter = jitter_ms / 1000
+        self.slow = slow_ms / 1000
+        self.disconnect_every = disconnect_every
+        self.status = {"framesize": 8, "quality": 12, "brightness": 0, "contrast": 0, "saturation": 0}
+        self.siren_state = False
+        self._jpeg = None
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def run(self):
+        """Decode clips in a loop and keep the latest JPEG at the configured FPS."""
+        interval = 1.0 / self.fps
+        while True:
+            for path in self.videos:
+                cap = cv2.VideoCapture(path)
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    self._publish(frame)
+                    delay = interval + (random.gauss(0, self.jitter) if self.jitter else 0)
+                    time.sleep(max(0.0, delay))
+                cap.release()
+
+    def _publish(self, frame):
+        width, height = FRAMESIZES.get(self.status["framesize"], (640, 480))
+        if (frame.shape[1], frame.shape[0]) != (width, height):
+            frame = cv2.resize(frame, (width, height))
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, esp_quality_to_jpeg(self.status["quality"])])
+        if not ok:
+            return
+        with self._cond:
+            self._jpeg = buf.tobytes()
+            self._seq += 1
+            self._cond.notify_all()
+
+    def wait_frame(self, seq: int, timeout: float = 2.0):
+        """Next JPEG newer than `seq` as (jpeg, seq); (None, seq) on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > seq, timeout=timeout):
+                return None, seq
+            return self._jpeg, self._seq
+
+    def maybe_slow(self):
+        if self.slow:
+            time.sleep(self.slow)
+
+
+class ESP32Handler(BaseHTTPRequestHandler):
+    """Routes of the firmware's control and stream servers."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def camera(self) -> SimulatedCamera:
+        return self.server.camera
+
+    def log_message(self, format, *args):
+        pass  # keep load tests quiet
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = None, headers: dict = None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.server.is_stream:
+            if url.path == "/stream":
+                return self._stream()
+            return self._send(404)
+        routes = {
+            "/capture": self._capture,
+            "/status": self._status,
+            "/control": self._control,
+            "/siren": self._siren,
+        }
+        handler = routes.get(url.path)
+        if handler is None:
+            return self._send(404)
+        self.camera.maybe_slow()
+        handler(query)
+
+    def _capture(self, query):
+        jpeg, _ = self.camera.wait_frame(0, timeout=2.0)
+        if jpeg is None:
+            return self._send(500)
+        now = time.time()
+        self._send(200, jpeg, "image/jpeg", {
+            "Content-Disposition": "inline; filename=capture.jpg",
+            "X-Timestamp": f"{int(now)}.{int(now % 1 * 1e6):06d}",
+        })
+
+    def _status(self, query):
+        self._send(200, json.dumps(self.camera.status).encode(), "application/json")
+
+    def _control(self, query):
+        var, val = query.get("var"), query.get("val")
+        if var is None or val is None:
+            return self._send(404)
+        try:
+            value = int(val)
+        except ValueError:
+            return self._send(500)
+        if var == "framesize" and value not in FRAMESIZES:
+            return self._send(500)
+        self.camera.status[var] = value
+        self._send(200)
+
+    def _siren(self, query):
+        state = query.get("state", "")
+        if state.upper() not in ("ON", "OFF"):
+            return self._send(404)
+        self.camera.siren_state = state.upper() == "ON"
+        self._send(200)
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", STREAM_CONTENT_TYPE)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("X-Framerate", str(int(self.camera.fps)))
+        self.end_headers()
+        # Firmware streams until the client goes away; optionally drop early
+        deadline = None
+        if self.camera.disconnect_every:
+            deadline = time.time() + random.expovariate(1.0 / self.camera.disconnect_every)
+        seq = 0
+        try:
+            while deadline is None or time.time() < deadline:
+                jpeg, seq = self.camera.wait_frame(seq)
+                if jpeg is None:
+                    continue
+                now = time.time()
+                header = STREAM_PART.format(length=len(jpeg), sec=int(now), usec=int(now % 1 * 1e6))
+                self.wfile.write(STREAM_BOUNDARY + header.encode() + jpeg)
+            self.close_connection = True
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_camera(camera: SimulatedCamera, host: str, port: int) -> list:
+    """Start the frame source plus control (port) and stream (port + 1) servers."""
+    threading.Thread(target=camera.run, daemon=True).start()
+    servers = []
+    for offset, is_stream in ((0, False), (1, True)):
+        server = ThreadingHTTPServer((host, port + offset), ESP32Handler)
+        server.daemon_threads = True
+        server.camera = camera
+        server.is_stream = is_stream
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate ESP32-CAM devices on localhost.")
+    parser.add_argument("sources", nargs="*", default=[UPLOADS_DIR], help="Video files or directories (default: uploads/)")
+    parser.add_argument("--cameras", type=int, default=1, help="Number of simulated cameras")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Std-dev of frame interval jitter")
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="Delay added to /capture, /status, /control, /siren")
+    parser.add_argument("--disconnect-every", type=float, default=0.0,
+                        help="Mean seconds before a stream connection is dropped (0 = never)")
+    args = parser.parse_args(argv)
+
+    videos = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            videos.extend(sorted(glob.glob(os.path.join(source, "*.avi")) + glob.glob(os.path.join(source, "*.mp4"))))
+        elif os.path.isfile(source):
+            videos.append(source)
+    if not videos:
+        parser.error(f"No video files found in {args.sources}")
+
+    print(f"Simulating {args.cameras} ESP32-CAM(s) from {len(videos)} clip(s) at {args.fps} FPS")
+    for i in range(args.cameras):
+        port = args.base_port + 2 * i
+        camera = SimulatedCamera(i, videos, args.fps, args.jitter_ms, args.slow_ms, args.disconnect_every)
+        start_camera(camera, args.host, port)
+        # One backend instance per camera
+        print(f"\n# camera {i}")
+        print(f"CAMERA_DEVICE_ID=SIM-CAM-{i:02d}")
+        print(f"ESP32_CAM_STREAM_URLS=http://{args.host}:{port + 1}/stream")
+        print(f"ESP32_CAM_SNAPSHOT_URL=http://{args.host}:{port}/capture")
+        print(f"ESP32_CAM_IP={args.host}:{port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# app/tools/quantize.py
+"""
+Build a statically quantized INT8 variant of the detector and compare it
+with the FP32 model on our own footage.
+
+Calibration frames are sampled evenly from recorded clips (uploads/*.avi)
+and letterboxed the way ultralytics feeds the model. The INT8 model is
+written next to the FP32 one as <name>.int8.onnx; run the detector on it
+with DETECTION_MODEL_PRECISION=int8.
+
+The comparison runs both models on a second, disjoint set of frames and
+treats the FP32 detections above the confidence threshold as ground truth:
+mAP@0.5 and mAP@0.5:0.95 of the INT8 detections against them (a proxy -
+no labels are involved), precision/recall and per-frame alert agreement at
+the threshold, and per-frame latency for both models.
+
+    python -m app.tools.quantize                          # best.onnx -> best.int8.onnx + report
+    python -m app.tools.quantize --calib-frames 300 --calibration percentile
+    python -m app.tools.quantize --compare-only --json    # report for an existing INT8 model
+
+Requires onnx and onnxruntime (pip install onnx onnxruntime).
+"""
+import os
+import re
+import json
+import time
+import argparse
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.logging_config import setup_logging
+from app.services.model_registry import int8_path
+from app.services.tracing import percentile
+from app.services.video_handler import UPLOADS_DIR
+from app.tools.benchmark import find_videos
+
+try:
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+except ImportError:  # only needed by this tool
+    onnx = None
+    CalibrationDataReader = object
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(__file__), "..", "models", "best.onnx")
+CALIBRATION_METHODS = {"minmax": "MinMax", "entropy": "Entropy", "percentile": "Percentile"}
+HEAD_OP_TYPES_KEPT = {"Conv"}  # inside the detect head only these are quantized
+EVAL_MIN_CONFIDENCE = 0.01  # keep low-confidence INT8 boxes so AP sees the full ranking
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def sample_frames(videos: list, count: int, offset: float = 0.0) -> list:
+    """`count` frames spread evenly over all clips; `offset` (0-1) shifts the grid by a fraction of a step."""
+    lengths = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        lengths.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0)
+        cap.release()
+    total = sum(lengths)
+    if not total or count <= 0:
+        return []
+    step = total / count
+    wanted = {int((i + offset) * step) for i in range(count)}
+
+    frames, base = [], 0
+    for path, length in zip(videos, lengths):
+        picks = sorted(i - base for i in wanted if base <= i < base + length)
+        base += length
+        if not picks:
+            continue
+        cap = cv2.VideoCapture(path)
+        index = 0
+        for pick in picks:
+            while index < pick and cap.grab():
+                index += 1
+            ok, frame = cap.read()
+            index += 1
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def letterbox(frame: np.ndarray, size: int) -> np.ndarray:
+    """BGR frame -> 1x3xSxS float32 RGB tensor, padded with 114 like ultralytics."""
+    h, w = frame.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Feeds letterboxed footage frames to onnxruntime's calibrator."""
+
+    def __init__(self, frames: list, input_name: str, size: int):
+        self._inputs = iter([{input_name: letterbox(f, size)} for f in frames])
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def _input_spec(model) -> tuple:
+    tensor = model.graph.input[0]
+    dims = [d.dim_value for d in tensor.type.tensor_type.shape.dim]
+    return tensor.name, dims[2] if len(dims) == 4 and dims[2] > 0 else 640
+
+
+def _head_nodes(model) -> list:
+    """Non-Conv nodes of the YOLO detect head (box decode / DFL), kept in FP32."""
+    indices = [int(m.group(1)) for n in model.graph.node if (m := re.match(r"/model\.(\d+)/", n.name))]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [n.name for n in model.graph.node if n.name.startswith(prefix) and n.op_type not in HEAD_OP_TYPES_KEPT]
+
+
+def quantize(model_path: str, output_path: str, frames: list, calibration: str = "minmax",
+             quantize_head: bool = False, per_channel: bool = True) -> dict:
+    """Write a QDQ INT8 model calibrated on `frames`."""
+    fp32 = onnx.load(model_path)
+    input_name, size = _input_spec(fp32)
+    exclude = [] if quantize_head else _head_nodes(fp32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(model_path, prepared)
+        started = time.perf_counter()
+        quantize_static(
+            prepared,
+            output_path,
+            FrameCalibrationReader(frames, input_name, size),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=getattr(CalibrationMethod, CALIBRATION_METHODS[calibration]),
+            nodes_to_exclude=exclude,
+        )
+        elapsed = time.perf_counter() - started
+
+    # ultralytics reads class names, stride and imgsz from the metadata
+    int8 = onnx.load(output_path)
+    del int8.metadata_props[:]
+    int8.metadata_props.extend(fp32.metadata_props)
+    onnx.save(int8, output_path)
+    return {
+        "output": output_path,
+        "input_size": size,
+        "calibration_frames": len(frames),
+        "calibration": calibration,
+        "excluded_nodes": len(exclude),
+        "seconds": round(elapsed, 1),
+        "size_mb": {
+            "fp32": round(os.path.getsize(model_path) / 1e6, 2),
+            "int8": round(os.path.getsize(output_path) / 1e6, 2),
+        },
+    }
+
+
+def box_iou(box: list, boxes: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = (x2 - x1).clip(min=0) * (y2 - y1).clip(min=0)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def average_precision(predictions: list, truths: dict, iou_threshold: float) -> float:
+    """All-point interpolated AP of (frame, confidence, box) predictions against {frame: [boxes]}."""
+    n_truths = sum(len(b) for b in truths.values())
+    if n_truths == 0:
+        return None
+    matched = {frame: np.zeros(len(boxes), dtype=bool) for frame, boxes in truths.items()}
+    hits = []
+    for frame, _, box in sorted(predictions, key=lambda p: p[1], reverse=True):
+        boxes = truths.get(frame)
+        hit = False
+        if boxes:
+            ious = box_iou(box, np.asarray(boxes, dtype=np.float32))
+            ious[matched[frame]] = 0
+            best = int(ious.argmax())
+            if ious[best] >= iou_threshold:
+                matched[frame][best] = True
+                hit = True
+        hits.append(hit)
+    if not hits:
+        return 0.0
+    tp = np.cumsum(hits)
+    recall = tp / n_truths
+    precision = tp / np.arange(1, len(hits) + 1)
+    # Precision envelope, then area under the recall steps
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall = np.concatenate(([0.0], recall))
+    return float(np.sum((recall[1:] - recall[:-1]) * precision))
+
+
+def _run(model, frames: list) -> tuple:
+    from app.services.inference import _result_boxes
+
+    for frame in frames[:3]:  # warm-up
+        model(frame, verbose=False, conf=EVAL_MIN_CONFIDENCE)
+    outputs, latencies = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        results = model(frame, verbose=False, conf=EVAL_MIN_CONFIDENCE)
+        latencies.append((time.perf_counter() - started) * 1000)
+        outputs.append(_result_boxes(results[0]) if results else [])
+    return outputs, latencies
+
+
+def _latency(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        **{f"p{p}": round(percentile(values, p), 2) if values else None for p in (50, 90, 99)},
+    }
+
+
+def compare(fp32_path: str, quantized_path: str, frames: list, threshold: float, classes: list) -> dict:
+    """Accuracy proxy and latency of the INT8 model against FP32 on the same frames."""
+    from ultralytics import YOLO
+
+    fp32, int8 = YOLO(fp32_path, task="detect"), YOLO(quantized_path, task="detect")
+    names = fp32.names
+
+    def allowed(class_id: int) -> bool:
+        return any(c in names[class_id].lower() for c in classes)
+
+    ref_out, ref_ms = _run(fp32, frames)
+    q_out, q_ms = _run(int8, frames)
+
+    per_class = {}
+    agree = tp = fp = fn = 0
+    for frame_index, (ref, q) in enumerate(zip(ref_out, q_out)):
+        ref_kept = [(b, c, k) for b, c, k in ref if c > threshold and allowed(k)]
+        q_kept = [(b, c, k) for b, c, k in q if c > threshold and allowed(k)]
+        agree += {k for _, _, k in ref_kept} == {k for _, _, k in q_kept}
+        for b, _, k in ref_kept:
+            per_class.setdefault(k, ({}, []))[0].setdefault(frame_index, []).append(b)
+        for b, c, k in q:
+            if allowed(k):
+                per_class.setdefault(k, ({}, []))[1].append((frame_index, c, b))
+        # Operating point: greedy one-to-one matching at IoU 0.5
+        for k in {k for *_, k in ref_kept} | {k for *_, k in q_kept}:
+            truths = [b for b, _, kk in ref_kept if kk == k]
+            used = np.zeros(len(truths), dtype=bool)
+            for b, _, _ in sorted((p for p in q_kept if p[2] == k), key=lambda p: p[1], reverse=True):
+                if truths:
+                    ious = box_iou(b, np.asarray(truths, dtype=np.float32))
+                    ious[used] = 0
+                    best = int(ious.argmax())
+                    if ious[best] >= 0.5:
+                        used[best] = True
+                        tp += 1
+                        continue
+                fp += 1
+            fn += int((~used).sum())
+
+    classes_ap = {}
+    for k, (truths, predictions) in per_class.items():
+        aps = [average_precision(predictions, truths, t) for t in IOU_THRESHOLDS]
+        if aps[0] is not None:
+            classes_ap[names[k]] = {"ap50": round(aps[0], 4), "ap50_95": round(float(np.mean(aps)), 4)}
+
+    fp32_latency, int8_latency = _latency(ref_ms), _latency(q_ms)
+    return {
+        "frames": len(frames),
+        "threshold": threshold,
+        "map50": round(float(np.mean([v["ap50"] for v in classes_ap.values()])), 4) if classes_ap else None,
+        "map50_95": round(float(np.mean([v["ap50_95"] for v in classes_ap.values()])), 4) if classes_ap else None,
+        "per_class": classes_ap,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "alert_agreement": round(agree / len(frames), 4) if frames else None,
+        "latency_ms": {"fp32": fp32_latency, "int8": int8_latency},
+        "speedup_p50": round(fp32_latency["p50"] / int8_latency["p50"], 2) if int8_latency["p50"] else None,
+    }
+
+
+def print_report(report: dict):
+    if "quantize" in report:
+        q = report["quantize"]
+        print(f"INT8 model: {q['output']} ({q['size_mb']['fp32']} MB -> {q['size_mb']['int8']} MB, "
+              f"{q['calibration_frames']} {q['calibration']} calibration frames, {q['seconds']}s)")
+    c = report["comparison"]
+    print(f"Frames compared: {c['frames']} (threshold {c['threshold']})")
+    print(f"mAP@0.5 vs FP32: {c['map50']}   mAP@0.5:0.95: {c['map50_95']}")
+    for label, ap in c["per_class"].items():
+        print(f"  {label:<12} AP50={ap['ap50']:<8} AP50-95={ap['ap50_95']}")
+    print(f"At threshold: precision={c['precision']} recall={c['recall']} alert agreement={c['alert_agreement']}")
+    for name, stats in c["latency_ms"].items():
+        print(f"Latency {name:<5} mean={stats['mean']}ms p50={stats['p50']}ms p90={stats['p90']}ms p99={stats['p99']}ms")
+    print(f"Speed-up (p50): {c['speedup_p50']}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an INT8 detector model and compare it with FP32.")
+    parser.add_argument("paths", nargs="*", default=[UPLOADS_DIR], help="Clips for calibration/evaluation (default: uploads/)")
+    parser.add_argument("--model", default=os.getenv("DETECTION_MODEL_PATH", DEFAULT_MODEL), help="FP32 ONNX model")
+    parser.add_argument("--output", help="INT8 model path (default: <model>.int8.onnx)")
+    parser.add_argument("--calib-frames", type=int, default=200, help="Frames used for calibration")
+    parser.add_argument("--eval-frames", type=int, default=200, help="Frames used for the comparison")
+    parser.add_argument("--calibration", choices=sorted(CALIBRATION_METHODS), default="minmax")
+    parser.add_argument("--quantize-head", action="store_true", help="Also quantize the detect head's decode ops")
+    parser.add_argument("--compare-only", action="store_true", help="Skip quantization, compare an existing INT8 model")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("DETECTION_CONFIDENCE_THRESHOLD", "0.3")))
+    parser.add_argument("--classes", default=os.getenv("DETECTION_ALLOWED_CLASSES", "person,elephant,cow"),
+                        help="Comma-separated allowed classes")
+    parser.add_argument("--report", help="Also write the report as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if onnx is None:
+        parser.error("onnx and onnxruntime are required: pip install onnx onnxruntime")
+    if not os.path.exists(args.model):
+        parser.error(f"Model not found: {args.model}")
+    videos = find_videos(args.paths)
+    if not videos:
+        parser.error(f"No video files found in {args.paths}")
+    output = args.output or int8_path(args.model)
+    classes = [c.strip().lower() for c in args.classes.split(",") if c.strip()]
+
+    report = {}
+    if not args.compare_only:
+        calibration_frames = sample_frames(videos, args.calib_frames)
+        logger.info("📐 Calibrating on %d frames from %d clip(s)", len(calibration_frames), len(videos))
+        report["quantize"] = quantize(args.model, output, calibration_frames, args.calibration, args.quantize_head)
+    elif not os.path.exists(output):
+        parser.error(f"INT8 model not found: {output}")
+
+    # Evaluation frames sit half a step off the calibration grid, so the two sets don't overlap
+    eval_frames = sample_frames(videos, args.eval_frames, offset=0.5)
+    report["comparison"] = compare(args.model, output, eval_frames, args.threshold, classes)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# app/tools/reanalyze.py
+"""
+Offline re-analysis: re-score recorded clips with the current (or another)
+model and thresholds, and write the results back to detection_events.
+
+Clips are decoded in parallel worker processes, each holding its own model
+and running the sampled frames through it in batches. Every finished clip
+is recorded in the reanalysis_progress table, so an interrupted run picks
+up where it stopped when started again with the same settings.
+
+For each event matched to a clip (by video_filename, or by type and the
+clip's start time), confidence is backfilled from the clip and
+data["reanalysis"] gets per-class counts, track summaries and a
+false_positive flag set when the event's class no longer shows up.
+
+    python -m app.tools.reanalyze                         # all clips in uploads/
+    python -m app.tools.reanalyze --model yolov8s.onnx --threshold 0.4 --workers 4
+    python -m app.tools.reanalyze --restart --json        # ignore this run's progress
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import logging
+import multiprocessing as mp
+from datetime import datetime, timedelta
+
+import cv2
+
+from app.database import SessionLocal, ensure_schema
+from app.logging_config import setup_logging
+from app.models.event import DetectionEventDB
+from app.models.reanalysis import ReanalysisProgressDB
+from app.services.video_handler import UPLOADS_DIR, CLIP_DURATION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(__file__), "..", "models", "best.onnx")
+VIDEO_EXTENSIONS = (".avi", ".mp4", ".mkv", ".mov")
+PRE_EVENT_SECONDS = 5  # clips start with this much footage from before the alert
+TRACK_IOU = 0.3
+TRACK_MAX_GAP = 3  # sampled frames a track may go unseen before it ends
+REANALYSIS_DEVICE_ID = "reanalysis"
+
+# Per-worker model, loaded once by _init_worker
+_model = None
+
+
+def _init_worker(model_path: str, threads: int):
+    global _model
+    # Split cores between workers instead of letting each one grab all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from ultralytics import YOLO
+    _model = YOLO(model_path)
+
+
+def iou(a: list, b: list) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class ClipSummary:
+    """Per-class counts and greedy IoU tracks over a clip's sampled frames."""
+
+    def __init__(self, fps: float):
+        self.fps = fps or 15.0
+        self.frames = 0
+        self.counts = {}  # label -> {"frames": n, "max_in_frame": m}
+        self.max_confidence = {}
+        self.tracks = []  # finished
+        self._open = []
+
+    def add(self, frame_index: int, detections: list):
+        self.frames += 1
+        per_label = {}
+        for d in detections:
+            per_label[d["label"]] = per_label.get(d["label"], 0) + 1
+            self.max_confidence[d["label"]] = max(self.max_confidence.get(d["label"], 0.0), d["confidence"])
+        for label, n in per_label.items():
+            count = self.counts.setdefault(label, {"frames": 0, "max_in_frame": 0})
+            count["frames"] += 1
+            count["max_in_frame"] = max(count["max_in_frame"], n)
+
+        unmatched = list(detections)
+        for track in self._open:
+            best = max(
+                (d for d in unmatched if d["label"] == track["label"]),
+                key=lambda d: iou(track["box"], d["box"]), default=None,
+            )
+            if best is not None and iou(track["box"], best["box"]) >= TRACK_IOU:
+                unmatched.remove(best)
+                track.update(box=best["box"], last=frame_index, misses=0, hits=track["hits"] + 1,
+                             max_confidence=max(track["max_confidence"], best["confidence"]))
+            else:
+                track["misses"] += 1
+        for d in unmatched:
+            self._open.append({"label": d["label"], "box": d["box"], "first": frame_index, "last": frame_index,
+                               "hits": 1, "misses": 0, "max_confidence": d["confidence"]})
+        self.tracks += [t for t in self._open if t["misses"] > TRACK_MAX_GAP]
+        self._open = [t for t in self._open if t["misses"] <= TRACK_MAX_GAP]
+
+    def to_dict(self) -> dict:
+        tracks = sorted(self.tracks + self._open, key=lambda t: t["first"])
+        return {
+            "sampled_frames": self.frames,
+            "counts": self.counts,
+            "max_confidence": {k: round(v, 4) for k, v in self.max_confidence.items()},
+            "tracks": [
+                {
+                    "label": t["label"],
+                    "first_s": round(t["first"] / self.fps, 2),
+                    "last_s": round(t["last"] / self.fps, 2),
+                    "hits": t["hits"],
+                    "max_confidence": round(t["max_confidence"], 4),
+                }
+                for t in tracks
+            ],
+        }
+
+
+def _filter(raw: list, names: dict, threshold: float, classes: list) -> list:
+    """Same threshold / allowed-class rule as detection._filter_detections."""
+    detections = []
+    for box, confidence, class_id in raw:
+        label = names[class_id]
+        if confidence > threshold and any(c in label.lower() for c in classes):
+            detections.append({"label": label, "confidence": confidence, "box": [float(v) for v in box]})
+    return detections
+
+
+def analyze_clip(task: tuple) -> dict:
+    """Worker: decode every `stride`-th frame and run them through the model in batches."""
+    from app.services.inference import infer_batch
+
+    path, stride, batch_size, threshold, classes = task
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {"clip": os.path.basename(path), "error": "cannot open video"}
+    summary = ClipSummary(cap.get(cv2.CAP_PROP_FPS))
+    names = _model.names
+    batch, indices, index = [], [], 0
+    try:
+        while True:
+            # grab() skips the colour conversion for frames we don't sample
+            if index % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            batch.append(frame)
+            indices.append(index)
+            index += 1
+            if len(batch) == batch_size:
+                for i, raw in zip(indices, infer_batch(_model, batch)):
+                    summary.add(i, _filter(raw, names, threshold, classes))
+                batch, indices = [], []
+        if batch:
+            for i, raw in zip(indices, infer_batch(_model, batch)):
+                summary.add(i, _filter(raw, names, threshold, classes))
+    except Exception as e:
+        return {"clip": os.path.basename(path), "error": str(e)[:500]}
+    finally:
+        cap.release()
+    return {
+        "clip": os.path.basename(path),
+        "frames": summary.frames,
+        "seconds": time.perf_counter() - started,
+        "summary": summary.to_dict(),
+    }
+
+
+def _clip_start(filename: str):
+    """Recording start and detection type from a '<YYYYmmdd_HHMMSS>_<type>.avi' name."""
+    stem = os.path.splitext(filename)[0]
+    try:
+        return datetime.strptime(stem[:15], "%Y%m%d_%H%M%S"), stem[16:] or None
+    except ValueError:
+        return None, None
+
+
+def write_back(db, clip: str, summary: dict, run: str, create_missing: bool = False) -> dict:
+    """Update the events recorded for `clip` with the re-analysis result."""
+    events = db.query(DetectionEventDB).filter(DetectionEventDB.video_filename == clip).all()
+    start, clip_type = _clip_start(clip)
+    if not events and start is not None:
+        events = (
+            db.query(DetectionEventDB)
+            .filter(DetectionEventDB.detection_type == clip_type)
+            .filter(DetectionEventDB.timestamp >= start - timedelta(seconds=PRE_EVENT_SECONDS))
+            .filter(DetectionEventDB.timestamp <= start + timedelta(seconds=CLIP_DURATION_SECONDS))
+            .filter((DetectionEventDB.video_filename.is_(None)) | (DetectionEventDB.video_filename == ""))
+            .all()
+        )
+
+    max_confidence = summary["max_confidence"]
+    analyzed_at = datetime.now().isoformat()
+    false_positives = 0
+    for event in events:
+        data = dict(event.data or {})
+        previous = data.get("reanalysis") or {}
+        confidence = max_confidence.get(event.detection_type)
+        data["reanalysis"] = {
+            "run": run,
+            "analyzed_at": analyzed_at,
+            "original_confidence": previous.get("original_confidence", event.confidence),
+            "confidence": confidence,
+            "false_positive": confidence is None,
+            **summary,
+        }
+        event.data = data  # reassign so the JSON column is marked dirty
+        if confidence is not None:
+            event.confidence = confidence
+        else:
+            false_positives += 1
+        event.video_filename = event.video_filename or clip
+
+    created = 0
+    if not events and create_missing and max_confidence:
+        label = max(max_confidence, key=max_confidence.get)
+        key = f"reanalysis:{clip}"
+        if not db.query(DetectionEventDB).filter(DetectionEventDB.idempotency_key == key).first():
+            db.add(DetectionEventDB(
+                timestamp=start or datetime.now(),
+                detection_type=label,
+                device_id=REANALYSIS_DEVICE_ID,
+                video_filename=clip,
+                confidence=max_confidence[label],
+                data={"reanalysis": {"run": run, "analyzed_at": analyzed_at, "false_positive": False, **summary}},
+                idempotency_key=key,
+            ))
+            created = 1
+    return {"events_updated": len(events), "false_positives": false_positives, "events_created": created}
+
+
+def _progress(db, run: str, clip: str) -> ReanalysisProgressDB:
+    row = db.query(ReanalysisProgressDB).filter_by(run=run, video_filename=clip).first()
+    if row is None:
+        row = ReanalysisProgressDB(run=run, video_filename=clip, status="pending")
+        db.add(row)
+    return row
+
+
+def model_digest(path: str) -> str:
+    """Short content hash of a model file, so retraining under the same name starts a new run."""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_key(model_path: str, threshold: float, classes: list, stride: int) -> str:
+    """Identity of a run: model file and contents, threshold, stride and allowed classes."""
+    return (f"{os.path.basename(model_path)}#{model_digest(model_path)}@{threshold:g}"
+            f"/stride{stride}/{','.join(sorted(set(classes)))}")
+
+
+def run_job(paths: list, model_path: str, threshold: float, classes: list, workers: int,
+            batch_size: int, stride: int, restart: bool = False, create_missing: bool = False) -> dict:
+    run = run_key(model_path, threshold, classes, stride)
+    db = SessionLocal()
+    try:
+        done = set() if restart else {
+            clip for (clip,) in db.query(ReanalysisProgressDB.video_filename).filter_by(run=run, status="done")
+        }
+        todo = [p for p in paths if os.path.basename(p) not in done]
+        report = {"run": run, "clips": len(paths), "skipped": len(paths) - len(todo), "done": 0, "failed": 0,
+                  "frames": 0, "events_updated": 0, "events_created": 0, "false_positives": 0}
+        if not todo:
+            return report
+
+        workers = max(1, min(workers, len(todo)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        tasks = [(p, stride, batch_size, threshold, classes) for p in todo]
+        started = time.perf_counter()
+        with mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(model_path, threads)) as pool:
+            # Results are written here, in the parent, so SQLite sees one writer
+            for result in pool.imap_unordered(analyze_clip, tasks):
+                row = _progress(db, run, result["clip"])
+                if "error" in result:
+                    row.status, row.error = "failed", result["error"]
+                    report["failed"] += 1
+                    logger.error("❌ %s: %s", result["clip"], result["error"])
+                else:
+                    counts = write_back(db, result["clip"], result["summary"], run, create_missing)
+                    row.status, row.error = "done", None
+                    row.frames, row.seconds = result["frames"], round(result["seconds"], 3)
+                    row.summary = {**result["summary"], **counts}
+                    report["done"] += 1
+                    report["frames"] += result["frames"]
+                    for key, value in counts.items():
+                        report[key] += value
+                    logger.info("🎞️  %s: %d frames in %.1fs, %d event(s) updated",
+                                result["clip"], result["frames"], result["seconds"], counts["events_updated"])
+                db.commit()
+        elapsed = time.perf_counter() - started
+        report["seconds"] = round(elapsed, 2)
+        report["frames_per_second"] = round(report["frames"] / elapsed, 1) if elapsed else None
+        return report
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score recorded clips and update detection_events.")
+    parser.add_argument("paths", nargs="*", default=[UPLOADS_DIR], help="Clip files or directories (default: uploads/)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model file to score with")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("DETECTION_CONFIDENCE_THRESHOLD", "0.3")))
+    parser.add_argument("--classes", default=os.getenv("DETECTION_ALLOWED_CLASSES", "person,elephant,cow"),
+                        help="Comma-separated allowed classes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decode/inference processes")
+    parser.add_argument("--batch", type=int, default=8, help="Frames per inference call")
+    parser.add_argument("--stride", type=int, default=5, help="Analyse every Nth frame")
+    parser.add_argument("--restart", action="store_true", help="Re-process clips this run already finished")
+    parser.add_argument("--create-missing", action="store_true",
+                        help="Add an event for clips with detections but no matching event")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(p for p in glob.glob(os.path.join(path, "*")) if p.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            paths.append(path)
+    if not paths:
+        parser.error(f"No video files found in {args.paths}")
+
+    if not os.path.isfile(args.model):
+        parser.error(f"Model file not found: {args.model}")
+
+    ensure_schema()
+    classes = [c.strip().lower() for c in args.classes.split(",") if c.strip()]
+    report = run_job(paths, os.path.abspath(args.model), args.threshold, classes, args.workers,
+                     max(1, args.batch), max(1, args.stride), args.restart, args.create_missing)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(" ".join(f"{k}={v}" for k, v in report.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# app/tools/startup_bench.py
+"""
+Cold-start benchmark: how long a freshly started API process takes to
+answer, and to be ready to detect.
+
+Starts `uvicorn app.__main__:app` --runs times and measures, from process
+spawn, the first 200 from GET /api/system/status (API, siren and status
+endpoints up) and the first 200 from GET /api/system/ready (model loaded
+and warmed up). It also times `import app.__main__` in a fresh interpreter
+(import_ms), and with --imports N lists the N slowest imports of
+app.__main__ (python -X importtime), to see what's on the startup path.
+
+ultralytics/torch, Flask, pyarrow, cv2 and app.services.detection are not
+imported at startup (detection and cv2 load when the lifespan starts
+capture). What remains is mostly FastAPI and SQLAlchemy (about 0.9 s),
+plus numpy and requests for the camera routes: about 1.15 s of import_ms
+on a small CPU.
+
+    python -m app.tools.startup_bench
+    python -m app.tools.startup_bench --runs 10 --imports 15 --json
+
+The server runs against this checkout's database and cameras, like
+`python -m app`.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+
+import requests
+
+from app.services.tracing import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _wait_for(url: str, process: subprocess.Popen, started: float, timeout: float):
+    """ms from `started` until `url` returns 200, or None on timeout / process exit."""
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_start(port: int, timeout: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.__main__:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        api_ms = _wait_for(f"{base_url}/api/system/status", process, started, timeout)
+        ready_ms = _wait_for(f"{base_url}/api/system/ready", process, started, timeout) if api_ms else None
+    finally:
+        # SIGINT so the lifespan shutdown runs, as on a normal restart
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {"api_ms": api_ms, "ready_ms": ready_ms}
+
+
+def import_ms() -> float:
+    """Wall time of `import app.__main__` in a fresh interpreter, or None if it failed."""
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import time; t = time.perf_counter(); import app.__main__; print(time.perf_counter() - t)"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    try:
+        return float(result.stdout.strip().splitlines()[-1]) * 1000
+    except (IndexError, ValueError):
+        return None
+
+
+def slowest_imports(count: int) -> list:
+    """(cumulative_ms, self_ms, module) of the slowest imports of app.__main__."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.__main__"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        if self_us.isdigit():
+            rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, module))
+    return sorted(rows, reverse=True)[:count]
+
+
+def _stats(values: list) -> dict:
+    done = sorted(v for v in values if v is not None)
+    return {
+        "runs": len(values),
+        "timeouts": len(values) - len(done),
+        **{f"p{p}": round(percentile(done, p), 1) if done else None for p in (50, 90)},
+        "max": round(done[-1], 1) if done else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API cold-start time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each endpoint")
+    parser.add_argument("--imports", type=int, default=0, help="Also list the N slowest imports")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [measure_start(args.port, args.timeout) for _ in range(max(1, args.runs))]
+    report = {
+        "import_ms": _stats([import_ms() for _ in range(max(1, args.runs))]),
+        "api_ms": _stats([r["api_ms"] for r in runs]),
+        "ready_ms": _stats([r["ready_ms"] for r in runs]),
+    }
+    if args.imports:
+        report["slowest_imports"] = [
+            {"module": module, "cumulative_ms": round(cumulative, 1), "self_ms": round(own, 1)}
+            for cumulative, own, module in slowest_imports(args.imports)
+        ]
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for name, label in (("import_ms", "Import"), ("api_ms", "API up"), ("ready_ms", "Model ready")):
+        stats = report[name]
+        print(f"{label:<12} p50={stats['p50']}ms p90={stats['p90']}ms max={stats['max']}ms "
+              f"timeouts={stats['timeouts']}/{stats['runs']}")
+    for row in report.get("slowest_imports", []):
+        print(f"  {row['cumulative_ms']:>8.1f}ms  (self {row['self_ms']:>6.1f}ms)  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from app.services.alert_pipeline import AlertPipeline
+from app.services.tracing import FrameTrace
+
+
+class Sinks:
+    def __init__(self):
+        self.sirens = []
+        self.events = []
+
+    def siren(self, state, **kwargs):
+        self.sirens.append(state)
+        return True
+
+    def notify(self, **kwargs):
+        return True
+
+    def log_event(self, **kwargs):
+        self.events.append(kwargs)
+        return len(self.events)
+
+
+def decision(severity, label="elephant"):
+    return {"label": label, "confidence": 0.9, "severity": severity, "hits": 2}
+
+
+def pipeline(sinks, clock=None):
+    kwargs = {"clock": clock} if clock else {}
+    return AlertPipeline(siren=sinks.siren, notify=sinks.notify, log_event=sinks.log_event,
+                         cooldown=10, siren_auto_off=0, detect=lambda frame, camera_id: [], **kwargs)
+
+
+def test_log_then_siren_escalates_through_cooldown():
+    sinks = Sinks()
+    p = pipeline(sinks)
+    p._alert(decision("log"), FrameTrace(), "cam")
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    assert len(sinks.events) == 2
+    assert sinks.sirens == ["ON"]
+
+
+def test_same_or_lower_severity_is_held_by_cooldown():
+    sinks = Sinks()
+    p = pipeline(sinks)
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    p._alert(decision("log"), FrameTrace(), "cam")
+    assert len(sinks.events) == 1
+
+
+def test_cooldown_runs_on_the_injected_clock():
+    sinks = Sinks()
+    now = [100.0]
+    p = pipeline(sinks, clock=lambda: now[0])
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    now[0] += 9
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    now[0] += 1
+    p._alert(decision("siren"), FrameTrace(), "cam")
+    assert len(sinks.events) == 2
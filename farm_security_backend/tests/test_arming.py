@@ -0,0 +1,16 @@
+from app.services import arming
+
+
+def test_profile_models_load_on_start_not_on_construction(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(arming.model_registry, "variant", lambda path: loaded.append(path))
+    monkeypatch.setattr(arming.scheduler, "call_at", lambda when, fn, *args: None)
+    schedule = arming.load_schedule('{"*": [{"name": "night", "model": "night.onnx"}]}')
+
+    scheduler = arming.ArmingScheduler(schedule)
+    assert loaded == []
+    assert scheduler.profile_for("cam") is arming.ALWAYS_ARMED
+
+    scheduler.start()
+    assert loaded == [arming.os.path.join(arming.MODELS_DIR, "night.onnx")]
+    assert scheduler.profile_for("cam")["name"] == "night"
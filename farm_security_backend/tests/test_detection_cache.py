@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services import detection_cache as dc
+
+
+def test_streamed_frames_bypass_cache_in_snapshot_mode(monkeypatch):
+    monkeypatch.setattr(dc, "DETECTION_CACHE_MODE", "snapshot")
+    cache = dc.DetectionCache()
+    assert not cache.enabled_for("cam")
+    cache.set_source("cam", snapshot=True)
+    assert cache.enabled_for("cam")
+    cache.set_source("cam", snapshot=False)
+    assert not cache.enabled_for("cam")
+
+
+def test_lookup_requires_matching_variant():
+    cache = dc.DetectionCache()
+    key = dc.frame_hash(np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8))
+    cache.store("cam", key, [{"label": "elephant"}], variant=(False, (False, None)))
+    assert cache.lookup("cam", key, variant=(True, (False, None))) is None
+    assert cache.lookup("cam", key, variant=(False, (True, 3))) is None
+    assert cache.lookup("cam", key, variant=(False, (False, None))) == [{"label": "elephant"}]
@@ -0,0 +1,20 @@
+import uuid
+
+from app.services import ipc
+from app.services.ipc import SharedFrameWriter, SharedFrameReader
+
+
+def test_writer_sees_readers_only_after_a_read(monkeypatch):
+    # Reader and writer share this process's resource tracker here
+    monkeypatch.setattr(ipc.resource_tracker, "unregister", lambda name, rtype: None)
+    name = f"farm_test_{uuid.uuid4().hex[:8]}"
+    writer = SharedFrameWriter(name=name, size=4096)
+    try:
+        assert not writer.has_readers()
+        reader = SharedFrameReader(name=name)
+        assert reader.read()[0] is None
+        assert writer.has_readers()
+        writer.write(b"jpeg")
+        assert reader.read()[0] == b"jpeg"
+    finally:
+        writer.close()
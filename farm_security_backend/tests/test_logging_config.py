@@ -0,0 +1,19 @@
+import logging
+
+from app.logging_config import RateLimitFilter
+
+
+def record(level: int, msg: str = "frame %d") -> logging.LogRecord:
+    return logging.LogRecord("app.test", level, __file__, 1, msg, (1,), None)
+
+
+def test_rate_limit_drops_repeated_info():
+    rate_limit = RateLimitFilter(rate=0.001, burst=2)
+    passed = [rate_limit.filter(record(logging.INFO)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+
+
+def test_rate_limit_never_drops_warnings_and_errors():
+    rate_limit = RateLimitFilter(rate=0.001, burst=1)
+    for level in (logging.WARNING, logging.ERROR):
+        assert all(rate_limit.filter(record(level)) for _ in range(5))
@@ -0,0 +1,29 @@
+from app.services import model_registry
+
+
+def test_failed_profile_model_is_retried_after_delay(monkeypatch):
+    registry = model_registry.ModelRegistry()
+    attempts = []
+
+    def build(path):
+        attempts.append(path)
+        raise OSError("file still being copied")
+
+    monkeypatch.setattr(registry, "_build", build)
+    monkeypatch.setattr(model_registry.threading, "Thread",
+                        lambda target, args, daemon: type("T", (), {"start": lambda self: target(*args)})())
+
+    assert registry.variant("night.onnx") is None
+    assert attempts == ["night.onnx"]
+    assert "night.onnx" in registry.status()["variant_errors"]
+
+    # Within the retry delay the failed path is not loaded again
+    assert registry.variant("night.onnx") is None
+    assert attempts == ["night.onnx"]
+
+    registry._variant_errors["night.onnx"]["retry_at"] = 0
+    handle = model_registry.ModelHandle(type("Model", (), {"names": {}})(), "night.onnx", 1)
+    monkeypatch.setattr(registry, "_build", lambda path: handle)
+    assert registry.variant("night.onnx") is None
+    assert registry.variant("night.onnx") is handle
+    assert registry.status()["variant_errors"] == {}
@@ -0,0 +1,13 @@
+from app.tools.reanalyze import run_key
+
+
+def test_run_key_changes_with_model_contents_and_classes(tmp_path):
+    model = tmp_path / "best.onnx"
+    model.write_bytes(b"weights v1")
+    key = run_key(str(model), 0.3, ["person", "elephant"], 5)
+
+    assert run_key(str(model), 0.3, ["elephant", "person"], 5) == key
+    assert run_key(str(model), 0.3, ["elephant"], 5) != key
+
+    model.write_bytes(b"weights v2")  # retrained under the same name
+    assert run_key(str(model), 0.3, ["person", "elephant"], 5) != key
@@ -0,0 +1,82 @@
+import threading
+
+from app.services import siren_control
+from app.services.scheduler import ScheduledCall
+from app.services.siren_control import SirenCommandQueue, SirenController, SirenDevice
+
+
+class SlowSend:
+    """Blocks the first send until released, recording every state sent."""
+
+    def __init__(self):
+        self.sent = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, state):
+        self.sent.append(state)
+        self.started.set()
+        self.release.wait(5)
+        return True
+
+
+def test_coalesced_commands_only_succeed_for_the_sent_state():
+    send = SlowSend()
+    commands = SirenCommandQueue(send)
+    first = commands.submit("ON")
+    assert send.started.wait(5)
+    # Queued behind the in-flight ON and coalesced into one send of the last state
+    superseded = commands.submit("ON")
+    latest = commands.submit("OFF")
+    send.release.set()
+
+    assert first.result(5) is True
+    assert latest.result(5) is True
+    assert superseded.result(5) is False
+    assert send.sent == ["ON", "OFF"]
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def call_at(self, when, fn, *args):
+        call = ScheduledCall(when, fn, args)
+        self.calls.append(call)
+        return call
+
+    def call_later(self, delay, fn, *args):
+        return self.call_at(1000.0 + delay, fn, *args)
+
+    def pending(self):
+        return {frozenset(c.args[0]): c.when for c in self.calls if not c.cancelled}
+
+
+def controller(monkeypatch):
+    fake = FakeScheduler()
+    monkeypatch.setattr(siren_control, "scheduler", fake)
+    devices = [
+        SirenDevice("north", "http://north", zone="north", cameras=["cam-n"]),
+        SirenDevice("barn", "http://barn", zone="barn", cameras=["*"]),
+    ]
+    for device in devices:
+        device.send = lambda state, d=device: setattr(d, "state", state == "ON") or True
+        device.commands = SirenCommandQueue(device.send)
+    return SirenController(devices), fake
+
+
+def test_overlapping_auto_off_keeps_the_other_sirens_deadline(monkeypatch):
+    sirens, fake = controller(monkeypatch)
+    # cam-n alert: north + barn off at t=1060; barn-only alert re-arms barn for t=1030
+    assert sirens.toggle_siren("ON", camera_id="cam-n", auto_off=60)
+    assert sirens.toggle_siren("ON", zone="barn", auto_off=30)
+
+    assert fake.pending() == {frozenset({"north"}): 1060.0, frozenset({"barn"}): 1030.0}
+
+
+def test_manual_on_cancels_auto_off_only_for_its_sirens(monkeypatch):
+    sirens, fake = controller(monkeypatch)
+    assert sirens.toggle_siren("ON", camera_id="cam-n", auto_off=60)
+    assert sirens.toggle_siren("ON", zone="north")
+
+    assert fake.pending() == {frozenset({"barn"}): 1060.0}